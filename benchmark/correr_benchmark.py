@@ -0,0 +1,347 @@
+"""
+------------------------------------------------------------
+BENCHMARK DEL INFORME ANS CON DATOS SINTÉTICOS – Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Por cada tamaño (10k / 100k / 1M filas de pendientes):
+    1. Copia los scripts del informe y modules/ a una carpeta
+       temporal (las etapas leen y escriben junto a sí mismas:
+       los datos reales del proyecto no se tocan).
+    2. Genera las entradas con benchmark/datos_sinteticos.py.
+    3. Corre cada etapa en su propio proceso, sin ventanas, en el
+       orden del worker (limpieza → cálculos → cruce → merge →
+       mapa, control almacén, mano de obra).
+- Sin red: el formulario de Google se sirve desde
+  formulario_sintetico.csv y CONTROL_ANS_GOOGLE_STUB deja las
+  credenciales en anónimas; la copia del mapa para OneDrive va a
+  la carpeta temporal (CONTROL_ANS_MAPA_ONEDRIVE).
+- Tiempo, CPU, pico de memoria y filas salen de las métricas que
+  cada etapa escribe con modules/instrumentacion.py.
+- Reporte en benchmark/resultados/benchmark_<fecha>.json y .md
+  (tiempo mediano, CPU, pico RSS, filas por segundo y pasos).
+- Uso: python -m benchmark.correr_benchmark --filas 10000 100000
+       python -m benchmark.correr_benchmark --filas 1000000 --etapas limpieza calculos
+------------------------------------------------------------
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmark.datos_sinteticos import generar_datos
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUTA_RESULTADOS = BASE_DIR / "benchmark" / "resultados"
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+SEMILLA = 2025
+TIEMPO_MAXIMO = 3600  # segundos por etapa
+
+# Mismo orden y nombres que worker_pipeline.ETAPAS
+ETAPAS = ["limpieza", "calculos", "cruce_digitacion", "merge_actas", "mapa", "control_almacen", "mano_obra", "historico", "pronostico"]
+SCRIPTS = [
+    "worker_pipeline.py", "limpieza_fenix.py", "calculos_ans.py", "cruce_digitacion_fenix.py",
+    "merge_fenix_actas.py", "mapa_ans.py", "validar_export_almacen.py", "mano_obra_vs_materiales.py",
+    "historico_ans.py", "pronostico_ans.py",
+]
+
+
+# ============================================================
+# FORMULARIO DE GOOGLE SIN RED
+# ============================================================
+class FormularioSintetico:
+    """Lo mínimo de gspread que usa calculos_ans.cruzar_formulario."""
+
+    title = "Respuestas de formulario 1"
+
+    def __init__(self, ruta_csv):
+        self.ruta_csv = ruta_csv
+
+    def open_by_key(self, _clave):
+        return self
+
+    def worksheets(self):
+        return [self]
+
+    def get_all_records(self):
+        import pandas as pd
+        if not self.ruta_csv.exists():
+            return []
+        return pd.read_csv(self.ruta_csv, dtype=str, keep_default_na=False).to_dict("records")
+
+
+def correr_aislada(nombre, corrida):
+    """Modo hijo: corre UNA etapa en el espacio de trabajo actual (cwd)."""
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+    espacio = Path.cwd()
+
+    from modules.instrumentacion import fijar_corrida
+    import worker_pipeline
+
+    fijar_corrida(corrida)
+    if nombre == "calculos":
+        calculos = worker_pipeline._modulo("calculos")
+        formulario = FormularioSintetico(espacio / "data_raw" / "formulario_sintetico.csv")
+        calculos.cliente_gspread = lambda *args, **kwargs: formulario
+
+    _, datos = worker_pipeline.correr_etapa(nombre)
+    sys.exit(0 if datos["ok"] else 1)
+
+
+# ============================================================
+# ESPACIO DE TRABAJO
+# ============================================================
+def preparar_espacio(carpeta):
+    """Copia de los scripts del informe (sin datos) en 'carpeta'."""
+    carpeta = Path(carpeta)
+    for script in SCRIPTS:
+        shutil.copy2(BASE_DIR / script, carpeta / script)
+    for paquete in ("modules", "benchmark"):
+        shutil.copytree(BASE_DIR / paquete, carpeta / paquete, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns("__pycache__", "resultados"))
+    for sub in ("data_raw", "data_clean", "data_output", "logs"):
+        (carpeta / sub).mkdir(exist_ok=True)
+    return carpeta
+
+
+def limpiar_salidas(espacio):
+    """Cada repetición arranca sin salidas previas (cruce y merge mueven filas al repositorio)."""
+    for sub in ("data_clean", "data_output"):
+        shutil.rmtree(espacio / sub, ignore_errors=True)
+        (espacio / sub).mkdir()
+
+
+def metricas_de(espacio, corrida):
+    from modules.instrumentacion import leer_metricas
+    return [r for r in leer_metricas(espacio / "logs" / "metricas_etapas.jsonl") if r["corrida"] == corrida]
+
+
+def correr_etapa(espacio, nombre, corrida, tiempo_maximo, opciones_entorno):
+    entorno = dict(os.environ)
+    entorno.update(opciones_entorno)
+    entorno.update({
+        "CONTROL_ANS_GOOGLE_STUB": "http://127.0.0.1:9",   # nada sale a internet
+        "CONTROL_ANS_MAPA_ONEDRIVE": str(espacio / "data_output" / "mapa_ans_onedrive.html"),
+        "PYTHONIOENCODING": "utf-8",
+    })
+    inicio = time.perf_counter()
+    with open(espacio / "logs" / f"bench_{nombre}.log", "a", encoding="utf-8") as log:
+        try:
+            proceso = subprocess.run(
+                [sys.executable, "-m", "benchmark.correr_benchmark", "--aislada", nombre, "--corrida", corrida],
+                cwd=espacio, env=entorno, stdout=log, stderr=subprocess.STDOUT, timeout=tiempo_maximo,
+            )
+            estado = "ok" if proceso.returncode == 0 else f"error ({proceso.returncode})"
+        except subprocess.TimeoutExpired:
+            estado = f"tiempo agotado ({tiempo_maximo} s)"
+    return estado, time.perf_counter() - inicio
+
+
+# ============================================================
+# CORRIDA COMPLETA
+# ============================================================
+def correr_tamano(filas, etapas, repeticiones, tiempo_maximo, opciones_datos, opciones_entorno, conservar):
+    espacio = preparar_espacio(tempfile.mkdtemp(prefix=f"bench_ans_{filas}_"))
+    print(f"\n📦 {filas:,} filas → {espacio}")
+
+    inicio = time.perf_counter()
+    archivos = generar_datos(espacio / "data_raw", filas, **opciones_datos)
+    print(f"   🧪 Datos generados en {time.perf_counter() - inicio:.1f} s")
+
+    resultados = {nombre: [] for nombre in etapas}
+    for repeticion in range(repeticiones):
+        limpiar_salidas(espacio)
+        for nombre in etapas:
+            corrida = f"bench-{filas}-{nombre}-{repeticion}"
+            estado, segundos_proceso = correr_etapa(espacio, nombre, corrida, tiempo_maximo, opciones_entorno)
+            pasos = metricas_de(espacio, corrida)
+            total = next((p for p in pasos if p["paso"] == "total"), None)
+            resultados[nombre].append({
+                "estado": estado,
+                "segundos_proceso": round(segundos_proceso, 2),
+                "total": total,
+                "pasos": [p for p in pasos if p["paso"] != "total"],
+            })
+            segundos = total["segundos"] if total else segundos_proceso
+            print(f"   {'✅' if estado == 'ok' else '❌'} {nombre:<17} {segundos:>9.2f} s  {estado}")
+
+    resumen = {"filas": filas, "archivos": archivos, "etapas": {}}
+    for nombre, corridas in resultados.items():
+        resumen["etapas"][nombre] = resumir_etapa(filas, corridas)
+
+    if conservar:
+        resumen["espacio"] = str(espacio)
+    else:
+        shutil.rmtree(espacio, ignore_errors=True)
+    return resumen
+
+
+def _mediana(valores):
+    valores = [v for v in valores if v is not None]
+    return round(statistics.median(valores), 3) if valores else None
+
+
+def resumir_etapa(filas, corridas):
+    totales = [c["total"] for c in corridas if c["total"]]
+    segundos = _mediana([t["segundos"] for t in totales]) or _mediana([c["segundos_proceso"] for c in corridas])
+
+    # Pasos: mediana por nombre de paso entre repeticiones
+    por_paso = {}
+    for c in corridas:
+        for p in c["pasos"]:
+            por_paso.setdefault(p["paso"], []).append(p)
+    pasos = {
+        paso: {
+            "segundos": _mediana([p["segundos"] for p in lista]),
+            "rss_pico_mb": _mediana([p.get("rss_pico_mb") for p in lista]),
+            "filas_entrada": lista[-1].get("filas_entrada"),
+            "filas_salida": lista[-1].get("filas_salida"),
+        }
+        for paso, lista in por_paso.items()
+    }
+
+    return {
+        "estado": corridas[-1]["estado"],
+        "repeticiones": len(corridas),
+        "segundos": segundos,
+        "cpu_s": _mediana([t.get("cpu_s") for t in totales]),
+        # Cada etapa corre en su proceso: sin pico por paso (Windows) vale el del proceso
+        "rss_pico_mb": _mediana([t.get("rss_pico_mb") or t.get("rss_pico_proceso_mb") for t in totales]),
+        "tracemalloc_pico_mb": _mediana([t.get("tracemalloc_pico_mb") for t in totales]),
+        "filas_entrada": totales[-1].get("filas_entrada") if totales else None,
+        "filas_salida": totales[-1].get("filas_salida") if totales else None,
+        "filas_por_segundo": round(filas / segundos) if segundos else None,
+        "pasos": pasos,
+    }
+
+
+# ============================================================
+# REPORTE
+# ============================================================
+def _celda(valor, formato="{}"):
+    return "—" if valor is None else formato.format(valor)
+
+
+def reporte_markdown(reporte):
+    lineas = [
+        f"# Benchmark informe ANS – {reporte['fecha']}",
+        "",
+        f"Python {reporte['entorno']['python']} · pandas {reporte['entorno']['pandas']} · "
+        f"openpyxl {reporte['entorno']['openpyxl']} · {reporte['entorno']['sistema']} · "
+        f"{reporte['entorno']['cpus']} CPU · semilla {reporte['parametros']['semilla']}",
+        "",
+    ]
+    for tamano in reporte["tamanos"]:
+        lineas += [
+            f"## {tamano['filas']:,} filas de pendientes",
+            "",
+            "| Etapa | Estado | Tiempo (s) | CPU (s) | Pico RSS (MB) | Filas entrada | Filas salida | Filas/s | Paso más lento |",
+            "|---|---|---:|---:|---:|---:|---:|---:|---|",
+        ]
+        for nombre, e in tamano["etapas"].items():
+            lento = max(e["pasos"].items(), key=lambda kv: kv[1]["segundos"] or 0, default=None)
+            lento = f"{lento[0]} ({lento[1]['segundos']:.2f} s)" if lento and lento[1]["segundos"] is not None else "—"
+            lineas.append(
+                f"| {nombre} | {e['estado']} | {_celda(e['segundos'], '{:.2f}')} | {_celda(e['cpu_s'], '{:.2f}')} "
+                f"| {_celda(e['rss_pico_mb'], '{:.0f}')} | {_celda(e['filas_entrada'])} | {_celda(e['filas_salida'])} "
+                f"| {_celda(e['filas_por_segundo'], '{:,}')} | {lento} |"
+            )
+        lineas.append("")
+    return "\n".join(lineas)
+
+
+def entorno():
+    import openpyxl
+    import pandas as pd
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "openpyxl": openpyxl.__version__,
+        "sistema": f"{platform.system()} {platform.release()}",
+        "cpus": os.cpu_count(),
+    }
+
+
+def guardar_reporte(reporte, salida):
+    salida = Path(salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    nombre = f"benchmark_{datetime.now():%Y%m%d_%H%M%S}"
+    ruta_json = salida / f"{nombre}.json"
+    ruta_md = salida / f"{nombre}.md"
+    ruta_json.write_text(json.dumps(reporte, ensure_ascii=False, indent=1), encoding="utf-8")
+    ruta_md.write_text(reporte_markdown(reporte), encoding="utf-8")
+    return ruta_json, ruta_md
+
+
+def benchmark(tamanos=TAMANOS, etapas=ETAPAS, repeticiones=1, semilla=SEMILLA, tiempo_maximo=TIEMPO_MAXIMO,
+              sesgo_actividad=1.0, duplicados=0.05, coordenadas_malas=0.03,
+              tracemalloc=False, perfil=False, conservar=False):
+    """Corre el benchmark y devuelve el reporte (dict)."""
+    opciones_datos = {
+        "semilla": semilla,
+        "sesgo_actividad": sesgo_actividad,
+        "duplicados": duplicados,
+        "coordenadas_malas": coordenadas_malas,
+    }
+    opciones_entorno = {}
+    if tracemalloc:
+        opciones_entorno["CONTROL_ANS_TRACEMALLOC"] = "1"
+    if perfil:
+        opciones_entorno["CONTROL_ANS_PERFIL"] = "1"
+
+    return {
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "entorno": entorno(),
+        "parametros": dict(opciones_datos, repeticiones=repeticiones, tiempo_maximo=tiempo_maximo,
+                           tracemalloc=tracemalloc, perfil=perfil),
+        "tamanos": [
+            correr_tamano(filas, etapas, repeticiones, tiempo_maximo, opciones_datos, opciones_entorno, conservar)
+            for filas in tamanos
+        ],
+    }
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Benchmark del informe ANS con datos sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=TAMANOS, help="Tamaños a medir (filas de pendientes)")
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=ETAPAS)
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--sesgo-actividad", type=float, default=1.0, help="0 = actividades parejas; más alto = más concentradas")
+    parser.add_argument("--duplicados", type=float, default=0.05, help="Fracción de filas con PEDIDO repetido")
+    parser.add_argument("--coordenadas-malas", type=float, default=0.03, help="Fracción de coordenadas inválidas")
+    parser.add_argument("--tiempo-maximo", type=int, default=TIEMPO_MAXIMO, help="Segundos por etapa antes de cortarla")
+    parser.add_argument("--tracemalloc", action="store_true", help="Mide también el pico de tracemalloc (más lento)")
+    parser.add_argument("--perfil", action="store_true", help="Guarda un cProfile por etapa en el espacio de trabajo")
+    parser.add_argument("--conservar", action="store_true", help="No borra la carpeta temporal (datos y salidas)")
+    parser.add_argument("--salida", default=str(RUTA_RESULTADOS), help="Carpeta del reporte JSON / Markdown")
+    # Modo interno: una etapa dentro del espacio de trabajo
+    parser.add_argument("--aislada", choices=ETAPAS, help=argparse.SUPPRESS)
+    parser.add_argument("--corrida", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.aislada:
+        correr_aislada(args.aislada, args.corrida)
+
+    reporte = benchmark(
+        args.filas, args.etapas, args.repeticiones, args.semilla, args.tiempo_maximo,
+        args.sesgo_actividad, args.duplicados, args.coordenadas_malas,
+        args.tracemalloc, args.perfil, args.conservar,
+    )
+    ruta_json, ruta_md = guardar_reporte(reporte, args.salida)
+    print(f"\n📊 Reporte: {ruta_md}")
+    print(f"🧾 Datos:   {ruta_json}")
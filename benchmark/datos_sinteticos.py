@@ -0,0 +1,319 @@
+"""
+------------------------------------------------------------
+DATOS SINTÉTICOS PARA EL BENCHMARK – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Genera en una carpeta data_raw/ los archivos que leen las
+  etapas, con la forma de los reales pero datos inventados:
+    pendientes_*.csv, Digitacion Fenix.txt, Acta_Clientes_*.csv,
+    Planilla Consumos.xlsx, ALMACEN_EXPORT.xlsx,
+    RELACION_MO_MAT.xlsx y formulario_sintetico.csv (respuestas
+    del formulario de Google que el benchmark sirve sin red).
+- 'filas' = filas de pendientes; el resto escala con ellas.
+- Sesgos controlables:
+    sesgo_actividad   → 0 reparte parejo; 1.5 concentra casi todo
+                        en ACREV / ALEGN (tipo Zipf)
+    duplicados        → fracción de filas con PEDIDO repetido
+    coordenadas_malas → fracción con coordenadas vacías, texto,
+                        invertidas o fuera de Antioquia
+- Misma semilla → mismos archivos (salvo las fechas, que se
+  generan hacia atrás desde 'referencia').
+- Uso: python -m benchmark.datos_sinteticos carpeta --filas 10000
+------------------------------------------------------------
+"""
+
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# Las 13 de limpieza_fenix.actividades_validas + algunas que se filtran
+ACTIVIDADES = [
+    "ACREV", "ALEGN", "ALEGA", "ALECA", "ALEMN", "ACAMN", "AMRTR",
+    "APLIN", "REEQU", "INPRE", "DIPRE", "ARTER", "AEJDO",
+]
+ACTIVIDADES_FILTRADAS = ["VITEC", "LEGME", "INSPE"]
+
+MUNICIPIOS = [
+    "Medellín", "Envigado", "Itagüí", "Bello", "Sabaneta", "La Ceja",
+    "Rionegro", "Marinilla", "Caldas", "Copacabana", "Girardota", "Guarne",
+]
+AREAS = ["NORTE", "SUR", "ORIENTE", "OCCIDENTE", "CENTRO"]
+SUBZONAS = ["ORI", "MET", "NOR", "SUR", "OCC", "URA", "ABU"]
+NOMBRES_FILTRADOS = ["MET Rev-Inst-Concentra E_CR014", "Revisor Inst. Particulares Metrosur"]
+TECNICOS = [f"TECNICO {i:03d}" for i in range(1, 61)]
+
+MANOS_OBRA = ["F01U", "F02U", "F03R", "F04R", "M01U", "M02R", "C01U", "C02R"]
+# Incluye los pares base ↔ complemento de validar_export_almacen
+MATERIALES = [str(c) for c in range(200300, 200520, 4)] + ["200492", "200492A", "200384", "200384A"]
+
+ESTADOS_FORMULARIO = ["EJECUTADO EN CAMPO", "PENDIENTE", "NO EJECUTADO", "REPROGRAMADO"]
+
+COLUMNAS_PENDIENTES = [
+    "PEDIDO", "PRODUCTO_ID", "TIPO_TRABAJO", "TIPO_ELEMENTO_ID",
+    "FECHA_RECIBO", "FECHA_INICIO_ANS", "CLIENTEID", "NOMBRE_CLIENTE",
+    "TELEFONO_CONTACTO", "CELULAR_CONTACTO", "DIRECCION", "MUNICIPIO",
+    "INSTALACION", "AREA_TRABAJO", "ACTIVIDAD", "NOMBRE", "TIPO_DIRECCION",
+    "COORDENADAX", "COORDENADAY", "AREA_OPERATIVA", "SUBZONA",
+]
+
+COLUMNAS_DIGITACION = [
+    "pedido", "area_operativa", "subz", "ruta", "municipio", "contrato", "acta",
+    "actividad", "fecha_estado", "pagina", "urbrur", "tipre", "red_interna",
+    "tipo_operacion", "descent", "tipo", "cobro", "suminis", "item_cont",
+    "item_res", "cantidad", "vlr_cliente", "valor_costo", "tipo_item",
+]
+
+
+# ============================================================
+# AUXILIARES
+# ============================================================
+def _probabilidades(n, sesgo):
+    """Pesos tipo Zipf: 1/k^sesgo (0 = uniforme)."""
+    pesos = 1.0 / np.arange(1, n + 1) ** sesgo
+    return pesos / pesos.sum()
+
+
+def _fechas(rng, n, referencia, dias_atras):
+    """Fechas-hora aleatorias en los últimos 'dias_atras' días, en horario laboral."""
+    dias = rng.integers(0, dias_atras, n)
+    segundos = rng.integers(7 * 3600, 18 * 3600, n)
+    inicio = pd.Timestamp(referencia).normalize()
+    return inicio - pd.to_timedelta(dias, unit="D") + pd.to_timedelta(segundos, unit="s")
+
+
+def _direcciones(rng, n, tipo):
+    """Mezcla de calles reales, códigos de instalación urbanos y veredas."""
+    forma = rng.random(n)
+    calle = np.char.add(
+        np.char.add(rng.choice(["CR ", "CL ", "AV ", "TV ", "DG "], n), rng.integers(1, 120, n).astype(str)),
+        np.char.add(" # ", rng.integers(1, 99, n).astype(str)),
+    )
+    codigo = np.char.add(rng.choice(["116", "136", "103", "114", "159", "201", "305"], n),
+                         rng.integers(1_000_000, 9_999_999, n).astype(str))
+    vereda = np.char.add("RURAL VDA ", rng.integers(1, 400, n).astype(str))
+    direccion = np.where(forma < 0.55, calle, np.where(forma < 0.85, codigo, vereda))
+    # Las veredas casi siempre vienen marcadas como rurales
+    return np.where((tipo == "Rural") & (forma >= 0.85), vereda, direccion)
+
+
+def _coordenadas(rng, n, fraccion_malas):
+    x = np.round(rng.uniform(-76.0, -75.2, n), 6).astype(str).astype(object)
+    y = np.round(rng.uniform(5.8, 6.6, n), 6).astype(str).astype(object)
+    malas = np.flatnonzero(rng.random(n) < fraccion_malas)
+    tipo = rng.integers(0, 4, len(malas))
+    for i, t in zip(malas, tipo):
+        if t == 0:
+            x[i], y[i] = "", ""               # vacías
+        elif t == 1:
+            x[i], y[i] = "N/A", "SIN DATO"    # texto
+        elif t == 2:
+            x[i], y[i] = y[i], x[i]           # invertidas
+        else:
+            x[i], y[i] = "0", "0"             # fuera de rango
+    return x, y
+
+
+def _escribir_xlsx(ruta, hoja, encabezado, columnas, filas_titulo=()):
+    """Excel en modo write_only (rápido y con poca memoria para archivos grandes)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    for fila in filas_titulo:
+        ws.append(list(fila))
+    ws.append(encabezado)
+    for fila in zip(*columnas):
+        ws.append(list(fila))
+    wb.save(ruta)
+    return len(columnas[0]) if columnas else 0
+
+
+# ============================================================
+# GENERADOR
+# ============================================================
+def generar_datos(destino, filas, semilla=2025, sesgo_actividad=1.0, duplicados=0.05,
+                  coordenadas_malas=0.03, digitados=0.3, ejecutados=0.5, referencia=None):
+    """
+    Escribe los archivos de entrada en 'destino' (data_raw/ del espacio de
+    trabajo). Devuelve {archivo: filas escritas}.
+    """
+    destino = Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semilla)
+    referencia = referencia or datetime.now()
+    sello = referencia.strftime("%d%m%Y_%H%M%S")
+    conteo = {}
+
+    # --------------------------------------------------------
+    # PENDIENTES (un PEDIDO puede repetirse)
+    # --------------------------------------------------------
+    unicos = max(1, int(round(filas * (1 - duplicados))))
+    pedidos = 20_000_000 + rng.permutation(filas * 5)[:unicos]
+    repetidos = rng.choice(pedidos, filas - unicos) if filas > unicos else np.array([], dtype=pedidos.dtype)
+    pedido = rng.permutation(np.concatenate([pedidos, repetidos]))
+
+    validas = 0.95
+    actividad = np.where(
+        rng.random(filas) < validas,
+        rng.choice(ACTIVIDADES, filas, p=_probabilidades(len(ACTIVIDADES), sesgo_actividad)),
+        rng.choice(ACTIVIDADES_FILTRADAS, filas),
+    )
+    tipo = np.where(rng.random(filas) < 0.7, "Urbano", "Rural")
+    recibido = _fechas(rng, filas, referencia, 30)
+    inicio_ans = recibido + pd.to_timedelta(rng.integers(0, 2 * 3600, filas), unit="s")
+    coord_x, coord_y = _coordenadas(rng, filas, coordenadas_malas)
+    nombre = np.where(rng.random(filas) < 0.02, rng.choice(NOMBRES_FILTRADOS, filas),
+                      rng.choice(["Contratista Elite", "Cuadrilla Norte", "Cuadrilla Sur"], filas))
+
+    df_pend = pd.DataFrame({
+        "PEDIDO": pedido.astype(str),
+        "PRODUCTO_ID": rng.integers(1, 9, filas).astype(str),
+        "TIPO_TRABAJO": rng.choice(["NUEVO", "REVISION", "REFORMA"], filas),
+        "TIPO_ELEMENTO_ID": rng.choice(["MED", "ACO", "RED"], filas),
+        "FECHA_RECIBO": recibido.strftime("%d/%m/%Y %H:%M:%S"),
+        "FECHA_INICIO_ANS": inicio_ans.strftime("%d/%m/%Y %H:%M:%S"),
+        "CLIENTEID": rng.integers(1_000_000, 99_999_999, filas).astype(str),
+        "NOMBRE_CLIENTE": np.char.add("CLIENTE ", rng.integers(1, 500_000, filas).astype(str)),
+        "TELEFONO_CONTACTO": rng.integers(6_040_000, 6_049_999, filas).astype(str),
+        "CELULAR_CONTACTO": rng.integers(3_000_000_000, 3_209_999_999, filas).astype(str),
+        "DIRECCION": _direcciones(rng, filas, tipo),
+        "MUNICIPIO": rng.choice(MUNICIPIOS, filas),
+        "INSTALACION": np.char.add("'", rng.integers(100_000, 9_999_999, filas).astype(str)),
+        "AREA_TRABAJO": rng.choice(AREAS, filas),
+        "ACTIVIDAD": actividad,
+        "NOMBRE": nombre,
+        "TIPO_DIRECCION": tipo,
+        "COORDENADAX": coord_x,
+        "COORDENADAY": coord_y,
+        "AREA_OPERATIVA": rng.choice(AREAS, filas),
+        "SUBZONA": rng.choice(SUBZONAS, filas),
+    }, columns=COLUMNAS_PENDIENTES)
+    ruta = destino / f"pendientes_{sello}.csv"
+    df_pend.to_csv(ruta, index=False, encoding="latin-1", errors="replace")
+    conteo[ruta.name] = len(df_pend)
+
+    # --------------------------------------------------------
+    # DIGITACIÓN FÉNIX (varias líneas de ítems por pedido)
+    # --------------------------------------------------------
+    digit = rng.choice(pedidos, int(len(pedidos) * digitados), replace=False)
+    items = rng.integers(1, 7, len(digit))
+    pedido_item = np.repeat(digit, items)
+    n = len(pedido_item)
+    es_mano_obra = rng.random(n) < 0.25
+    item = np.where(es_mano_obra, rng.choice(MANOS_OBRA, n), rng.choice(MATERIALES, n))
+    df_dig = pd.DataFrame({
+        "pedido": pedido_item.astype(str),
+        "area_operativa": rng.choice(AREAS, n),
+        "subz": rng.choice(SUBZONAS, n),
+        "ruta": rng.integers(100, 999, n).astype(str),
+        "municipio": rng.choice(MUNICIPIOS, n),
+        "contrato": "CW352017",
+        "acta": rng.integers(1, 40, n).astype(str),
+        "actividad": rng.choice(ACTIVIDADES, n),
+        "fecha_estado": _fechas(rng, n, referencia, 30).strftime("%d-%b-%y").str.upper(),
+        "pagina": rng.integers(10**17, 10**18 - 1, n, dtype=np.int64).astype(str),
+        "urbrur": rng.choice(["U", "R"], n),
+        "tipre": "",
+        "red_interna": "",
+        "tipo_operacion": rng.choice(["REG", "MET"], n),
+        "descent": "",
+        "tipo": rng.choice(["CON", "SUM"], n),
+        "cobro": rng.choice(["SI", "NO"], n),
+        "suminis": "",
+        "item_cont": item,
+        "item_res": item,
+        "cantidad": rng.integers(1, 10, n).astype(str),
+        "vlr_cliente": rng.integers(0, 300_000, n).astype(str),
+        "valor_costo": np.round(rng.uniform(500, 90_000, n), 2).astype(str),
+        "tipo_item": "",
+    }, columns=COLUMNAS_DIGITACION)
+    ruta = destino / "Digitacion Fenix.txt"
+    df_dig.to_csv(ruta, sep="|", index=False, encoding="latin-1", errors="replace")
+    conteo[ruta.name] = n
+
+    # --------------------------------------------------------
+    # PLANILLA CONSUMOS (ELITE): materiales digitados con ruido
+    # --------------------------------------------------------
+    materiales = ~es_mano_obra & (rng.random(n) < 0.9)
+    cantidad = pd.to_numeric(df_dig["cantidad"]).to_numpy()[materiales]
+    cantidad = np.maximum(0, cantidad + rng.choice([0, 0, 0, -1, 1], len(cantidad)))
+    extra = max(1, len(cantidad) // 20)   # consumos que Fénix no tiene
+    ruta = destino / "Planilla Consumos.xlsx"
+    conteo[ruta.name] = _escribir_xlsx(
+        ruta, "Hoja2",
+        ["FECHA", "#PEDIDO", "CODIGO", "DESCRIPCION", "CANTIDAD", "TECNICO"],
+        [
+            [referencia.strftime("%d/%m/%Y")] * (len(cantidad) + extra),
+            np.concatenate([pedido_item[materiales], rng.choice(pedidos, extra)]).astype(str).tolist(),
+            np.concatenate([item[materiales], rng.choice(MATERIALES, extra)]).tolist(),
+            ["MATERIAL"] * (len(cantidad) + extra),
+            np.concatenate([cantidad, rng.integers(1, 5, extra)]).astype(str).tolist(),
+            rng.choice(TECNICOS, len(cantidad) + extra).tolist(),
+        ],
+        filas_titulo=[["PLANILLA DE CONSUMOS ELITE"], [], ["CONTRATO CW352017"], []],
+    )
+
+    # --------------------------------------------------------
+    # ALMACÉN EXPORT + RELACIÓN MANO DE OBRA / MATERIALES
+    # --------------------------------------------------------
+    con_salida = rng.choice(pedidos, int(len(pedidos) * ejecutados), replace=False)
+    lineas = rng.integers(1, 5, len(con_salida))
+    pedido_alm = np.repeat(con_salida, lineas)
+    mano_obra = np.repeat(rng.choice(MANOS_OBRA, len(con_salida)), lineas)
+    ruta = destino / "ALMACEN_EXPORT.xlsx"
+    conteo[ruta.name] = _escribir_xlsx(
+        ruta, "Hoja1", ["pedido", "mano_obra", "codigo_material"],
+        [pedido_alm.astype(str).tolist(), mano_obra.tolist(), rng.choice(MATERIALES, len(pedido_alm)).tolist()],
+    )
+
+    relacion = [(mo, mat) for mo in MANOS_OBRA[:-1] for mat in rng.choice(MATERIALES, 3, replace=False)]
+    ruta = destino / "RELACION_MO_MAT.xlsx"
+    conteo[ruta.name] = _escribir_xlsx(
+        ruta, "Hoja1", ["mano_obra", "material_obligatorio"],
+        [[mo for mo, _ in relacion], [str(mat) for _, mat in relacion]],
+    )
+
+    # --------------------------------------------------------
+    # ACTAS Y FORMULARIO DE TÉCNICOS
+    # --------------------------------------------------------
+    con_acta = rng.choice(con_salida, int(len(con_salida) * 0.6), replace=False)
+    ruta = destino / f"Acta_Clientes_{sello}.csv"
+    pd.DataFrame({
+        "PEDIDO": con_acta.astype(str),
+        "ACTA": rng.integers(1, 40, len(con_acta)).astype(str),
+        "FECHA_ACTA": _fechas(rng, len(con_acta), referencia, 20).strftime("%d/%m/%Y"),
+    }).to_csv(ruta, index=False, encoding="utf-8")
+    conteo[ruta.name] = len(con_acta)
+
+    reportados = rng.choice(pedidos, int(len(pedidos) * ejecutados), replace=False)
+    ruta = destino / "formulario_sintetico.csv"
+    pd.DataFrame({
+        "Marca temporal": _fechas(rng, len(reportados), referencia, 20).strftime("%d/%m/%Y %H:%M:%S"),
+        "NÚMERO DEL PEDIDO": reportados.astype(str),
+        "ESTADO DEL PEDIDO": rng.choice(ESTADOS_FORMULARIO, len(reportados), p=[0.7, 0.15, 0.1, 0.05]),
+        "NOMBRE DEL TÉCNICO": rng.choice(TECNICOS, len(reportados)),
+        "OBSERVACIÓN": rng.choice(["", "SIN NOVEDAD", "CLIENTE AUSENTE", "MATERIAL PENDIENTE"], len(reportados)),
+    }).to_csv(ruta, index=False, encoding="utf-8")
+    conteo[ruta.name] = len(reportados)
+
+    return conteo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera entradas sintéticas del informe ANS")
+    parser.add_argument("destino", help="Carpeta donde quedan los archivos (p. ej. un data_raw/ de prueba)")
+    parser.add_argument("--filas", type=int, default=10_000, help="Filas de pendientes")
+    parser.add_argument("--semilla", type=int, default=2025)
+    parser.add_argument("--sesgo-actividad", type=float, default=1.0)
+    parser.add_argument("--duplicados", type=float, default=0.05)
+    parser.add_argument("--coordenadas-malas", type=float, default=0.03)
+    args = parser.parse_args()
+
+    archivos = generar_datos(args.destino, args.filas, args.semilla, args.sesgo_actividad,
+                             args.duplicados, args.coordenadas_malas)
+    for nombre, total in archivos.items():
+        print(f"📄 {nombre}: {total} filas")
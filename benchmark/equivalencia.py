@@ -0,0 +1,528 @@
+"""
+------------------------------------------------------------
+EQUIVALENCIA LEGADO VS VECTORIZADO – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Corre lado a lado la versión fila a fila (legado) y la
+  vectorizada (modules/reglas_vectorizadas.py) de:
+    · dias_pactados               (calculos_ans.py)
+    · clasificar_tipo_direccion   (limpieza_fenix.py)
+    · calcular_dias_restantes     (calculos_ans.py)
+    · calcular_estado_fenix       (cruce_digitacion_fenix.py)
+    · evaluar + complementarios   (validar_export_almacen.py)
+- El legado se toma del código fuente (AST) sin ejecutar el
+  script: sirve para scripts planos y, con --legado <commit>,
+  para comparar contra la versión anterior cuando el apply ya
+  fue reemplazado.
+- Entradas:
+    · generado: datos de benchmark/datos_sinteticos.py + casos
+      borde escritos a mano (paréntesis, dígitos no ASCII, NaN…).
+    · barrido: un "ahora" por cada día 2025-2028 (fines de
+      semana y festivos incluidos) con inicios y límites al
+      azar alrededor, corte exacto de la hora, viernes → lunes
+      e inicios en festivo. El calendario es el de calculos_ans.
+    · grabado: data_raw/ y data_clean/ del proyecto si se pueden
+      leer (se saltan los que falten).
+- Reporta por regla filas comparadas / distintas y guarda las
+  distintas (entradas, legado, nuevo) en
+  benchmark/resultados/equivalencia_<regla>.csv. Código de
+  salida 1 si alguna fila difiere.
+- Uso: python -m benchmark.equivalencia
+       python -m benchmark.equivalencia --reglas dias_restantes --muestra 100 --semilla 7
+       python -m benchmark.equivalencia --legado HEAD~1
+------------------------------------------------------------
+"""
+
+import argparse
+import ast
+import contextlib
+import io
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmark.correr_benchmark import BASE_DIR, RUTA_RESULTADOS
+from benchmark.datos_sinteticos import ESTADOS_FORMULARIO, MATERIALES, generar_datos
+from modules import reglas_vectorizadas as rv
+
+SEMILLA = 2025
+FILAS = 20_000         # filas sintéticas
+MUESTRA = 30           # inicios por cada "ahora" del barrido
+DESDE, HASTA = "2025-01-01", "2028-12-31"
+ORIGENES = ["generado", "barrido", "grabado"]
+MAX_MOSTRAR = 10
+
+# Casos borde que el generador no produce
+CASOS_DIRECCION = [
+    None, np.nan, "", "   ", "nan", "CR 45 # 12-30", "cl 10 sur", "CALLE 50", "AV.80", "AUTOPISTA NORTE",
+    "1160234567", "116 023 4567", "(INTERIOR 114) 1160234567", "(1160234567)", "1160234567 (APTO 301)",
+    "2011234567", "RURAL 2011234567", "VDA RURAL 12", "URB LOS PINOS 3001234", "URBANIZACION 99",
+    "11602", "116023", "  1160234567  ", "²³⁴⁵⁶⁷116", "١١٦٠٢٣٤٥٦٧", "116-023-4567 RURAL", "(SIN CIERRE 1160234567",
+]
+CASOS_TIPO = ["Urbano", "Rural", "URBANO", " rural ", "", None, np.nan, "OTRO"]
+CASOS_ACTIVIDAD = ["ACREV", "alegn", " AMRTR ", "AEJDO", "VITEC", "", None, np.nan, "NAN"]
+CASOS_DIAS = [
+    "VENCIDO", "", None, np.nan, "0 días 00:00", "0 días 08:15", "0 días", "1 días 10:00", "2 días 23:59",
+    "3 días 07:00", "-1 días 10:00", "+2 días 10:00", " 2 días 10:00", "2  días 10:00", "２ días 10:00",
+    "1_0 días 10:00", "10", "3.5 días 10:00", "días 10:00", 4, 0.0,
+]
+CASOS_REPORTE = ESTADOS_FORMULARIO + [
+    "ejecutado en campo", "Ejecutádo en Campo", " EJECUTADO CAMPO ", "CAMPO", "SIN DATO", None, np.nan, 5,
+]
+CASOS_DIFERENCIA = [0, 0.0, -0.0, 1, -1, 0.5, -0.5, np.nan, np.inf, -np.inf, 1e-12, -1e-12]
+
+
+# ============================================================
+# CÓDIGO LEGADO (DESDE EL FUENTE, SIN CORRER EL SCRIPT)
+# ============================================================
+def fuente(script, revision=None):
+    if revision:
+        return subprocess.run(
+            ["git", "show", f"{revision}:{script}"], cwd=BASE_DIR,
+            capture_output=True, text=True, encoding="utf-8", check=True,
+        ).stdout
+    return (BASE_DIR / script).read_text(encoding="utf-8")
+
+
+def _nombre(nodo):
+    if isinstance(nodo, ast.FunctionDef):
+        return nodo.name
+    if isinstance(nodo, ast.Assign) and len(nodo.targets) == 1 and isinstance(nodo.targets[0], ast.Name):
+        return nodo.targets[0].id
+    return None
+
+
+def _entorno_base():
+    return {"np": np, "pd": pd, "re": re, "unicodedata": unicodedata, "datetime": datetime, "timedelta": timedelta}
+
+
+def cargar_legado(script, nombres, revision=None):
+    """Ejecuta solo las funciones / constantes de nivel superior nombradas."""
+    arbol = ast.parse(fuente(script, revision))
+    nodos = [n for n in arbol.body if _nombre(n) in nombres]
+    faltan = set(nombres) - {_nombre(n) for n in nodos}
+    if faltan:
+        raise KeyError(f"{script}: no se encontró {', '.join(sorted(faltan))}")
+    entorno = _entorno_base()
+    exec(compile(ast.Module(body=nodos, type_ignores=[]), f"{script} (legado)", "exec"), entorno)
+    return entorno
+
+
+def cargar_bloque(script, desde, hasta, revision=None):
+    """Código de nivel superior entre dos marcas (scripts planos sin función)."""
+    lineas = fuente(script, revision).splitlines()
+    inicio = next(i for i, l in enumerate(lineas) if desde in l)
+    fin = next(i for i, l in enumerate(lineas[inicio:], inicio) if hasta in l)
+    return compile("\n".join(lineas[inicio:fin]), f"{script} (legado {inicio + 1}-{fin})", "exec")
+
+
+def _reloj(ahora):
+    """datetime cuyo now() devuelve 'ahora' (para el legado)."""
+    class Reloj(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return ahora
+    return Reloj
+
+
+# ============================================================
+# REGLAS: (legado, nuevo) SOBRE EL MISMO DATAFRAME
+# ============================================================
+def legado_tipo_direccion(df, leg):
+    return df.apply(lambda r: leg["clasificar_tipo_direccion"](r["DIRECCION"], r["TIPO_DIRECCION"]), axis=1)
+
+
+def nuevo_tipo_direccion(df, leg):
+    return rv.clasificar_tipo_direccion(df["DIRECCION"], df["TIPO_DIRECCION"], leg["patrones_calle"],
+                                        leg["prefijos_urbanos"])
+
+
+def legado_dias_pactados(df, leg):
+    return df.apply(leg["dias_pactados"], axis=1)
+
+
+def nuevo_dias_pactados(df, leg):
+    return rv.dias_pactados(df["ACTIVIDAD"], df["TIPO_DIRECCION"], leg["DIAS_PACTADOS_MAP"])
+
+
+def legado_dias_restantes(df, leg):
+    funcion = leg["calcular_dias_restantes"]
+    partes = []
+    for ahora, grupo in df.groupby("AHORA", sort=False):
+        funcion.__globals__["datetime"] = _reloj(ahora.to_pydatetime())
+        partes.append(grupo.apply(funcion, axis=1))
+    funcion.__globals__["datetime"] = datetime
+    return pd.concat(partes).reindex(df.index)
+
+
+def nuevo_dias_restantes(df, leg):
+    return rv.dias_restantes(df["FECHA_INICIO_ANS"], df["FECHA_LIMITE_ANS"], df["AHORA"], leg["WEEKMASK"],
+                             leg["FESTIVOS"])
+
+
+def legado_estado_fenix(df, leg):
+    return df.apply(leg["calcular_estado_fenix"], axis=1, args=(df.attrs["pedidos_digitacion"],))
+
+
+def nuevo_estado_fenix(df, leg):
+    return rv.estado_fenix(df, df.attrs["pedidos_digitacion"])
+
+
+def legado_evaluar(df, leg):
+    return df.apply(leg["evaluar"], axis=1)
+
+
+def nuevo_evaluar(df, leg):
+    return rv.evaluar_diferencia(df["diferencia"])
+
+
+def legado_complementarios(df, leg):
+    entorno = _entorno_base()
+    entorno["df_merge"] = df.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        exec(leg["bloque_complementarios"], entorno)
+    resultado = entorno["df_merge"]
+    return resultado["estado"] + " | " + resultado["diferencia"].astype(str)
+
+
+def nuevo_complementarios(df, leg):
+    resultado, _ = rv.ajustar_complementarios(df.copy(), leg["complementos"])
+    return resultado["estado"] + " | " + resultado["diferencia"].astype(str)
+
+
+REGLAS = {
+    "tipo_direccion": (legado_tipo_direccion, nuevo_tipo_direccion, ["DIRECCION", "TIPO_DIRECCION"]),
+    "dias_pactados": (legado_dias_pactados, nuevo_dias_pactados, ["ACTIVIDAD", "TIPO_DIRECCION"]),
+    "dias_restantes": (legado_dias_restantes, nuevo_dias_restantes,
+                       ["AHORA", "FECHA_INICIO_ANS", "FECHA_LIMITE_ANS"]),
+    "estado_fenix": (legado_estado_fenix, nuevo_estado_fenix, ["PEDIDO", "REPORTE_TECNICO", "DIAS_RESTANTES"]),
+    "evaluar": (legado_evaluar, nuevo_evaluar, ["diferencia"]),
+    "complementarios": (legado_complementarios, nuevo_complementarios,
+                        ["pedido", "codigo", "cantidad_fenix", "cantidad_elite", "diferencia", "estado"]),
+}
+
+
+def cargar_legados(revision=None):
+    """Todo lo que usan las reglas, tomado del mismo árbol (o commit)."""
+    leg = {}
+    leg.update(cargar_legado("calculos_ans.py", [
+        "WEEKMASK", "FESTIVOS", "DIAS_PACTADOS_MAP", "add_business_days_keep_time", "dias_pactados",
+        "calcular_dias_restantes",
+    ], revision))
+    limpieza = cargar_legado("limpieza_fenix.py", ["prefijos_urbanos", "clasificar_tipo_direccion"], revision)
+    leg["clasificar_tipo_direccion"] = limpieza["clasificar_tipo_direccion"]
+    leg["prefijos_urbanos"] = limpieza["prefijos_urbanos"]
+    # patrones_calle es local a la función: se lee del mismo fuente
+    funcion = next(n for n in ast.walk(ast.parse(fuente("limpieza_fenix.py", revision)))
+                   if isinstance(n, ast.FunctionDef) and n.name == "clasificar_tipo_direccion")
+    asignacion = next(n for n in ast.walk(funcion) if _nombre(n) == "patrones_calle")
+    leg["patrones_calle"] = ast.literal_eval(asignacion.value)
+
+    cruce = cargar_legado("cruce_digitacion_fenix.py", ["limpiar_texto", "calcular_estado_fenix"], revision)
+    leg["calcular_estado_fenix"] = cruce["calcular_estado_fenix"]
+
+    almacen = cargar_legado("validar_export_almacen.py", ["evaluar"], revision)
+    leg["evaluar"] = almacen["evaluar"]
+    leg["bloque_complementarios"] = cargar_bloque(
+        "validar_export_almacen.py", "complementos = {", "# 🔹 2. Ajuste en df_nocruce", revision)
+    complementos = {}
+    exec(cargar_bloque("validar_export_almacen.py", "complementos = {", "ajustes_realizados = 0", revision),
+         {}, complementos)
+    leg["complementos"] = complementos["complementos"]
+    return leg
+
+
+# ============================================================
+# ENTRADAS
+# ============================================================
+def _producto(*listas, columnas):
+    filas = [[]]
+    for lista in listas:
+        filas = [f + [v] for f in filas for v in lista]
+    return pd.DataFrame(filas, columns=columnas, dtype=object)
+
+
+def _limites(leg, inicio, pactados):
+    sumar = leg["add_business_days_keep_time"]
+    return pd.to_datetime(pd.Series([sumar(i, int(n)) for i, n in zip(inicio, pactados)], index=inicio.index))
+
+
+def _textos_dias(rng, n):
+    """'N días HH:MM' como los que escribe calculos_ans, más los casos borde."""
+    dias = rng.integers(-5, 15, n).astype(str)
+    horas = pd.Series(rng.integers(0, 24, n)).map("{:02d}".format) + ":" + pd.Series(rng.integers(0, 60, n)).map("{:02d}".format)
+    # Arreglo object antes de la Serie: los casos borde no son texto (None, NaN, números)
+    textos = np.array(pd.Series(dias) + " días " + horas, dtype=object)
+    casos = rng.random(n) < 0.2
+    textos[casos] = pd.Series(CASOS_DIAS, dtype=object).sample(casos.sum(), replace=True, random_state=rng).to_numpy()
+    return pd.Series(textos, dtype=object)
+
+
+def _merge_almacen(leg, rng, pedidos, n):
+    """Filas tipo CONTROL_ALMACEN con pares base/complemento en el mismo pedido."""
+    pares = [c for par in leg["complementos"].items() for c in par]
+    df = pd.DataFrame({
+        "pedido": rng.choice(pedidos, n),
+        "codigo": np.where(rng.random(n) < 0.6, rng.choice(pares, n), rng.choice(MATERIALES, n)),
+        "cantidad_fenix": rng.integers(0, 5, n).astype(float),
+        "cantidad_elite": rng.integers(0, 5, n).astype(float),
+    })
+    df["diferencia"] = df["cantidad_fenix"] - df["cantidad_elite"]
+    df["estado"] = df.apply(leg["evaluar"], axis=1)
+    return df
+
+
+def entradas_generadas(leg, filas, semilla):
+    rng = np.random.default_rng(semilla)
+    referencia = datetime(2025, 12, 5, 11, 37)
+    with tempfile.TemporaryDirectory() as carpeta:
+        generar_datos(carpeta, filas, semilla, referencia=referencia)
+        pend = pd.read_csv(next(Path(carpeta).glob("pendientes_*.csv")), dtype=str, encoding="latin-1")
+        digit = pd.read_csv(Path(carpeta) / "Digitacion Fenix.txt", sep="|", dtype=str, encoding="latin-1")
+
+    entradas = {
+        "tipo_direccion": pd.concat([
+            pend[["DIRECCION", "TIPO_DIRECCION"]],
+            _producto(CASOS_DIRECCION, CASOS_TIPO, columnas=["DIRECCION", "TIPO_DIRECCION"]),
+        ], ignore_index=True),
+        "dias_pactados": pd.concat([
+            pend[["ACTIVIDAD", "TIPO_DIRECCION"]],
+            _producto(CASOS_ACTIVIDAD, CASOS_TIPO, columnas=["ACTIVIDAD", "TIPO_DIRECCION"]),
+        ], ignore_index=True),
+    }
+
+    inicio = pd.to_datetime(pend["FECHA_INICIO_ANS"], format="%d/%m/%Y %H:%M:%S")
+    pactados = legado_dias_pactados(pend, leg)
+    ahoras = pd.Timestamp(referencia) + pd.to_timedelta(rng.integers(-5 * 86400, 20 * 86400, 40), unit="s")
+    entradas["dias_restantes"] = pd.DataFrame({
+        "AHORA": rng.choice(ahoras, len(pend)),
+        "FECHA_INICIO_ANS": inicio,
+        "FECHA_LIMITE_ANS": _limites(leg, inicio, pactados),
+    })
+
+    pedidos = pend["PEDIDO"].to_numpy(dtype=object, copy=True)
+    pedidos[rng.random(len(pedidos)) < 0.05] = " " + pedidos[0] + " "
+    estado = pd.DataFrame({
+        "PEDIDO": pedidos,
+        "REPORTE_TECNICO": pd.Series(CASOS_REPORTE, dtype=object).sample(len(pend), replace=True, random_state=rng).to_numpy(),
+        "DIAS_RESTANTES": _textos_dias(rng, len(pend)),
+    })
+    estado.attrs["pedidos_digitacion"] = set(digit["pedido"].astype(str).str.strip())
+    entradas["estado_fenix"] = estado
+
+    diferencias = np.concatenate([rng.integers(-3, 4, filas).astype(float), CASOS_DIFERENCIA])
+    entradas["evaluar"] = pd.DataFrame({"diferencia": diferencias})
+    entradas["complementarios"] = _merge_almacen(leg, rng, digit["pedido"].unique()[:200], filas)
+    return entradas
+
+
+def entradas_barrido(leg, muestra, semilla):
+    """Un 'ahora' por día de DESDE a HASTA, con 'muestra' inicios/límites alrededor."""
+    rng = np.random.default_rng(semilla)
+    dias = pd.date_range(DESDE, HASTA, freq="D")
+    n = len(dias) * muestra
+    ahora = pd.Series(np.repeat(dias.to_numpy(), muestra)) + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")
+    # Algunos "ahora" con microsegundos, como datetime.now()
+    ahora += pd.to_timedelta(np.where(rng.random(n) < 0.3, rng.integers(0, 10**6, n), 0), unit="us")
+    # Un solo "ahora" por día: el legado se corre una vez por reloj
+    ahora = ahora.groupby(np.repeat(np.arange(len(dias)), muestra)).transform("first")
+
+    inicio = ahora.dt.normalize() + pd.to_timedelta(rng.integers(-25, 4, n), unit="D") \
+        + pd.to_timedelta(rng.integers(0, 86400, n), unit="s")
+    pactados = rng.choice(sorted({d for t in leg["DIAS_PACTADOS_MAP"].values() for d in t.values()}), n)
+    limite = _limites(leg, inicio, pactados)
+
+    # Límites puestos a mano alrededor del corte
+    hoy = ahora.dt.normalize().to_numpy().astype("datetime64[D]")
+    siguiente = pd.Series(np.busday_offset(hoy, 1, roll="forward", weekmask=leg["WEEKMASK"],
+                                           holidays=leg["FESTIVOS"]).astype("datetime64[ns]"))
+    hora = ahora - ahora.dt.normalize()
+    segundo = pd.Timedelta(seconds=1)
+    forma = rng.integers(0, 8, n)
+    manual = [
+        ahora.dt.floor("s"),                                              # justo la hora límite
+        ahora.dt.floor("s") + segundo,                                    # un segundo antes del corte
+        ahora.dt.floor("s") - segundo,                                    # recién vencido
+        siguiente + hora,                                                 # siguiente hábil (viernes → lunes)
+        ahora.dt.normalize() + pd.to_timedelta(rng.integers(0, 6, n), unit="D") + (inicio - inicio.dt.normalize()),
+    ]
+    for k, valor in enumerate(manual):
+        limite = limite.where(forma != k, valor)
+
+    barrido = pd.DataFrame({"AHORA": ahora, "FECHA_INICIO_ANS": inicio, "FECHA_LIMITE_ANS": limite})
+    # Sin fecha (el legado devuelve "")
+    barrido.loc[rng.random(n) < 0.01, "FECHA_INICIO_ANS"] = pd.NaT
+    barrido.loc[rng.random(n) < 0.01, "FECHA_LIMITE_ANS"] = pd.NaT
+
+    # Inicios en festivo, con el "ahora" en los días siguientes
+    festivos = pd.to_datetime(leg["FESTIVOS"])
+    inicio_festivo = pd.Series(festivos + pd.Timedelta(hours=10))
+    pactado_festivo = rng.choice(pactados, len(festivos))
+    festivo = pd.DataFrame({
+        "AHORA": inicio_festivo + pd.to_timedelta(rng.integers(0, 15, len(festivos)), unit="D"),
+        "FECHA_INICIO_ANS": inicio_festivo,
+        "FECHA_LIMITE_ANS": _limites(leg, inicio_festivo, pactado_festivo),
+    })
+
+    # Todos los textos de días/horas que puede leer el cruce
+    estado = _producto(
+        [f"{d} días {h:02d}:{m:02d}" for d in range(-3, 16) for h in (0, 7, 23) for m in (0, 1, 59)] + CASOS_DIAS,
+        CASOS_REPORTE, columnas=["DIAS_RESTANTES", "REPORTE_TECNICO"],
+    )
+    estado["PEDIDO"] = rng.choice(["1001", " 1001", "2002", "nan"], len(estado))
+    estado.attrs["pedidos_digitacion"] = {"1001"}
+
+    return {
+        "dias_restantes": pd.concat([barrido, festivo], ignore_index=True),
+        "estado_fenix": estado,
+    }
+
+
+def _leer(ruta, lector, columnas):
+    """None (con aviso) si no se puede leer o le faltan columnas (p. ej. puntero de Git LFS)."""
+    try:
+        df = lector(ruta)
+    except Exception as e:
+        print(f"⚠️ {ruta.relative_to(BASE_DIR)} no se pudo leer ({type(e).__name__}); se omite.")
+        return None
+    faltan = [c for c in columnas if c not in df.columns]
+    if faltan:
+        print(f"⚠️ {ruta.relative_to(BASE_DIR)} no trae {', '.join(faltan)}; se omite.")
+        return None
+    return df
+
+
+def entradas_grabadas(leg):
+    entradas = {}
+    pendientes = sorted((BASE_DIR / "data_raw").glob("pendientes_*.csv"))
+    pend = _leer(pendientes[-1], lambda r: pd.read_csv(r, dtype=str, encoding="latin-1"),
+                 ["DIRECCION", "TIPO_DIRECCION", "ACTIVIDAD"]) if pendientes else None
+    if pend is not None:
+        entradas["tipo_direccion"] = pend[["DIRECCION", "TIPO_DIRECCION"]]
+        entradas["dias_pactados"] = pend[["ACTIVIDAD", "TIPO_DIRECCION"]]
+
+    ans = _leer(BASE_DIR / "data_clean" / "FENIX_ANS.xlsx", lambda r: pd.read_excel(r, sheet_name="FENIX_ANS"),
+                ["FECHA_INICIO_ANS", "FECHA_LIMITE_ANS"])
+    if ans is not None:
+        inicio = pd.to_datetime(ans["FECHA_INICIO_ANS"], errors="coerce")
+        limite = pd.to_datetime(ans["FECHA_LIMITE_ANS"], errors="coerce")
+        # Hoy y el día en que se generó el archivo (último inicio)
+        ahoras = [pd.Timestamp.now(), inicio.max()]
+        entradas["dias_restantes"] = pd.concat([
+            pd.DataFrame({"AHORA": a, "FECHA_INICIO_ANS": inicio, "FECHA_LIMITE_ANS": limite})
+            for a in ahoras if not pd.isna(a)
+        ], ignore_index=True)
+
+        digit = _leer(BASE_DIR / "data_raw" / "Digitacion Fenix.txt",
+                      lambda r: pd.read_csv(r, sep="|", dtype=str, encoding="latin-1", on_bad_lines="skip"),
+                      ["pedido"])
+        if digit is not None and {"PEDIDO", "REPORTE_TECNICO", "DIAS_RESTANTES"} <= set(ans.columns):
+            estado = ans[["PEDIDO", "REPORTE_TECNICO", "DIAS_RESTANTES"]].astype(object)
+            estado.attrs["pedidos_digitacion"] = set(digit["pedido"].astype(str).str.strip())
+            entradas["estado_fenix"] = estado
+
+    almacen = _leer(BASE_DIR / "data_clean" / "CONTROL_ALMACEN.xlsx",
+                    lambda r: pd.read_excel(r, sheet_name="CONTROL_ALMACEN"), REGLAS["complementarios"][2])
+    if almacen is not None:
+        entradas["evaluar"] = almacen[["diferencia"]]
+        entradas["complementarios"] = almacen[REGLAS["complementarios"][2]]
+    return entradas
+
+
+# ============================================================
+# COMPARACIÓN
+# ============================================================
+def _igual(a, b):
+    if isinstance(a, str) != isinstance(b, str):
+        return False
+    try:
+        if pd.isna(a) and pd.isna(b):
+            return True
+    except (TypeError, ValueError):
+        pass
+    return bool(a == b)
+
+
+def comparar(regla, df, leg):
+    legado, nuevo, columnas = REGLAS[regla]
+    t0 = time.perf_counter()
+    a = legado(df, leg)
+    t1 = time.perf_counter()
+    b = nuevo(df, leg)
+    t2 = time.perf_counter()
+
+    iguales = np.fromiter((_igual(x, y) for x, y in zip(a, b)), dtype=bool, count=len(df))
+    distintas = df.loc[~iguales, columnas].assign(LEGADO=a[~iguales].to_numpy(), NUEVO=b[~iguales].to_numpy())
+    return {"regla": regla, "filas": len(df), "distintas": int((~iguales).sum()),
+            "s_legado": t1 - t0, "s_nuevo": t2 - t1}, distintas
+
+
+def correr(reglas=tuple(REGLAS), origenes=tuple(ORIGENES), filas=FILAS, muestra=MUESTRA, semilla=SEMILLA,
+           revision=None):
+    """Devuelve el código de salida: 0 todo igual, 1 alguna fila distinta."""
+    leg = cargar_legados(revision)
+    print(f"🔬 Legado: {revision or 'árbol de trabajo'} · semilla {semilla}")
+    print(f"{'ORIGEN':<10}{'REGLA':<17}{'FILAS':>9}{'DISTINTAS':>11}{'LEGADO s':>10}{'NUEVO s':>9}{'×':>7}")
+
+    distintas_por_regla = {r: [] for r in reglas}
+    for origen in origenes:
+        if origen == "generado":
+            entradas = entradas_generadas(leg, filas, semilla)
+        elif origen == "barrido":
+            entradas = entradas_barrido(leg, muestra, semilla)
+        else:
+            entradas = entradas_grabadas(leg)
+
+        for regla in reglas:
+            if regla not in entradas:
+                continue
+            r, distintas = comparar(regla, entradas[regla], leg)
+            veces = r["s_legado"] / r["s_nuevo"] if r["s_nuevo"] else float("nan")
+            marca = "❌" if r["distintas"] else "✅"
+            print(f"{origen:<10}{regla:<17}{r['filas']:>9,}{r['distintas']:>11,}"
+                  f"{r['s_legado']:>10.2f}{r['s_nuevo']:>9.2f}{veces:>6.0f}x {marca}")
+            if r["distintas"]:
+                distintas_por_regla[regla].append(distintas.assign(ORIGEN=origen))
+
+    RUTA_RESULTADOS.mkdir(parents=True, exist_ok=True)
+    con_diferencias = []
+    for regla, partes in distintas_por_regla.items():
+        ruta = RUTA_RESULTADOS / f"equivalencia_{regla}.csv"
+        if not partes:
+            ruta.unlink(missing_ok=True)   # no dejar resultados viejos que confundan
+            continue
+        con_diferencias.append(regla)
+        distintas = pd.concat(partes)
+        distintas.to_csv(ruta, index=False, encoding="utf-8-sig")
+        print(f"\n❌ {regla}: {len(distintas):,} filas distintas → {ruta.relative_to(BASE_DIR)}")
+        print(distintas.head(MAX_MOSTRAR).to_string(index=False))
+
+    if con_diferencias:
+        return 1
+    print("\n✅ Legado y vectorizado dan el mismo resultado en todas las filas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Compara las reglas fila a fila contra las vectorizadas")
+    parser.add_argument("--reglas", nargs="+", choices=list(REGLAS), default=list(REGLAS))
+    parser.add_argument("--origenes", nargs="+", choices=ORIGENES, default=ORIGENES)
+    parser.add_argument("--filas", type=int, default=FILAS, help="Filas sintéticas del origen 'generado'")
+    parser.add_argument("--muestra", type=int, default=MUESTRA, help="Inicios por día en el barrido 2025-2028")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--legado", default=None, help="Commit del que se toma el código legado (git show)")
+    args = parser.parse_args()
+
+    sys.exit(correr(args.reglas, args.origenes, args.filas, args.muestra, args.semilla, args.legado))
@@ -0,0 +1,177 @@
+"""
+------------------------------------------------------------
+GUARDIA DE REGRESIONES DE RENDIMIENTO – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Corre benchmark/correr_benchmark.py con datos sintéticos de
+  semilla fija (mismos parámetros que la línea base) y compara
+  cada etapa contra benchmark/linea_base.json:
+    · tiempo mediano de la etapa
+    · pico de memoria (RSS) del proceso de la etapa
+- Falla (código 1) con una tabla por etapa si alguna supera la
+  línea base por encima del umbral, si dejó de terminar bien o
+  si no tiene línea base válida (falta o no terminó "ok").
+  Diferencias menores a MINIMO_SEGUNDOS / MINIMO_MB no cuentan
+  (ruido de arranque en conjuntos pequeños).
+- --actualizar guarda la corrida como nueva línea base: después
+  de una mejora aceptada o al cambiar de equipo de referencia.
+  No la guarda si alguna etapa no terminó bien.
+- Uso: python -m benchmark.guardia_regresiones
+       python -m benchmark.guardia_regresiones --umbral 0.15 --umbral-memoria 0.30
+       python -m benchmark.guardia_regresiones --actualizar
+------------------------------------------------------------
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmark.correr_benchmark import BASE_DIR, ETAPAS, benchmark, entorno
+
+RUTA_LINEA_BASE = BASE_DIR / "benchmark" / "linea_base.json"
+
+FILAS = 2_000          # merge_actas y mano_obra aún son cuadráticos: más filas = minutos
+REPETICIONES = 3
+SEMILLA = 2025
+UMBRAL = 0.25          # +25 % de tiempo
+UMBRAL_MEMORIA = 0.25  # +25 % de pico RSS
+MINIMO_SEGUNDOS = 0.5
+MINIMO_MB = 20
+
+
+def linea_base_de(reporte):
+    """Lo que se guarda en linea_base.json a partir de un reporte del benchmark."""
+    tamano = reporte["tamanos"][0]
+    return {
+        "fecha": reporte["fecha"],
+        "entorno": reporte["entorno"],
+        "parametros": dict(reporte["parametros"], filas=tamano["filas"]),
+        "etapas": {
+            nombre: {"estado": e["estado"], "segundos": e["segundos"], "rss_pico_mb": e["rss_pico_mb"]}
+            for nombre, e in tamano["etapas"].items()
+        },
+    }
+
+
+def _variacion(actual, base):
+    return None if actual is None or not base else actual / base - 1
+
+
+def comparar(base, actual, umbral=UMBRAL, umbral_memoria=UMBRAL_MEMORIA):
+    """Una fila por etapa con la variación y si cuenta como regresión."""
+    filas = []
+    for nombre in ETAPAS:
+        b, a = base["etapas"].get(nombre), actual["etapas"].get(nombre)
+        if a is None:
+            continue
+        fila = {
+            "etapa": nombre,
+            "segundos_base": b and b["segundos"],
+            "segundos": a["segundos"],
+            "rss_base": b and b["rss_pico_mb"],
+            "rss": a["rss_pico_mb"],
+            "motivos": [],
+        }
+        if b is None or b["estado"] != "ok":
+            # Sin contra qué comparar la etapa no queda vigilada: se regenera con --actualizar
+            fila["motivos"].append("sin línea base válida" if b is None else f"línea base en {b['estado']}")
+            fila["regresion"] = True
+            filas.append(fila)
+            continue
+
+        if a["estado"] != "ok":
+            fila["motivos"].append(f"antes ok, ahora {a['estado']}")
+        else:
+            fila["var_tiempo"] = _variacion(a["segundos"], b["segundos"])
+            if fila["var_tiempo"] is not None and fila["var_tiempo"] > umbral \
+                    and a["segundos"] - b["segundos"] >= MINIMO_SEGUNDOS:
+                fila["motivos"].append(f"tiempo +{fila['var_tiempo']:.0%}")
+            fila["var_memoria"] = _variacion(a["rss_pico_mb"], b["rss_pico_mb"])
+            if fila["var_memoria"] is not None and fila["var_memoria"] > umbral_memoria \
+                    and a["rss_pico_mb"] - b["rss_pico_mb"] >= MINIMO_MB:
+                fila["motivos"].append(f"memoria +{fila['var_memoria']:.0%}")
+        fila["regresion"] = bool(fila["motivos"])
+        filas.append(fila)
+    return filas
+
+
+def tabla(filas):
+    def num(valor, formato):
+        return "—" if valor is None else formato.format(valor)
+
+    lineas = [
+        f"{'ETAPA':<17}{'BASE s':>9}{'AHORA s':>9}{'Δ TIEMPO':>10}{'BASE MB':>9}{'AHORA MB':>10}{'Δ MEM':>8}  RESULTADO",
+    ]
+    for f in filas:
+        resultado = ("❌ " if f["regresion"] else "✅ ") + (", ".join(f["motivos"]) or "ok")
+        lineas.append(
+            f"{f['etapa']:<17}{num(f['segundos_base'], '{:.2f}'):>9}{num(f['segundos'], '{:.2f}'):>9}"
+            f"{num(f.get('var_tiempo'), '{:+.0%}'):>10}{num(f['rss_base'], '{:.0f}'):>9}"
+            f"{num(f['rss'], '{:.0f}'):>10}{num(f.get('var_memoria'), '{:+.0%}'):>8}  {resultado}"
+        )
+    return "\n".join(lineas)
+
+
+def correr_guardia(umbral=UMBRAL, umbral_memoria=UMBRAL_MEMORIA, actualizar=False, ruta_base=RUTA_LINEA_BASE,
+                   filas=FILAS, repeticiones=REPETICIONES):
+    """Devuelve el código de salida: 0 sin regresiones, 1 con regresiones, 2 sin línea base."""
+    ruta_base = Path(ruta_base)
+    base = json.loads(ruta_base.read_text(encoding="utf-8")) if ruta_base.exists() else None
+    if base is None and not actualizar:
+        print(f"⚠️ No existe {ruta_base.name}. Créala con: python -m benchmark.guardia_regresiones --actualizar")
+        return 2
+
+    # Los mismos datos que la línea base (tamaño, semilla y sesgos)
+    parametros = base["parametros"] if base and not actualizar else {
+        "filas": filas, "semilla": SEMILLA, "repeticiones": repeticiones,
+        "sesgo_actividad": 1.0, "duplicados": 0.05, "coordenadas_malas": 0.03,
+    }
+    if base and base["entorno"] != entorno() and not actualizar:
+        print(f"⚠️ La línea base se midió en otro entorno: {base['entorno']}")
+        print(f"   Este equipo: {entorno()}")
+
+    reporte = benchmark(
+        [parametros["filas"]], ETAPAS, parametros["repeticiones"], parametros["semilla"],
+        sesgo_actividad=parametros["sesgo_actividad"], duplicados=parametros["duplicados"],
+        coordenadas_malas=parametros["coordenadas_malas"],
+    )
+    actual = linea_base_de(reporte)
+
+    if actualizar:
+        fallidas = [f"{nombre} ({e['estado']})" for nombre, e in actual["etapas"].items() if e["estado"] != "ok"]
+        if fallidas:
+            print(f"\n❌ No se guarda la línea base: etapas que no terminaron bien: {', '.join(fallidas)}")
+            return 1
+        ruta_base.write_text(json.dumps(actual, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+        print(f"\n💾 Línea base actualizada: {ruta_base}")
+        return 0
+
+    filas_tabla = comparar(base, actual, umbral, umbral_memoria)
+    print(f"\n📏 Contra la línea base del {base['fecha']} (umbral tiempo +{umbral:.0%}, memoria +{umbral_memoria:.0%})")
+    print(tabla(filas_tabla))
+
+    regresiones = [f["etapa"] for f in filas_tabla if f["regresion"]]
+    if regresiones:
+        print(f"\n❌ Regresión de rendimiento (o sin línea base) en: {', '.join(regresiones)}")
+        return 1
+    print("\n✅ Sin regresiones de rendimiento.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Compara el benchmark contra la línea base guardada")
+    parser.add_argument("--umbral", type=float, default=UMBRAL, help="Aumento de tiempo tolerado (0.25 = 25 %%)")
+    parser.add_argument("--umbral-memoria", type=float, default=UMBRAL_MEMORIA, help="Aumento de pico RSS tolerado")
+    parser.add_argument("--actualizar", action="store_true", help="Guarda esta corrida como nueva línea base")
+    parser.add_argument("--filas", type=int, default=FILAS, help="Con --actualizar: tamaño de la línea base")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES, help="Con --actualizar: repeticiones por etapa")
+    parser.add_argument("--linea-base", default=str(RUTA_LINEA_BASE))
+    args = parser.parse_args()
+
+    sys.exit(correr_guardia(args.umbral, args.umbral_memoria, args.actualizar, args.linea_base,
+                            args.filas, args.repeticiones))
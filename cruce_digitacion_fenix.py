@@ -14,6 +14,14 @@ ningún formato condicional ni tabla estructurada.
 import pandas as pd
 from pathlib import Path
 import unicodedata
+from openpyxl.styles import PatternFill
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.formatting.rule import Rule
+from openpyxl.utils import get_column_letter
+
+from modules.etapas_memoria import abrir_libro, guardar_libro, como_texto, hoja_como_texto, leer_precargado
+from modules.instrumentacion import iniciar_paso, medido
+from modules.tablas_etapas import guardar_tabla, leer_tabla
 
 # ============================================================
 # 1️⃣ RUTAS BASE
@@ -25,10 +33,6 @@ ruta_fenix_ans = base_path / "data_clean" / "FENIX_ANS.xlsx"
 ruta_digitacion = base_path / "data_raw" / "Digitacion Fenix.txt"
 ruta_repo = base_path / "data_clean" / "REPOSITORIO_PEDIDOS_CERRADOS.xlsx"
 
-print("------------------------------------------------------------")
-print("🔄 Iniciando CRUCE DIGITACIÓN FÉNIX v5.5 (Ligera y Segura)...")
-print(f"📂 Base detectada: {base_path}")
-print("------------------------------------------------------------")
 
 # ============================================================
 # 2️⃣ DETECCIÓN Y LECTURA AUTOMÁTICA
@@ -50,17 +54,15 @@ def leer_txt_seguro(ruta, sep):
             continue
     raise Exception("❌ No se pudo leer Digitación Fénix con ninguna codificación.")
 
-sep = detectar_separador(ruta_digitacion)
-df_txt = leer_txt_seguro(ruta_digitacion, sep)
-df_ans = pd.read_excel(ruta_fenix_ans, sheet_name="FENIX_ANS", dtype=str)
 
-# ============================================================
-# 3️⃣ NORMALIZACIÓN Y PREPARACIÓN
-# ============================================================
-df_txt.columns = [c.strip().upper() for c in df_txt.columns]
-col_pedido = next((c for c in df_txt.columns if "PEDID" in c.upper()), None)
-if not col_pedido:
-    raise Exception("❌ No se encontró columna de pedido en Digitación Fénix.")
+def leer_digitacion(ruta):
+    return leer_txt_seguro(ruta, detectar_separador(ruta))
+
+
+def entradas_crudas():
+    """(ruta, lector) que el worker puede empezar a leer en paralelo."""
+    return [(ruta_digitacion, leer_digitacion)]
+
 
 def limpiar_texto(txt):
     if not isinstance(txt, str):
@@ -69,14 +71,11 @@ def limpiar_texto(txt):
     txt = txt.encode("ascii", "ignore").decode("utf-8")
     return txt.strip().upper()
 
-df_ans["PEDIDO"] = df_ans["PEDIDO"].astype(str).str.strip().str.replace(".0", "", regex=False)
-df_txt[col_pedido] = df_txt[col_pedido].astype(str).str.strip().str.replace(".0", "", regex=False)
-pedidos_digitacion = set(df_txt[col_pedido].unique())
 
 # ============================================================
 # 4️⃣ ACTUALIZACIÓN DE ESTADO_FENIX
 # ============================================================
-def calcular_estado_fenix(row):
+def calcular_estado_fenix(row, pedidos_digitacion):
     pedido = str(row.get("PEDIDO", "")).strip()
     reporte = limpiar_texto(row.get("REPORTE_TECNICO", ""))
 
@@ -121,142 +120,188 @@ def calcular_estado_fenix(row):
     return "ABIERTO"
 
 
-df_ans["ESTADO_FENIX"] = df_ans.apply(calcular_estado_fenix, axis=1)
-print("🧩 Columna ESTADO_FENIX actualizada correctamente (sin tocar formato).")
-
 # ============================================================
-# 5️⃣ MOVER PEDIDOS CERRADOS AL REPOSITORIO (SIN DUPLICAR COLUMNAS)
+# 7️⃣ FORMATO CONDICIONAL DE ESTADO_FENIX
 # ============================================================
-cerrados = df_ans[df_ans["ESTADO_FENIX"] == "CERRADO"].copy()
-
-if not cerrados.empty:
-    print(f"📦 {len(cerrados)} pedidos cerrados serán movidos al repositorio histórico.")
-
-    # ➤ Columnas que DEBEN quedar finalmente en el repositorio
-    columnas_repo = [
-        "PEDIDO", "PRODUCTO_ID", "TIPO_TRABAJO", "TIPO_ELEMENTO_ID",
-        "FECHA_RECIBIDO", "FECHA_INICIO_ANS", "CLIENTEID", "NOMBRE_CLIENTE",
-        "TELEFONO_CONTACTO", "CELULAR_CONTACTO", "DIRECCION",
-        "ESTADO_FENIX"
-    ]
-
-    # ➤ Filtrar solo las columnas que existan realmente
-    columnas_existentes = [c for c in columnas_repo if c in cerrados.columns]
-    cerrados = cerrados[columnas_existentes]
-
-    # ➤ Cargar repositorio (si existe)
-    if ruta_repo.exists():
-        repo = pd.read_excel(ruta_repo, dtype=str)
-
-        # Asegurar que el repositorio tenga SOLO estas columnas
-        columnas_repo_existentes = [c for c in columnas_repo if c in repo.columns]
-        repo = repo[columnas_repo_existentes]
-
-        # Unir sin duplicar columnas NUNCA
-        repo = pd.concat([repo, cerrados], ignore_index=True)
-
-        # Eliminar duplicados por PEDIDO
-        repo.drop_duplicates(subset=["PEDIDO"], keep="last", inplace=True)
-
-    else:
-        repo = cerrados.copy()
-
-    # Guardar limpio y ordenado
-    repo.to_excel(ruta_repo, index=False)
-    print("💾 Repositorio actualizado SIN duplicar columnas.")
-
-    # Eliminar CERRADO del archivo principal
-    df_ans = df_ans[df_ans["ESTADO_FENIX"] != "CERRADO"]
+def regla_contiene(texto, color_hex, col_letra):
+    fill = PatternFill(start_color=color_hex, end_color=color_hex, fill_type="solid")
+    dxf = DifferentialStyle(fill=fill)
 
-else:
-    print("ℹ️ No se encontraron pedidos cerrados para mover.")
+    regla = Rule(type="containsText", operator="containsText", text=texto, dxf=dxf)
+    regla.formula = [f'NOT(ISERROR(SEARCH("{texto}",${col_letra}2)))']
+    return regla
 
 
 # ============================================================
-# 6️⃣ GUARDAR RESULTADOS (ACTUALIZA SOLO COLUMNA ESTADO_FENIX)
+# ETAPA COMPLETA (importable desde el worker del panel)
 # ============================================================
-from openpyxl import load_workbook
-
-wb = load_workbook(ruta_fenix_ans, keep_vba=True)
-ws = wb["FENIX_ANS"]
-
-# 🔹 Crear mapa {pedido: estado} sin .0, espacios o diferencias de tipo
-mapa_estados = {
-    str(k).split(".")[0].strip().upper(): v
-    for k, v in zip(df_ans["PEDIDO"], df_ans["ESTADO_FENIX"])
-}
-
-col_pedido = None
-col_estado = None
-for idx, cell in enumerate(ws[1], 1):
-    nombre = str(cell.value).strip().upper() if cell.value else ""
-    if nombre == "PEDIDO":
-        col_pedido = idx
-    elif nombre == "ESTADO_FENIX":
-        col_estado = idx
-
-actualizados = 0
-cerrados = 0
-if col_pedido and col_estado:
-    for i in range(2, ws.max_row + 1):
-        pedido_excel = str(ws.cell(i, col_pedido).value).split(".")[0].strip().upper()
-        if pedido_excel in mapa_estados:
-            nuevo_estado = mapa_estados[pedido_excel]
-            ws.cell(i, col_estado).value = nuevo_estado
-            actualizados += 1
-            if nuevo_estado == "CERRADO":
-                cerrados += 1
-
-    print(f"✅ {actualizados} filas actualizadas en la columna ESTADO_FENIX.")
-    print(f"📦 {cerrados} pedidos marcados como CERRADO (serán movidos al repositorio).")
-else:
-    print("⚠️ No se encontraron columnas PEDIDO o ESTADO_FENIX en la hoja.")
-
-# ============================================================
-# 7️⃣ APLICAR FORMATO CONDICIONAL A ESTADO_FENIX
-# ============================================================
-from openpyxl.styles import PatternFill
-from openpyxl.formatting.rule import Rule
+@medido("cruce_digitacion", "total")
+def ejecutar(df_ans=None):
+    """
+    Actualiza ESTADO_FENIX en FENIX_ANS.xlsx según Digitación Fénix.
+    'df_ans' es la salida de calculos_ans.ejecutar(); sin él se lee la hoja.
+    Devuelve la hoja FENIX_ANS como quedó guardada (texto).
+    """
+    print("------------------------------------------------------------")
+    print("🔄 Iniciando CRUCE DIGITACIÓN FÉNIX v5.5 (Ligera y Segura)...")
+    print(f"📂 Base detectada: {base_path}")
+    print("------------------------------------------------------------")
+
+    paso = iniciar_paso("cruce_digitacion", "leer")
+    df_txt = leer_precargado(ruta_digitacion, leer_digitacion)
+    if df_ans is None:
+        df_ans = leer_tabla(ruta_fenix_ans, hoja="FENIX_ANS")
+    else:
+        df_ans = como_texto(df_ans)
+    paso.cerrar(entrada=len(df_txt), salida=len(df_ans))
+
+    paso = iniciar_paso("cruce_digitacion", "transformar")
+
+    # ============================================================
+    # 3️⃣ NORMALIZACIÓN Y PREPARACIÓN
+    # ============================================================
+    df_txt.columns = [c.strip().upper() for c in df_txt.columns]
+    col_pedido = next((c for c in df_txt.columns if "PEDID" in c.upper()), None)
+    if not col_pedido:
+        raise Exception("❌ No se encontró columna de pedido en Digitación Fénix.")
+
+    df_ans["PEDIDO"] = df_ans["PEDIDO"].astype(str).str.strip().str.replace(".0", "", regex=False)
+    df_txt[col_pedido] = df_txt[col_pedido].astype(str).str.strip().str.replace(".0", "", regex=False)
+    pedidos_digitacion = set(df_txt[col_pedido].unique())
+
+    # ============================================================
+    # 4️⃣ ACTUALIZACIÓN DE ESTADO_FENIX
+    # ============================================================
+    df_ans["ESTADO_FENIX"] = df_ans.apply(calcular_estado_fenix, axis=1, args=(pedidos_digitacion,))
+    print("🧩 Columna ESTADO_FENIX actualizada correctamente (sin tocar formato).")
+    paso.cerrar(entrada=len(df_ans), salida=len(df_ans))
+
+    # ============================================================
+    # 5️⃣ MOVER PEDIDOS CERRADOS AL REPOSITORIO (SIN DUPLICAR COLUMNAS)
+    # ============================================================
+    paso = iniciar_paso("cruce_digitacion", "repositorio")
+    cerrados = df_ans[df_ans["ESTADO_FENIX"] == "CERRADO"].copy()
+    paso.filas(entrada=len(cerrados))
+
+    if not cerrados.empty:
+        print(f"📦 {len(cerrados)} pedidos cerrados serán movidos al repositorio histórico.")
+
+        # ➤ Columnas que DEBEN quedar finalmente en el repositorio
+        columnas_repo = [
+            "PEDIDO", "PRODUCTO_ID", "TIPO_TRABAJO", "TIPO_ELEMENTO_ID",
+            "FECHA_RECIBIDO", "FECHA_INICIO_ANS", "CLIENTEID", "NOMBRE_CLIENTE",
+            "TELEFONO_CONTACTO", "CELULAR_CONTACTO", "DIRECCION",
+            "ESTADO_FENIX"
+        ]
+
+        # ➤ Filtrar solo las columnas que existan realmente
+        columnas_existentes = [c for c in columnas_repo if c in cerrados.columns]
+        cerrados = cerrados[columnas_existentes]
+
+        # ➤ Cargar repositorio (si existe)
+        if ruta_repo.exists():
+            repo = pd.read_excel(ruta_repo, dtype=str)
+
+            # Asegurar que el repositorio tenga SOLO estas columnas
+            columnas_repo_existentes = [c for c in columnas_repo if c in repo.columns]
+            repo = repo[columnas_repo_existentes]
+
+            # Unir sin duplicar columnas NUNCA
+            repo = pd.concat([repo, cerrados], ignore_index=True)
+
+            # Eliminar duplicados por PEDIDO
+            repo.drop_duplicates(subset=["PEDIDO"], keep="last", inplace=True)
+
+        else:
+            repo = cerrados.copy()
+
+        # Guardar limpio y ordenado
+        repo.to_excel(ruta_repo, index=False)
+        print("💾 Repositorio actualizado SIN duplicar columnas.")
+
+        # Eliminar CERRADO del archivo principal
+        df_ans = df_ans[df_ans["ESTADO_FENIX"] != "CERRADO"]
 
-col = col_estado
-max_row = ws.max_row
-rango = f"{ws.cell(2, col).coordinate}:{ws.cell(max_row, col).coordinate}"
+    else:
+        print("ℹ️ No se encontraron pedidos cerrados para mover.")
+    paso.cerrar(salida=len(df_ans))
+
+    # ============================================================
+    # 6️⃣ GUARDAR RESULTADOS (ACTUALIZA SOLO COLUMNA ESTADO_FENIX)
+    # ============================================================
+    paso = iniciar_paso("cruce_digitacion", "escribir")
+    wb = abrir_libro(ruta_fenix_ans, keep_vba=True)
+    ws = wb["FENIX_ANS"]
+
+    # 🔹 Crear mapa {pedido: estado} sin .0, espacios o diferencias de tipo
+    mapa_estados = {
+        str(k).split(".")[0].strip().upper(): v
+        for k, v in zip(df_ans["PEDIDO"], df_ans["ESTADO_FENIX"])
+    }
+
+    col_pedido = None
+    col_estado = None
+    for idx, cell in enumerate(ws[1], 1):
+        nombre = str(cell.value).strip().upper() if cell.value else ""
+        if nombre == "PEDIDO":
+            col_pedido = idx
+        elif nombre == "ESTADO_FENIX":
+            col_estado = idx
+
+    actualizados = 0
+    cerrados = 0
+    if col_pedido and col_estado:
+        for i in range(2, ws.max_row + 1):
+            pedido_excel = str(ws.cell(i, col_pedido).value).split(".")[0].strip().upper()
+            if pedido_excel in mapa_estados:
+                nuevo_estado = mapa_estados[pedido_excel]
+                ws.cell(i, col_estado).value = nuevo_estado
+                actualizados += 1
+                if nuevo_estado == "CERRADO":
+                    cerrados += 1
+
+        print(f"✅ {actualizados} filas actualizadas en la columna ESTADO_FENIX.")
+        print(f"📦 {cerrados} pedidos marcados como CERRADO (serán movidos al repositorio).")
+    else:
+        print("⚠️ No se encontraron columnas PEDIDO o ESTADO_FENIX en la hoja.")
 
-from openpyxl.styles import PatternFill
-from openpyxl.styles.differential import DifferentialStyle
-from openpyxl.formatting.rule import Rule
-from openpyxl.utils import get_column_letter
+    # ============================================================
+    # 7️⃣ APLICAR FORMATO CONDICIONAL A ESTADO_FENIX
+    # ============================================================
+    col = col_estado
+    max_row = ws.max_row
+    rango = f"{ws.cell(2, col).coordinate}:{ws.cell(max_row, col).coordinate}"
 
-col_letra = get_column_letter(col_estado)
+    col_letra = get_column_letter(col_estado)
 
-def regla_contiene(texto, color_hex):
-    fill = PatternFill(start_color=color_hex, end_color=color_hex, fill_type="solid")
-    dxf = DifferentialStyle(fill=fill)
+    # 🟩 Verde
+    ws.conditional_formatting.add(rango, regla_contiene("A TIEMPO", "00FF00", col_letra))
 
-    regla = Rule(type="containsText", operator="containsText", text=texto, dxf=dxf)
-    regla.formula = [f'NOT(ISERROR(SEARCH("{texto}",${col_letra}2)))']
-    return regla
+    # 🟨 Amarillo
+    ws.conditional_formatting.add(rango, regla_contiene("ALERTA", "FFFF00", col_letra))
 
-# 🟩 Verde
-ws.conditional_formatting.add(rango, regla_contiene("A TIEMPO", "00FF00"))
+    # 🟧 Naranja
+    ws.conditional_formatting.add(rango, regla_contiene("ALERTA_0_DIAS", "FFC000", col_letra))
 
-# 🟨 Amarillo
-ws.conditional_formatting.add(rango, regla_contiene("ALERTA", "FFFF00"))
+    # 🔴 Rojo (único estado CRÍTICO)
+    ws.conditional_formatting.add(rango, regla_contiene("CRÍTICO", "FF0000", col_letra))
 
-# 🟧 Naranja
-ws.conditional_formatting.add(rango, regla_contiene("ALERTA_0_DIAS", "FFC000"))
+    # 🟦 Azul
+    ws.conditional_formatting.add(rango, regla_contiene("ABIERTO", "8FAADC", col_letra))
 
-# 🔴 Rojo (único estado CRÍTICO)
-ws.conditional_formatting.add(rango, regla_contiene("CRÍTICO", "FF0000"))
+    # 🟪 Morado
+    ws.conditional_formatting.add(rango, regla_contiene("CERRADO", "7030A0", col_letra))
 
-# 🟦 Azul
-ws.conditional_formatting.add(rango, regla_contiene("ABIERTO", "8FAADC"))
+    print("🎨 Formatos condicionales aplicados correctamente.")
 
-# 🟪 Morado
-ws.conditional_formatting.add(rango, regla_contiene("CERRADO", "7030A0"))
+    guardar_libro(wb, ruta_fenix_ans)
+    print("💾 Archivo guardado correctamente preservando formatos.")
+    print("------------------------------------------------------------")
+    hoja = hoja_como_texto(ws)
+    guardar_tabla(hoja, ruta_fenix_ans)
+    paso.cerrar(entrada=len(df_ans), salida=len(hoja))
+    return hoja
 
-print("🎨 Formatos condicionales aplicados correctamente.")
 
-wb.save(ruta_fenix_ans)
-print("💾 Archivo guardado correctamente preservando formatos.")
-print("------------------------------------------------------------")
+if __name__ == "__main__":
+    ejecutar()
@@ -1,15 +1,26 @@
 import os
 import io
+import re
+import json
+import argparse
 import time
+import queue
+import threading
 import gspread
 import pandas as pd
 from datetime import datetime, timedelta
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.http import MediaIoBaseDownload
-from gspread.utils import rowcol_to_a1
 from pathlib import Path
-import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from modules.almacen_blobs import AlmacenBlobs, hash_archivo
+from modules.clientes_google import (
+    cliente_gspread, imprimir_estadisticas, servicio_drive, sesion_google, url_contenido_drive
+)
+from modules.compresion_evidencias import comprimir_evidencia
+from modules.descarga_reanudable import descargar_reanudable, DescargaError
+from modules.drive_metadatos import obtener_metadatos
+from modules.manifiesto_descargas import ManifiestoDescargas, DESCARGADO
 
 # ============================================================
 # CONFIGURACIÓN BASE
@@ -31,23 +42,39 @@ else:
 
 print(f"📂 Carpeta destino base: {RUTA_DESTINO}")
 
+# ============================================================
+# PARÁMETROS DE DESCARGA EN PARALELO
+# ============================================================
+HILOS_DESCARGA = 6                                        # descargas simultáneas
+PROCESOS_COMPRESION = max(1, (os.cpu_count() or 2) - 1)   # compresión .zip
+
+# Manifiesto local de descargas (file_id → ruta, md5, estado)
+RUTA_MANIFIESTO = Path(__file__).resolve().parent / "data_clean" / "manifiesto_descargas.db"
+
+# Caché del índice pedido → evidencia -(1) y tamaño de cada escritura a Sheets
+RUTA_INDICE_EVIDENCIAS = Path(__file__).resolve().parent / "data_clean" / "indice_evidencias.json"
+CELDAS_POR_ESCRITURA = 1000
+
+# Blobs únicos por contenido (fuera de OneDrive; mismo disco para enlaces duros).
+# Ahorra disco local, no cuota de OneDrive: ver modules/almacen_blobs.py
+RUTA_BLOBS = Path(__file__).resolve().parent / "data_clean" / "blobs_evidencias"
+
 # ============================================================
 # AUTENTICACIÓN GOOGLE DRIVE
 # ============================================================
 def crear_servicio():
-    creds = service_account.Credentials.from_service_account_file(
-        CRED_PATH,
-        scopes=["https://www.googleapis.com/auth/drive"]
-    )
-    return build("drive", "v3", credentials=creds)
+    return servicio_drive(CRED_PATH)
+
+
+def crear_sesion():
+    """Sesión HTTP con token renovable para descargar contenido por URL (una por hilo)."""
+    # Sin reintentos en la sesión: descargar_reanudable reintenta desde el checkpoint
+    return sesion_google(CRED_PATH, reintentos=0)
 # ============================================================
 # CONECTAR GOOGLE SHEET
 # ============================================================
 def conectar_gspread():
-    creds = service_account.Credentials.from_service_account_file(
-        CRED_PATH, scopes=["https://www.googleapis.com/auth/spreadsheets"]
-    )
-    client = gspread.authorize(creds)
+    client = cliente_gspread(CRED_PATH)
     spreadsheet = client.open_by_key(SHEET_ID)
 
     for ws in spreadsheet.worksheets():
@@ -85,7 +112,16 @@ def leer_google_sheet(service):
 # ============================================================
 # DESCARGAR PDFS + RENOMBRAR + COMPRESIÓN
 # ============================================================
-def descargar_pdfs(service, df):
+PATRON_CONSECUTIVO = re.compile(r"-\((\d+)\)\.")
+
+
+def _consecutivo(nombre):
+    """'EPM-FNX-…-257-(3).pdf' / '.pdf.part' / '.zip' → 3; None si no lleva consecutivo."""
+    m = PATRON_CONSECUTIVO.search(nombre)
+    return int(m.group(1)) if m else None
+
+
+def descargar_pdfs(service, df, desde=None, manifiesto=None, blobs=None):
 
     # Normalizar columnas
     df.columns = (
@@ -112,10 +148,20 @@ def descargar_pdfs(service, df):
         df["fecha_real"] = df[col_fecha].dt.strftime("%Y-%m-%d")
         print("📌 Registros encontrados:", len(df), "\n")
         
-        # 🔥 Solo descargas del día
-        fecha_mas_reciente = df["fecha_real"].max()
-        df = df[df["fecha_real"] == fecha_mas_reciente]
-        print(f"📌 Filtrando solo registros del día: {fecha_mas_reciente} → {len(df)} registros")
+        if desde:
+            # Recuperación: todos los días desde la fecha indicada
+            df = df[df["fecha_real"] >= desde]
+            print(f"📌 Filtrando registros desde {desde} → {len(df)} registros")
+        else:
+            # 🔥 Solo descargas del día
+            fecha_mas_reciente = df["fecha_real"].max()
+            df = df[df["fecha_real"] == fecha_mas_reciente]
+            print(f"📌 Filtrando solo registros del día: {fecha_mas_reciente} → {len(df)} registros")
+
+        if df.empty:
+            # --desde posterior al último registro: nada que bajar ni hipervínculos que actualizar
+            print("⚠️ Ningún registro en el rango. No se descarga nada.")
+            return None
     else:
         fecha_form = datetime.now().strftime("%Y-%m-%d")
         print("⚠️ No se detectó columna fecha. Se procesarán todos los registros.")
@@ -145,27 +191,37 @@ def descargar_pdfs(service, df):
         "REEQU-(TRABAJOS PREPAGO)": "Lina",
         "DIPRE-(RETIRO PREPAGO)": "Lina"
     }
-    def obtener_ruta_destino(actividad, fecha_real):
-        responsable = RESPONSABLES.get(actividad, "Sin_Asignar")
-        carpeta_responsable = RUTA_DESTINO / responsable
-        carpeta_responsable.mkdir(parents=True, exist_ok=True)
-
-        ruta_final = carpeta_responsable / fecha_real / actividad
-        ruta_final.mkdir(parents=True, exist_ok=True)
-        return ruta_final
-
-
-    errores = 0
-    total_encontrados = len(df)
-    total_descargados = 0
-    total_comprimidos = 0
-    total_sin_comprimir = 0
+    carpetas = {}
 
+    def obtener_ruta_destino(actividad, fecha_real):
+        if (actividad, fecha_real) not in carpetas:
+            responsable = RESPONSABLES.get(actividad, "Sin_Asignar")
+            ruta_final = RUTA_DESTINO / responsable / fecha_real / actividad
+            ruta_final.mkdir(parents=True, exist_ok=True)
+            carpetas[(actividad, fecha_real)] = ruta_final
+        return carpetas[(actividad, fecha_real)]
 
     # ====================================================
-    # LOOP PRINCIPAL
+    # PLAN DE DESCARGAS (consecutivos asignados de una vez)
     # ====================================================
-    for i, fila in df.iterrows():
+    total_encontrados = len(df)
+    tareas = []
+    siguiente = {}   # (carpeta, base_name) → próximo consecutivo libre
+    conocidos = manifiesto.estados() if manifiesto else {}
+    # Consecutivos ya reservados en el manifiesto (pendientes sin archivo aún, .part,
+    # comprimidos): (carpeta, base_name) → {n}
+    reservados = {}
+    for previo in conocidos.values():
+        if not previo.get("ruta_local"):
+            continue
+        ruta = Path(previo["ruta_local"])
+        n = _consecutivo(ruta.name)
+        if n is not None:
+            reservados.setdefault((ruta.parent, ruta.name.split("-(")[0]), set()).add(n)
+    vistos = set()
+    omitidos = 0
+
+    for fila in df.to_dict("records"):
 
         pedido = str(fila.get(col_pedido, "")).strip()
         tecnico = str(fila.get(col_tecnico, "")).strip()
@@ -181,86 +237,356 @@ def descargar_pdfs(service, df):
             continue
 
         file_id = url.split("id=")[-1]
+        if file_id in vistos:
+            continue
+        vistos.add(file_id)
 
-        # Validar existencia
-        try:
-            service.files().get(fileId=file_id).execute()
-        except Exception:
+        # Ya descargado en una corrida anterior → se omite sin tocar la red
+        previo = conocidos.get(file_id)
+        if previo and previo["estado"] == DESCARGADO and Path(previo["ruta_local"]).exists():
+            omitidos += 1
+            continue
+
+        tarea = {"file_id": file_id, "pedido": pedido, "fecha_form": fila["fecha_real"]}
+
+        # Pendiente de una corrida interrumpida → mismo nombre que se le asignó
+        if previo:
+            tarea["ruta_local"] = Path(previo["ruta_local"]).with_suffix(".pdf")
+            tareas.append(tarea)
             continue
 
         ruta_destino = obtener_ruta_destino(actividad, fila["fecha_real"])
         base_name = f"EPM-FNX-{pedido}-257"
+        clave = (ruta_destino, base_name)
+
+        # Consecutivos del día: se lee la carpeta una sola vez por pedido
+        # (PDF, ZIP y .part, para no reutilizar el número de un archivo ya
+        # comprimido o a medio bajar) más los reservados en el manifiesto
+        if clave not in siguiente:
+            usados = {0} | reservados.get(clave, set())
+            for e in ruta_destino.glob(f"{base_name}-(*).*"):
+                n = _consecutivo(e.name)
+                if n is not None:
+                    usados.add(n)
+            siguiente[clave] = max(usados) + 1
+
+        consecutivo = siguiente[clave]
+        siguiente[clave] += 1
+
+        tarea["ruta_local"] = ruta_destino / f"{base_name}-({consecutivo}).pdf"
+        tareas.append(tarea)
+
+    # Validar existencia de todos los IDs en lote (100 por petición)
+    metadatos = obtener_metadatos(service, [t["file_id"] for t in tareas])
+    no_existe = sum(1 for t in tareas if not metadatos.get(t["file_id"]))
+    tareas = [t for t in tareas if metadatos.get(t["file_id"])]
+    for t in tareas:
+        t["md5"] = metadatos[t["file_id"]].get("md5Checksum")
+        t["bytes"] = int(metadatos[t["file_id"]].get("size") or 0)
+
+    print(f"📋 {len(tareas)} evidencias por descargar con {HILOS_DESCARGA} hilos "
+          f"({omitidos} ya descargadas, {no_existe} no existen en Drive)\n")
+
+    corrida = None
+    if manifiesto:
+        corrida = manifiesto.iniciar_corrida(desde)
+        manifiesto.planificar(tareas, corrida)
+
+    resumen = ejecutar_descargas(tareas, manifiesto=manifiesto, blobs=blobs)
+    resumen["no_existe"] += no_existe
+
+    if manifiesto:
+        manifiesto.cerrar_corrida(corrida, len(tareas), omitidos, resumen["descargados"],
+                                  resumen["errores"], resumen["bytes"], resumen["segundos"])
+
+    print("\n📊 RESUMEN DESCARGA")
+    print(f"   Registros:           {total_encontrados}")
+    print(f"   Ya descargados:      {omitidos}")
+    print(f"   Descargados:         {resumen['descargados']}")
+    print(f"   Comprimidos:         {resumen['comprimidos']}")
+    print(f"   Sin comprimir:       {resumen['sin_comprimir']}")
+    print(f"   Ahorro compresión:   {resumen['bytes_ahorrados'] / 1048576:.2f} MB "
+          f"(CPU {resumen['cpu_compresion']:.1f} s)")
+    for tipo, t in sorted(resumen["por_tipo"].items()):
+        print(f"      {tipo:<4} {t['archivos']:>4} archivos: {t['antes'] / 1048576:.2f} → "
+              f"{t['despues'] / 1048576:.2f} MB")
+    print(f"   Duplicados (hash):   {resumen['duplicados']}")
+    print(f"   No existen en Drive: {resumen['no_existe']}")
+    print(f"   Errores:             {resumen['errores']}")
+    if blobs:
+        e = blobs.estadisticas()
+        print(f"   Almacén de blobs:    {e['blobs']} únicos / {e['referencias']} archivos "
+              f"({e['ratio_duplicados']:.1%} duplicados, "
+              f"{e['bytes_ahorrados'] / 1048576:.2f} MB ahorrados)")
+
+    return df["fecha_real"].iloc[-1] if col_fecha else fecha_form
 
-        # Verificar consecutivos del día
-        existentes = list(ruta_destino.glob(f"{base_name}-(*).pdf"))
-
-        consecutivo = (
-            max([
-                int(e.stem.split("(")[-1].replace(")", ""))
-                for e in existentes
-            ]) + 1
-            if existentes else 1
+# ============================================================
+# MOTOR DE DESCARGA EN PARALELO
+# ============================================================
+def descargar_archivo(file_id, ruta_local, md5=None, tamano=None):
+    """
+    Descarga un archivo de Drive: reanuda desde el último bloque
+    confirmado, reintenta con espera exponencial y verifica el md5.
+    Devuelve (estado, bytes) con estado OK / ERROR.
+    """
+    try:
+        peso = descargar_reanudable(
+            url_contenido_drive(file_id), ruta_local, crear_sesion(),
+            md5=md5, tamano=tamano,
         )
+        return "OK", peso
+    except DescargaError as e:
+        print(f"⚠️ Error descargando: {e}")
+        return "ERROR", 0
+
+
+def ejecutar_descargas(tareas, hilos=HILOS_DESCARGA, procesos=PROCESOS_COMPRESION,
+                       manifiesto=None, blobs=None):
+    """
+    N hilos descargan desde una cola acotada; cada archivo terminado
+    pasa a un grupo de procesos que lo comprime sin frenar la red.
+    Si hay manifiesto, cada descarga queda registrada al terminar.
+    Si hay almacén de blobs, un contenido ya conocido se enlaza al
+    blob existente y no se vuelve a comprimir.
+    """
+    resumen = {"descargados": 0, "comprimidos": 0, "sin_comprimir": 0,
+               "no_existe": 0, "errores": 0, "bytes": 0, "segundos": 0.0,
+               "bytes_ahorrados": 0, "cpu_compresion": 0.0, "por_tipo": {}, "duplicados": 0}
+    total = len(tareas)
+    if not total:
+        return resumen
+
+    cola = queue.Queue(maxsize=hilos * 2)
+    lock = threading.Lock()
+    compresiones = {}
+    inicio = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool_cpu:
+
+        def trabajador():
+            while True:
+                tarea = cola.get()
+                if tarea is None:
+                    break
+                ruta_local = tarea["ruta_local"]
+                try:
+                    estado, peso = descargar_archivo(tarea["file_id"], ruta_local,
+                                                     tarea.get("md5"), tarea.get("bytes"))
+                except Exception as e:
+                    print(f"❌ {ruta_local.name}: {e}")
+                    estado, peso = "ERROR", 0
+
+                if estado == "OK" and manifiesto:
+                    manifiesto.marcar_descargado(tarea["file_id"], ruta_local, peso)
+
+                # Llegó igual que uno ya procesado → enlace a su blob, sin comprimir otra vez
+                duplicado = None
+                if estado == "OK" and blobs:
+                    tarea["sha256_llegada"] = hash_archivo(ruta_local)
+                    duplicado = blobs.enlazar_llegada(ruta_local, tarea["sha256_llegada"], ajustar_extension=True)
+                    if duplicado and manifiesto:
+                        manifiesto.marcar_compresion(tarea["file_id"], duplicado, "DUPLICADO",
+                                                     duplicado.stat().st_size, 0.0)
+
+                with lock:
+                    if estado == "OK":
+                        resumen["descargados"] += 1
+                        resumen["bytes"] += peso
+                        if duplicado:
+                            resumen["duplicados"] += 1
+                        else:
+                            futuro = pool_cpu.submit(comprimir_evidencia, str(ruta_local))
+                            compresiones[futuro] = tarea
+                    else:
+                        resumen["errores"] += 1
+
+                    hechos = resumen["descargados"] + resumen["errores"]
+                    seg = max(time.perf_counter() - inicio, 1e-6)
+                    marca = "⬇️" if estado == "OK" else "❌"
+                    print(f"{marca} [{hechos}/{total}] {ruta_local.name} "
+                          f"({peso / 1024:.0f} KB) | {hechos / seg:.1f} arch/s, "
+                          f"{resumen['bytes'] / 1048576 / seg:.2f} MB/s")
+
+        trabajadores = [
+            threading.Thread(target=trabajador, name=f"descarga-{n}", daemon=True)
+            for n in range(hilos)
+        ]
+        for t in trabajadores:
+            t.start()
+
+        # put() se bloquea si la cola está llena → memoria acotada
+        for tarea in tareas:
+            cola.put(tarea)
+        for _ in trabajadores:
+            cola.put(None)
+        for t in trabajadores:
+            t.join()
+
+        seg_red = time.perf_counter() - inicio
+
+        for futuro in as_completed(compresiones):
+            tarea = compresiones[futuro]
+            try:
+                r = futuro.result()
+            except Exception as e:
+                print(f"⚠️ Error comprimiendo {tarea['ruta_local'].name}: {e}")
+                resumen["sin_comprimir"] += 1
+                continue
+
+            # Blob con el hash de lo comprimido; dos copias que quedaron iguales → un blob
+            if blobs:
+                ruta_final, duplicado = blobs.incorporar(r["ruta"], tarea.get("sha256_llegada"),
+                                                         ajustar_extension=True)
+                if duplicado:
+                    resumen["duplicados"] += 1
+                    r["ruta"], r["metodo"] = str(ruta_final), "DUPLICADO"
+                    r["bytes_despues"] = ruta_final.stat().st_size
+
+            ahorro = r["bytes_antes"] - r["bytes_despues"]
+            resumen["comprimidos" if ahorro > 0 else "sin_comprimir"] += 1
+            resumen["bytes_ahorrados"] += ahorro
+            resumen["cpu_compresion"] += r["cpu_segundos"]
+            tipo = resumen["por_tipo"].setdefault(r["tipo"], {"archivos": 0, "antes": 0, "despues": 0})
+            tipo["archivos"] += 1
+            tipo["antes"] += r["bytes_antes"]
+            tipo["despues"] += r["bytes_despues"]
+
+            print(f"🗜️ {Path(r['ruta']).name}: {r['bytes_antes'] / 1024:.0f} KB → "
+                  f"{r['bytes_despues'] / 1024:.0f} KB ({r['metodo']}, CPU {r['cpu_segundos']:.2f} s)")
+            if r["error"]:
+                print(f"   ⚠️ {r['error']}")
+            if manifiesto:
+                manifiesto.marcar_compresion(tarea["file_id"], r["ruta"], r["metodo"],
+                                             r["bytes_despues"], r["cpu_segundos"])
+
+    seg_total = time.perf_counter() - inicio
+    resumen["segundos"] = seg_red
+    mb = resumen["bytes"] / 1048576
+    print(f"\n⏱️ Descarga: {total} archivos en {seg_red:.1f} s "
+          f"({total / max(seg_red, 1e-6):.1f} arch/s, {mb / max(seg_red, 1e-6):.2f} MB/s) | "
+          f"total con compresión: {seg_total:.1f} s")
+    return resumen
 
-        nombre_archivo = f"{base_name}-({consecutivo}).pdf"
-        ruta_local = ruta_destino / nombre_archivo
+# ============================================================
+# ÍNDICE LOCAL DE EVIDENCIAS (pedido → archivo -(1))
+# ============================================================
+PATRON_EVIDENCIA = re.compile(r"^EPM-FNX-(.+)-257-\(1\)\.[^.]+$")
+VERSION_INDICE = 2
 
-        print(f"⬇️ Descargando {nombre_archivo} ...")
 
-        # Si el archivo ya existe, saltarlo (ahorra mucho tiempo)
-        if ruta_local.exists():
-            print(f"⏩ Ya existe → {ruta_local.name} (se omite)")
-            total_sin_comprimir += 1
-            continue
+def _mtime(carpeta):
+    try:
+        return os.stat(carpeta).st_mtime_ns
+    except OSError:
+        return None
 
-        # Intentos con chunk optimizado
-        exitoso = False
-        for intento in range(1, 4):
-            try:
-                request = service.files().get_media(fileId=file_id)
 
-                # chunksize reducido → más estable
-                with io.FileIO(ruta_local, "wb") as fh:
-                    downloader = MediaIoBaseDownload(fh, request, chunksize=512 * 1024)
-                    done = False
+def _agregar_evidencia(indice, pedido, ruta):
+    """Primera ruta encontrada por pedido (como el recorrido); una ruta vieja se reemplaza."""
+    actual = indice.get(pedido)
+    if actual is None or (actual != ruta and not Path(actual).exists()):
+        indice[pedido] = ruta
+
+
+def escanear_evidencias(raiz=None, indice=None, carpetas=None):
+    """
+    Un solo recorrido del árbol de evidencias → {pedido: ruta}.
+    Anota en 'carpetas' el mtime de cada carpeta recorrida.
+    """
+    indice = {} if indice is None else indice
+    carpetas = {} if carpetas is None else carpetas
+    for carpeta, _, archivos in os.walk(raiz or RUTA_DESTINO):
+        carpetas[carpeta] = _mtime(carpeta)
+        for nombre in archivos:
+            coincide = PATRON_EVIDENCIA.match(nombre)
+            if coincide:
+                _agregar_evidencia(indice, coincide.group(1), str(Path(carpeta) / nombre))
+    return indice
+
+
+def refrescar_carpetas(indice, carpetas):
+    """
+    Vuelve a listar solo las carpetas cuyo mtime cambió: un archivo nuevo
+    (descargar_evidencias_drive.py, copia manual...) cambia el mtime de su
+    carpeta y una carpeta nueva el de su carpeta madre. Un stat por carpeta.
+    Devuelve cuántas carpetas se volvieron a listar.
+    """
+    cambiadas = 0
+    for carpeta, mtime in list(carpetas.items()):
+        actual = _mtime(carpeta)
+        if actual == mtime:
+            continue
+        cambiadas += 1
+        if actual is None:  # carpeta borrada: sus rutas viejas las detecta el uso
+            del carpetas[carpeta]
+            continue
+        carpetas[carpeta] = actual
+        with os.scandir(carpeta) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir():
+                    if entrada.path not in carpetas:
+                        escanear_evidencias(entrada.path, indice, carpetas)
+                else:
+                    coincide = PATRON_EVIDENCIA.match(entrada.name)
+                    if coincide:
+                        _agregar_evidencia(indice, coincide.group(1), entrada.path)
+    return cambiadas
+
+
+def cargar_indice_evidencias(manifiesto=None):
+    """
+    Lee el índice en caché (o recorre el árbol si no existe), vuelve a
+    listar las carpetas que cambiaron y le suma lo que el manifiesto
+    registró desde la última vez. Devuelve (indice, viene_de_cache).
+    """
+    cache = None
+    if RUTA_INDICE_EVIDENCIAS.exists():
+        try:
+            cache = json.loads(RUTA_INDICE_EVIDENCIAS.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cache = None
+    if not isinstance(cache, dict) or cache.get("version") != VERSION_INDICE:
+        cache = None  # sin caché o formato anterior (sin mtimes): recorrido completo
+
+    if cache is None:
+        carpetas = {}
+        indice = escanear_evidencias(carpetas=carpetas)
+        marca, viene_de_cache = None, False
+    else:
+        indice, carpetas, marca = cache["indice"], cache["carpetas"], cache.get("manifiesto")
+        cambiadas = refrescar_carpetas(indice, carpetas)
+        if cambiadas:
+            print(f"📂 Índice de evidencias: {cambiadas} carpeta(s) con cambios vueltas a listar")
+        viene_de_cache = True
 
-                    while not done:
-                        status, done = downloader.next_chunk()
+    # Actualización incremental desde el manifiesto: solo filas nuevas
+    if manifiesto:
+        for fila in manifiesto.descargados(desde=marca):
+            coincide = PATRON_EVIDENCIA.match(Path(fila["ruta_local"]).name)
+            if coincide and Path(fila["ruta_local"]).exists():
+                indice[coincide.group(1)] = fila["ruta_local"]
+            marca = max(marca or "", fila["actualizado"] or "") or None
 
-                exitoso = True
-                break
+    guardar_indice_evidencias(indice, carpetas, marca)
+    return indice, viene_de_cache
 
-            except Exception as e:
-                print(f"⚠️ Error descargando (intentó {intento}/3): {e}")
-                if ruta_local.exists():
-                    ruta_local.unlink()
-                if intento < 3:
-                  time.sleep(1)  # pequeño respiro antes del reintento 
-
-        if not exitoso:
-            errores += 1
-            print("❌ Falló descarga definitiva, se omite.\n")
-            continue
 
-        total_descargados += 1
+def marca_manifiesto(manifiesto):
+    """Último 'actualizado' del manifiesto (lo ya incluido en un recorrido completo)."""
+    return manifiesto.ultima_actualizacion() if manifiesto else None
 
-        # COMPRESIÓN ≥ 20 KB
-        peso_kb = ruta_local.stat().st_size / 1024
-        if peso_kb >= 20:
-            zip_path = ruta_local.with_suffix(".zip")
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-                zf.write(ruta_local, ruta_local.name)
-            ruta_local.unlink()
-            total_comprimidos += 1  
-        else:
-            total_sin_comprimir += 1    
 
-    return df["fecha_real"].iloc[-1]
+def guardar_indice_evidencias(indice, carpetas, marca=None):
+    RUTA_INDICE_EVIDENCIAS.parent.mkdir(parents=True, exist_ok=True)
+    cache = {"version": VERSION_INDICE, "manifiesto": marca, "carpetas": carpetas, "indice": indice}
+    RUTA_INDICE_EVIDENCIAS.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+
 
 # ============================================================
 # ACTUALIZAR RUTAS EN GOOGLE SHEET
 # ============================================================
-def actualizar_rutas_locales(df, fecha_form):
+def actualizar_rutas_locales(df, fecha_form, manifiesto=None):
 
     print("\n🔄 Actualizando enlaces en Google Sheet...\n")
 
@@ -281,35 +607,61 @@ def actualizar_rutas_locales(df, fecha_form):
     if not col_evid:
         return
 
+    indice, viene_de_cache = cargar_indice_evidencias(manifiesto)
+    celdas = []
+
     for i, fila in enumerate(data, start=2):
         pedido = str(fila.get("Número del pedido", "")).strip()
         if not pedido:
             continue
 
-        patron = f"EPM-FNX-{pedido}-257-(1).*"
-        ruta_local = next((p for p in RUTA_DESTINO.glob(f"**/{patron}")), None)
+        ruta_local = indice.get(pedido)
 
-        if ruta_local and ruta_local.exists():
+        # Entrada vieja de la caché (archivo movido/borrado): se recorre
+        # el árbol una sola vez y se sigue con el índice fresco
+        if ruta_local and not Path(ruta_local).exists() and viene_de_cache:
+            print("♻️ Índice de evidencias desactualizado; recorriendo carpetas de nuevo...")
+            carpetas = {}
+            indice = escanear_evidencias(carpetas=carpetas)
+            guardar_indice_evidencias(indice, carpetas, marca_manifiesto(manifiesto))
+            viene_de_cache = False
+            ruta_local = indice.get(pedido)
 
-            celda = rowcol_to_a1(i, col_evid)
+        if ruta_local and Path(ruta_local).exists():
 
             ruta_web = str(ruta_local).replace(
                 r"C:\Users\hector.gaviria\OneDrive - Elite Ingenieros SAS",
                 "https://eliteingenierosas-my.sharepoint.com/personal/h_gaviria_eliteingenieros_com_co/Documents"
             ).replace("\\", "/")
 
-            sheet.update_acell(celda, f'=HIPERVINCULO("{ruta_web}"; "Abrir")')
+            celdas.append(gspread.Cell(i, col_evid, f'=HIPERVINCULO("{ruta_web}"; "Abrir")'))
 
-            print(f"✔️ Enlace actualizado → {ruta_local.name}")
+    # Una escritura por bloque en vez de una por celda (cuota de Sheets)
+    escrituras = 0
+    for inicio in range(0, len(celdas), CELDAS_POR_ESCRITURA):
+        sheet.update_cells(celdas[inicio:inicio + CELDAS_POR_ESCRITURA],
+                           value_input_option="USER_ENTERED")
+        escrituras += 1
+
+    print(f"✔️ {len(celdas)} enlaces actualizados en {escrituras} escritura(s)")
 
 # ============================================================
 # PROGRAMA PRINCIPAL
 # ============================================================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga de evidencias del formulario ANS")
+    parser.add_argument("--desde", help="Recuperar registros desde esta fecha (YYYY-MM-DD); "
+                                        "por defecto solo el día más reciente")
+    args = parser.parse_args()
+
     service = crear_servicio()
     df = leer_google_sheet(service)
 
     if df is not None:
-        fecha_form = descargar_pdfs(service, df)
+        manifiesto = ManifiestoDescargas(RUTA_MANIFIESTO)
+        blobs = AlmacenBlobs(RUTA_BLOBS)
+        fecha_form = descargar_pdfs(service, df, desde=args.desde, manifiesto=manifiesto, blobs=blobs)
         if fecha_form:
-            actualizar_rutas_locales(df, fecha_form)
+            actualizar_rutas_locales(df, fecha_form, manifiesto=manifiesto)
+
+    imprimir_estadisticas()
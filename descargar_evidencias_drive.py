@@ -2,14 +2,15 @@
 # DESCARGAR EVIDENCIAS DE GOOGLE DRIVE Y MOVER A PAPELERA_API
 # ------------------------------------------------------------
 import os
-import io
-import time
 from datetime import datetime
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
 import sys
 
+from modules.clientes_google import (
+    imprimir_estadisticas, servicio_drive, sesion_google, url_contenido_drive
+)
+from modules.descarga_reanudable import descargar_reanudable, DescargaError, md5_archivo
+from modules.drive_metadatos import MAX_LOTE, listar_carpeta, mover_archivos
+
 # Forzar salida UTF-8 para registros
 sys.stdout.reconfigure(encoding='utf-8')
 
@@ -25,94 +26,111 @@ CRED_PATH = "control-ans-evidencias-1ef0b1b8d1a8.json"
 # AUTENTICACIÓN
 # ============================================================
 def crear_servicio():
-    creds = service_account.Credentials.from_service_account_file(
-        CRED_PATH,
-        scopes=["https://www.googleapis.com/auth/drive"]
-    )
-    return build("drive", "v3", credentials=creds)
+    return servicio_drive(CRED_PATH)
+
+
+def crear_sesion():
+    """Sesión HTTP con token renovable para descargar contenido por URL."""
+    # Sin reintentos en la sesión: descargar_reanudable reintenta desde el checkpoint
+    return sesion_google(CRED_PATH, reintentos=0)
 
 # ============================================================
 # DESCARGAR Y MOVER ARCHIVOS (versión optimizada)
 # ============================================================
-def descargar_archivos(service):
+def mover_a_papelera(service, por_mover):
+    """Mueve el lote a PAPELERA_API (peticiones batch). Devuelve cuántos se movieron."""
+    movidos, fallidos = mover_archivos(service, por_mover, FOLDER_ID_PAPELERA)
+    nombres = {f["id"]: f["name"] for f in por_mover}
+    for file_id, error in fallidos.items():
+        print(f"[ERROR] No se pudo mover {nombres[file_id]}: {error}")
+    return len(movidos)
+
+
+def ruta_local(carpeta_dia, file):
+    """
+    Ruta del archivo en la carpeta del día. Si ya hay otro con el mismo
+    nombre y distinto contenido (otra subida del formulario), el id de
+    Drive va en el nombre para no pisarlo.
+    """
+    ruta = os.path.join(carpeta_dia, file["name"])
+    if os.path.exists(ruta) and not mismo_contenido(ruta, file):
+        base, extension = os.path.splitext(file["name"])
+        ruta = os.path.join(carpeta_dia, f"{base}_{file['id']}{extension}")
+    return ruta
+
+
+def mismo_contenido(ruta, file):
+    """True si 'ruta' es este archivo de Drive (md5Checksum; sin md5 no se puede asegurar)."""
+    return bool(file.get("md5Checksum")) and os.path.exists(ruta) \
+        and md5_archivo(ruta) == file["md5Checksum"]
+
+
+def descargar_archivos(service, sesion):
     fecha_hoy = datetime.now().strftime("%Y-%m-%d")
     carpeta_dia = os.path.join(CARPETA_LOCAL, fecha_hoy)
     os.makedirs(carpeta_dia, exist_ok=True)
 
     print(f"\n[INFO] Descargando evidencias del {fecha_hoy}...\n")
 
-    query = f"'{FOLDER_ID_FORMULARIO}' in parents and mimeType != 'application/vnd.google-apps.folder'"
-    results = service.files().list(q=query, fields="files(id, name, parents)").execute()
-    files = results.get("files", [])
+    # Todas las páginas de la carpeta (id, name, md5Checksum, size, parents)
+    files = listar_carpeta(service, FOLDER_ID_FORMULARIO)
 
     if not files:
         print("[WARN] No se encontraron archivos en la carpeta del formulario.")
         return
 
     descargados = 0
-    movidos = 0
     errores = 0
+    movidos = 0
+    por_mover = []
 
     for file in files:
+        # Se mueve a PAPELERA_API por lotes (un batch lleno): si la corrida
+        # se corta, lo ya movido no se vuelve a bajar
+        if len(por_mover) >= MAX_LOTE:
+            movidos += mover_a_papelera(service, por_mover)
+            por_mover = []
+
         file_id = file["id"]
         file_name = file["name"]
-        file_path = os.path.join(carpeta_dia, file_name)
 
         try:
-            print(f"[📥] Descargando {file_name}...")
-            request = service.files().get_media(fileId=file_id)
-            
-            with io.FileIO(file_path, "wb") as fh:
-                downloader = MediaIoBaseDownload(fh, request, chunksize=5 * 1024 * 1024)
-                done = False
+            file_path = ruta_local(carpeta_dia, file)
 
-            try:
-                while not done:
-                    status, done = downloader.next_chunk()
-                    if status:
-                        progreso = int(status.progress() * 100)
-                        print(f"   Progreso: {progreso}%")
-
-            except TimeoutError:
-                print(f"❌ Timeout al descargar → archivo corrupto o incompleto: {file_name}")
-                fh.close()
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                errores += 1
+            # Ya bajado en una corrida interrumpida antes de moverlo: solo falta moverlo
+            if mismo_contenido(file_path, file):
+                print(f"[OK] Ya estaba descargado: {file_name}")
+                por_mover.append(file)
                 continue
 
-            except Exception as e:
+            print(f"[📥] Descargando {file_name}...")
+
+            # Si se corta, el .part queda y el próximo intento sigue desde ahí
+            try:
+                descargar_reanudable(
+                    url_contenido_drive(file_id), file_path, sesion,
+                    md5=file.get("md5Checksum"), tamano=file.get("size"),
+                )
+            except DescargaError as e:
                 print(f"❌ Error descargando {file_name}: {e}")
-                fh.close()
-                if os.path.exists(file_path):
-                    os.remove(file_path)
                 errores += 1
                 continue
 
             # DESCARGA EXITOSA
-            fh.close()
-
             descargados += 1
             print(f"[OK] Archivo descargado: {file_name}")
 
-            # MOVER A PAPELERA_API
-            file_metadata = service.files().get(fileId=file_id, fields="parents").execute()
-            padres = ",".join(file_metadata.get("parents", []))
-
-            service.files().update(
-                fileId=file_id,
-                addParents=FOLDER_ID_PAPELERA,
-                removeParents=padres
-            ).execute()
-
-            movidos += 1
-            print(f"[MOVIDO] Archivo movido a PAPELERA_API: {file_name}")
-
-            time.sleep(0.3)
+            por_mover.append(file)
 
         except Exception as e:
             print(f"[ERROR] No se pudo procesar {file_name}: {e}")
 
+    # ========================================================
+    # MOVER A PAPELERA_API lo que quedó del último lote
+    # ========================================================
+    if por_mover:
+        movidos += mover_a_papelera(service, por_mover)
+
     print(f"\n✅ Total de archivos descargados: {descargados}")
     print(f"🗑️ Total de archivos movidos a PAPELERA_API: {movidos}")
 
@@ -129,4 +147,5 @@ def descargar_archivos(service):
 # ============================================================
 if __name__ == "__main__":
     service = crear_servicio()
-    descargar_archivos(service)
+    descargar_archivos(service, crear_sesion())
+    imprimir_estadisticas()
@@ -13,11 +13,12 @@ Descripción:
 ------------------------------------------------------------
 """
 
-import pandas as pd
 from pathlib import Path
 import win32com.client as win32
 import time
 
+from modules.tablas_etapas import leer_tabla
+
 # ------------------------------------------------------------
 # RUTAS
 # ------------------------------------------------------------
@@ -47,7 +48,7 @@ print("🚀 Iniciando actualización protegida del Dashboard...")
 # ------------------------------------------------------------
 # BLOQUE 1️⃣ – Cargar datos de origen
 # ------------------------------------------------------------
-df = pd.read_excel(ruta_origen, dtype=str)
+df = leer_tabla(ruta_origen)
 print(f"📊 Registros cargados: {len(df)} filas.")
 if "ESTADO" in df.columns:
     df["ESTADO"] = df["ESTADO"].fillna("SIN ESTADO")
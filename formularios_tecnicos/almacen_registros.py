@@ -0,0 +1,259 @@
+"""
+------------------------------------------------------------
+ALMACÉN DE REGISTROS DEL FORMULARIO – SQLite (modo WAL)
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Guarda cada envío del formulario en registros_formulario.db
+  (solo inserciones, índice único por pedido).
+- La validación de duplicados la hace el propio índice único,
+  así dos envíos simultáneos no se pisan entre sí.
+- Exporta a registros_formulario.xlsx bajo demanda o de forma
+  programada para no romper a quienes leen ese Excel.
+- En el primer arranque importa el Excel existente. Si trae
+  pedidos repetidos se guarda una copia del Excel original y las
+  filas repetidas quedan en la tabla registros_duplicados (la
+  primera exportación ya no las incluye).
+
+Uso manual (exportar el Excel):
+    python almacen_registros.py
+------------------------------------------------------------
+"""
+
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Columnas estándar del registro (mismo orden del Excel histórico)
+COLUMNAS = [
+    "fecha_envio", "pedido", "observacion", "estado",
+    "pdf", "imagenes", "cliente", "direccion",
+    "estado_fenix", "clienteid", "metodo_envio"
+]
+
+# Segundos de espera antes de regenerar el Excel tras un envío
+RETRASO_EXPORTACION = 30
+
+
+class AlmacenRegistros:
+    """Registros del formulario en SQLite con exportación a Excel."""
+
+    def __init__(self, ruta_db, ruta_excel=None):
+        self.ruta_db = Path(ruta_db)
+        self.ruta_excel = Path(ruta_excel) if ruta_excel else None
+        self._local = threading.local()
+        self._lock_export = threading.Lock()
+        self._lock_timer = threading.Lock()
+        self._timer = None
+        self._crear_esquema()
+        self._importar_excel_inicial()
+
+    # --------------------------------------------------------
+    # CONEXIÓN Y ESQUEMA
+    # --------------------------------------------------------
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta_db, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA busy_timeout=30000")
+            self._local.con = con
+        return con
+
+    def _crear_esquema(self):
+        columnas_sql = ",\n".join(f"    {c} TEXT NOT NULL DEFAULT ''" for c in COLUMNAS)
+        con = self._conexion()
+        with con:
+            con.execute(f"""
+                CREATE TABLE IF NOT EXISTS registros (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                {columnas_sql}
+                )
+            """)
+            con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_registros_pedido ON registros(pedido)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS evidencias (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fecha TEXT NOT NULL,
+                    pedido TEXT NOT NULL,
+                    archivo TEXT NOT NULL,
+                    bytes_original INTEGER,
+                    bytes_final INTEGER,
+                    segundos REAL,
+                    estado TEXT
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_evidencias_pedido ON evidencias(pedido)")
+            # Filas repetidas del Excel histórico (el índice único solo deja la primera)
+            con.execute(f"""
+                CREATE TABLE IF NOT EXISTS registros_duplicados (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fila_excel INTEGER,
+                {columnas_sql}
+                )
+            """)
+
+    def _importar_excel_inicial(self):
+        """Migra registros_formulario.xlsx la primera vez (tabla vacía)."""
+        if not self.ruta_excel or not self.ruta_excel.exists() or self.total() > 0:
+            return
+        try:
+            df = pd.read_excel(self.ruta_excel, dtype=str)
+        except Exception as e:
+            print(f"⚠ No se pudo importar {self.ruta_excel.name}: {e}")
+            return
+
+        df = df.reindex(columns=COLUMNAS).fillna("")
+        df["pedido"] = df["pedido"].astype(str).str.strip()
+        df = df[df["pedido"] != ""]
+        df.insert(0, "fila_excel", df.index + 2)  # fila en Excel (encabezado = 1)
+
+        # La primera exportación reemplaza el Excel: antes se guarda el original
+        repetidos = df[df["pedido"].duplicated(keep="first")]
+        if not repetidos.empty:
+            copia = self.ruta_excel.with_name(
+                f"{self.ruta_excel.stem}_antes_migracion_{datetime.now():%Y%m%d_%H%M%S}{self.ruta_excel.suffix}"
+            )
+            shutil.copy2(self.ruta_excel, copia)
+            print(f"⚠ {len(repetidos)} filas con pedido repetido en {self.ruta_excel.name}: "
+                  f"quedan en registros_duplicados y el original en {copia.name}")
+
+        con = self._conexion()
+        marcadores = ", ".join("?" for _ in COLUMNAS)
+        with con:
+            con.executemany(
+                f"INSERT INTO registros ({', '.join(COLUMNAS)}) VALUES ({marcadores})",
+                df.drop(repetidos.index)[COLUMNAS].itertuples(index=False, name=None)
+            )
+            con.executemany(
+                f"INSERT INTO registros_duplicados (fila_excel, {', '.join(COLUMNAS)}) VALUES (?, {marcadores})",
+                repetidos[["fila_excel", *COLUMNAS]].itertuples(index=False, name=None)
+            )
+        print(f"📥 {self.total()} registros importados desde {self.ruta_excel.name}")
+
+    # --------------------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------------------
+    def registrar(self, registro):
+        """
+        Inserta un registro. Devuelve False si el pedido ya existía
+        (lo detecta el índice único, sin leer la tabla completa).
+        """
+        valores = [str(registro.get(c, "") or "") for c in COLUMNAS]
+        valores[COLUMNAS.index("pedido")] = valores[COLUMNAS.index("pedido")].strip()
+        marcadores = ", ".join("?" for _ in COLUMNAS)
+        try:
+            with self._conexion() as con:
+                con.execute(
+                    f"INSERT INTO registros ({', '.join(COLUMNAS)}) VALUES ({marcadores})",
+                    valores
+                )
+        except sqlite3.IntegrityError:
+            return False
+
+        self.programar_exportacion()
+        return True
+
+    def registrar_evidencia(self, pedido, archivo, bytes_original, bytes_final, segundos, estado):
+        """Guarda el resultado del post-procesamiento de una evidencia."""
+        with self._conexion() as con:
+            con.execute(
+                "INSERT INTO evidencias (fecha, pedido, archivo, bytes_original, bytes_final, segundos, estado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), str(pedido), archivo,
+                 int(bytes_original), int(bytes_final), round(segundos, 3), estado)
+            )
+
+    # --------------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------------
+    def buscar(self, pedido):
+        fila = self._conexion().execute(
+            "SELECT * FROM registros WHERE pedido = ?", (str(pedido).strip(),)
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    def buscar_varios(self, pedidos):
+        """Devuelve {pedido: registro} para los pedidos ya registrados."""
+        pedidos = [str(p).strip() for p in pedidos]
+        encontrados = {}
+        # SQLite limita la cantidad de parámetros por consulta
+        for i in range(0, len(pedidos), 500):
+            bloque = pedidos[i:i + 500]
+            marcadores = ", ".join("?" for _ in bloque)
+            for fila in self._conexion().execute(
+                f"SELECT * FROM registros WHERE pedido IN ({marcadores})", bloque
+            ):
+                encontrados[fila["pedido"]] = dict(fila)
+        return encontrados
+
+    def existe(self, pedido):
+        return self._conexion().execute(
+            "SELECT 1 FROM registros WHERE pedido = ?", (str(pedido).strip(),)
+        ).fetchone() is not None
+
+    def total(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+
+    # --------------------------------------------------------
+    # EXPORTACIÓN A EXCEL
+    # --------------------------------------------------------
+    def exportar_excel(self, ruta=None):
+        """Escribe el Excel completo en un temporal y lo reemplaza de una vez."""
+        ruta = Path(ruta) if ruta else self.ruta_excel
+        with self._lock_export:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(COLUMNAS)} FROM registros ORDER BY id", self._conexion()
+            )
+            temporal = ruta.with_name(f"~tmp_{ruta.name}")
+            df.to_excel(temporal, index=False)
+            try:
+                os.replace(temporal, ruta)
+            except PermissionError:
+                # El Excel está abierto: se reintenta en la próxima exportación
+                print(f"⚠ {ruta.name} está abierto; se exportará más tarde.")
+                temporal.unlink(missing_ok=True)
+                return None
+        print(f"💾 {len(df)} registros exportados a {ruta.name} ({datetime.now():%H:%M:%S})")
+        return ruta
+
+    def programar_exportacion(self, retraso=RETRASO_EXPORTACION):
+        """Agrupa varios envíos seguidos en una sola exportación."""
+        if not self.ruta_excel:
+            return
+        with self._lock_timer:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(retraso, self._exportar_seguro)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _exportar_seguro(self):
+        # Los envíos que lleguen durante la exportación programan otra
+        with self._lock_timer:
+            self._timer = None
+        try:
+            self.exportar_excel()
+        except Exception as e:
+            print(f"⚠ Error exportando registros a Excel: {e}")
+
+
+# ------------------------------------------------------------
+# EJECUCIÓN MANUAL: exportar el Excel
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    base_dir = Path(__file__).resolve().parent
+    almacen = AlmacenRegistros(
+        base_dir / "registros_formulario.db",
+        base_dir / "registros_formulario.xlsx"
+    )
+    almacen.exportar_excel()
@@ -1,8 +1,17 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
 import os
+import re
+import sys
+
+# Raíz del proyecto en el path para usar los módulos compartidos (modules/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.almacen_blobs import AlmacenBlobs
+from indice_fenix import IndiceFenix
+from almacen_registros import AlmacenRegistros
+from procesador_evidencias import ProcesadorEvidencias
 
 # ------------------------------------------------------------
 # CONFIGURACIÓN BASE DE FLASK
@@ -19,51 +28,85 @@ app.config['UPLOAD_FOLDER'] = base_dir / "static" / "uploads"
 app.config['UPLOAD_FOLDER'].mkdir(parents=True, exist_ok=True)
 
 # ------------------------------------------------------------
-# CARGA ARCHIVO FENIX
+# CARGA ARCHIVO FENIX (índice en memoria, recarga al cambiar el archivo)
 # ------------------------------------------------------------
 ruta_fenix = base_dir.parent / "data_clean" / "FENIX_ANS.xlsx"
-if ruta_fenix.exists():
-    df_fenix = pd.read_excel(ruta_fenix)
-    df_fenix.columns = df_fenix.columns.str.strip().str.upper()
-else:
-    df_fenix = pd.DataFrame()
+indice_fenix = IndiceFenix(ruta_fenix)
+
+# ------------------------------------------------------------
+# REGISTROS DEL FORMULARIO (SQLite WAL + exportación a Excel)
+# ------------------------------------------------------------
+ruta_registros_excel = base_dir / "registros_formulario.xlsx"
+registros = AlmacenRegistros(base_dir / "registros_formulario.db", ruta_registros_excel)
+
+# Evidencias únicas por contenido (duplicados = enlaces al mismo blob)
+blobs_evidencias = AlmacenBlobs(base_dir / "blobs_evidencias")
+
+# Optimización de evidencias en segundo plano (no retrasa la respuesta)
+procesador_evidencias = ProcesadorEvidencias(registros, blobs=blobs_evidencias)
+
+# Máximo de pedidos por consulta o envío en lote
+MAX_PEDIDOS_LOTE = 50
+
+def separar_pedidos(texto):
+    """Convierte '123, 456 789' en ['123', '456', '789'] sin repetidos."""
+    pedidos = [p for p in re.split(r"[\s,;]+", str(texto)) if p]
+    return list(dict.fromkeys(pedidos))
+
+
+def mensaje_exceso(pedidos):
+    """Texto de error si el lote pasa de MAX_PEDIDOS_LOTE (no se corta en silencio)."""
+    if len(pedidos) <= MAX_PEDIDOS_LOTE:
+        return None
+    return (f"Se ingresaron {len(pedidos)} pedidos; el máximo por lote es {MAX_PEDIDOS_LOTE}. "
+            f"Divida la lista e intente de nuevo.")
 
 # ------------------------------------------------------------
 # FORMULARIO PRINCIPAL
 # ------------------------------------------------------------
 @app.route("/", methods=["GET", "POST"])
 def formulario():
-    ruta_excel = base_dir / "registros_formulario.xlsx"
-    df_registros = pd.read_excel(ruta_excel) if ruta_excel.exists() else pd.DataFrame()
-
     # Si es envío del formulario (POST)
     if request.method == "POST":
-        pedido = str(request.form["pedido"]).strip()
+        pedidos = separar_pedidos(request.form["pedido"])
+        exceso = mensaje_exceso(pedidos)
+        if exceso:
+            flash(f"❌ {exceso}", "danger")
+            return redirect(url_for("formulario"))
         observacion = request.form["observacion"]
         estado = request.form["estado"]
 
-        # 🔸 Validar duplicado
-        if not df_registros.empty and pedido in df_registros["pedido"].astype(str).values:
-            flash(f"⚠ El pedido {pedido} ya fue registrado anteriormente.", "warning")
-            return redirect(url_for("formulario"))
+        # 🔸 Validar duplicados (una sola consulta indexada) y existencia en FENIX
+        ya_registrados = registros.buscar_varios(pedidos)
+        validos = []
+        for pedido in pedidos:
+            if pedido in ya_registrados:
+                flash(f"⚠ El pedido {pedido} ya fue registrado anteriormente.", "warning")
+                continue
+            fila = indice_fenix.buscar(pedido)
+            if fila is None:
+                flash(f"❌ Pedido {pedido} no existe en FENIX_ANS. Verifique nuevamente.", "danger")
+                continue
+            validos.append((pedido, fila))
 
-        # 🔸 Validar existencia en FENIX
-        df_fenix["PEDIDO"] = df_fenix["PEDIDO"].astype(str).str.strip()
-        resultado = df_fenix[df_fenix["PEDIDO"] == pedido]
-
-        if resultado.empty:
-            flash(f"❌ Pedido {pedido} no existe en FENIX_ANS. Verifique nuevamente.", "danger")
+        if not validos:
             return redirect(url_for("formulario"))
 
         # 🔸 Procesar archivos combinados (PDF e imágenes)
+        # Si se reportan varios pedidos de la misma visita, la evidencia se
+        # guarda una vez con el primer pedido y se referencia en todos.
+        pedido_evidencia = validos[0][0]
         archivos = request.files.getlist("archivos_evidencia")
         nombres_pdf, nombres_imagenes = [], []
+        rutas_guardadas = []
 
         for i, archivo in enumerate(archivos, start=1):
             if archivo and archivo.filename:
                 ext = archivo.filename.split(".")[-1].lower()
-                nombre_archivo = f"{pedido}_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
-                archivo.save(app.config['UPLOAD_FOLDER'] / nombre_archivo)
+                nombre_archivo = f"{pedido_evidencia}_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+                ruta_archivo = app.config['UPLOAD_FOLDER'] / nombre_archivo
+                archivo.save(ruta_archivo)
+                rutas_guardadas.append(ruta_archivo)
 
                 if ext == "pdf":
                     nombres_pdf.append(nombre_archivo)
@@ -74,43 +117,36 @@ def formulario():
         pdf_guardado = ", ".join(nombres_pdf) if nombres_pdf else "Sin archivo"
         imagenes_guardadas = ", ".join(nombres_imagenes) if nombres_imagenes else "Sin imágenes"
 
+        # 🔸 Registrar una fila por pedido
+        guardados = []
+        for pedido, fila in validos:
+            registro = {
+                "fecha_envio": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "pedido": pedido,
+                "observacion": observacion,
+                "estado": estado,  # ✅ valor seleccionado por el técnico
+                "pdf": pdf_guardado,
+                "imagenes": imagenes_guardadas,
+                "cliente": fila["nombre_cliente"],
+                "direccion": fila["direccion"],
+                "estado_fenix": fila["estado_fenix"],
+                "clienteid": fila["clienteid"],
+                "metodo_envio": request.form.get("metodo_envio", "")
+            }
+
+            # 🔸 Guardar registro (el índice único evita duplicados simultáneos)
+            if registros.registrar(registro):
+                guardados.append(pedido)
+            else:
+                flash(f"⚠ El pedido {pedido} ya fue registrado anteriormente.", "warning")
 
-              # 🔸 Registrar fila
-        fila = resultado.iloc[0]
-        registro = {
-            "fecha_envio": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "pedido": pedido,
-            "observacion": observacion,
-            "estado": estado,  # ✅ valor seleccionado por el técnico
-            "pdf": pdf_guardado,
-            "imagenes": imagenes_guardadas,
-            "cliente": fila.get("NOMBRE_CLIENTE", ""),
-            "direccion": fila.get("DIRECCION", ""),
-            "estado_fenix": fila.get("ESTADO", ""),
-            "clienteid": fila.get("CLIENTEID", ""),
-            "metodo_envio": request.form.get("metodo_envio", "")
-        }
-
-        # 🔸 Crear DataFrame ordenado con columnas estándar
-        columnas = [
-            "fecha_envio", "pedido", "observacion", "estado",
-            "pdf", "imagenes", "cliente", "direccion",
-            "estado_fenix", "clienteid", "metodo_envio"
-        ]
-
-        # Si el archivo ya existe, asegúrate de mantener el orden
-        if not df_registros.empty:
-            df_registros = df_registros.reindex(columns=columnas, fill_value="")
-
-        df_final = pd.concat([df_registros, pd.DataFrame([registro])], ignore_index=True)
-        df_final.to_excel(ruta_excel, index=False)
-
-        # 🔸 Guardar registro
-        df_final = pd.concat([df_registros, pd.DataFrame([registro])], ignore_index=True)
-        df_final.to_excel(ruta_excel, index=False)
+        # 🔸 Optimizar evidencias en segundo plano
+        for ruta_archivo in rutas_guardadas:
+            procesador_evidencias.encolar(pedido_evidencia, ruta_archivo)
 
         # 🔸 Confirmar al usuario
-        flash(f"✅ Registro guardado correctamente — Pedido {pedido}", "success")
+        if guardados:
+            flash(f"✅ Registro guardado correctamente — Pedido {', '.join(guardados)}", "success")
         return redirect(url_for("formulario"))
 
     # ✅ Si es GET (abrir formulario)
@@ -124,55 +160,124 @@ def buscar_pedido(pedido_id):
     pedido_id = str(pedido_id).strip()
     print(f"🔍 Buscando pedido: {pedido_id}")  # <-- para depuración en consola
 
-    if df_fenix.empty:
+    if indice_fenix.vacio():
         print("❌ Archivo FENIX_ANS está vacío o no existe.")
         return jsonify({"error": "Archivo FENIX_ANS no encontrado o vacío"})
 
-    # 1️⃣ Buscar primero en registros_formulario.xlsx
-    ruta_excel = base_dir / "registros_formulario.xlsx"
-    if ruta_excel.exists():
-        df_reg = pd.read_excel(ruta_excel)
-        df_reg["pedido"] = df_reg["pedido"].astype(str)
-
-        registro = df_reg[df_reg["pedido"] == pedido_id]
-        if not registro.empty:
-            fila = registro.iloc[0]
-            estado_real = fila.get("estado", "Sin estado")
-            print(f"📋 Encontrado en registros_formulario.xlsx con estado: {estado_real}")
-            return jsonify({
-                "origen": "registro",
-                "mensaje": f"📋 El pedido {pedido_id} ya fue registrado con estado: <strong>{estado_real}</strong>",
-                "estado_real": estado_real,
-                "observacion": fila.get("observacion", ""),
-                "metodo_envio": fila.get("metodo_envio", "")
-            })
-
-    # 2️⃣ Si no está en registros, buscar en FENIX
-    df_fenix.columns = df_fenix.columns.str.strip().str.upper()  # asegurar mayúsculas
-    df_fenix["PEDIDO"] = df_fenix["PEDIDO"].astype(str).str.strip()
-
-    resultado = df_fenix[df_fenix["PEDIDO"] == pedido_id]
-    print(f"Resultado búsqueda en FENIX → {len(resultado)} filas")
-
-    if not resultado.empty:
-        fila = resultado.iloc[0]
-        datos = {
-            "origen": "fenix",
-            "clienteid": str(fila.get("CLIENTEID", "")),
-            "nombre_cliente": str(fila.get("NOMBRE_CLIENTE", "")),
-            "telefono": str(fila.get("TELEFONO_CONTACTO", "")),
-            "celular": str(fila.get("CELULAR_CONTACTO", "")),
-            "direccion": str(fila.get("DIRECCION", "")),
-            "fecha_limite_ans": str(fila.get("FECHA_LIMITE_ANS", "")),
-            "estado_fenix": str(fila.get("ESTADO", ""))
-        }
-        print(f"✅ Datos enviados al frontend: {datos}")
-        return jsonify(datos)
-    
+    # 1️⃣ Buscar primero en los registros del formulario
+    fila = registros.buscar(pedido_id)
+    if fila is not None:
+        estado_real = fila.get("estado") or "Sin estado"
+        print(f"📋 Encontrado en registros del formulario con estado: {estado_real}")
+        return jsonify({
+            "origen": "registro",
+            "mensaje": f"📋 El pedido {pedido_id} ya fue registrado con estado: <strong>{estado_real}</strong>",
+            "estado_real": estado_real,
+            "observacion": fila.get("observacion", ""),
+            "metodo_envio": fila.get("metodo_envio", "")
+        })
+
+    # 2️⃣ Si no está en registros, buscar en el índice FENIX (O(1))
+    datos_json = indice_fenix.buscar_json(pedido_id)
+
+    if datos_json is not None:
+        print(f"✅ Datos enviados al frontend: {datos_json}")
+        return app.response_class(datos_json, mimetype="application/json")
 
     print("⚠ No se encontró el pedido en ningún archivo.")
     return jsonify({"error": f"Pedido {pedido_id} no existe...."})
 # ------------------------------------------------------------
+# CONSULTA EN LOTE (varios pedidos de la misma visita)
+# ------------------------------------------------------------
+@app.route("/buscar_pedidos", methods=["GET", "POST"])
+def buscar_pedidos():
+    """
+    Recibe {"pedidos": [...]} (POST JSON) o ?pedidos=1,2,3 (GET) y
+    devuelve en una sola respuesta los datos FENIX y el estado de
+    registro de cada pedido.
+    """
+    if request.method == "POST":
+        cuerpo = request.get_json(silent=True) or {}
+        entrada = cuerpo.get("pedidos", [])
+        if isinstance(entrada, list):
+            entrada = " ".join(str(p) for p in entrada)
+    else:
+        entrada = request.args.get("pedidos", "")
+
+    pedidos = separar_pedidos(entrada)
+    if not pedidos:
+        return jsonify({"error": "Ingrese al menos un número de pedido."})
+    exceso = mensaje_exceso(pedidos)
+    if exceso:
+        return jsonify({"error": exceso}), 400
+
+    if indice_fenix.vacio():
+        return jsonify({"error": "Archivo FENIX_ANS no encontrado o vacío"})
+
+    ya_registrados = registros.buscar_varios(pedidos)
+    resultados = []
+    for pedido in pedidos:
+        fila_registro = ya_registrados.get(pedido)
+        fila_fenix = indice_fenix.buscar(pedido)
+
+        if fila_registro is not None:
+            resultado = {
+                "pedido": pedido,
+                "origen": "registro",
+                "estado_real": fila_registro.get("estado") or "Sin estado",
+                "observacion": fila_registro.get("observacion", ""),
+                "metodo_envio": fila_registro.get("metodo_envio", ""),
+            }
+        elif fila_fenix is not None:
+            resultado = {"pedido": pedido, **fila_fenix}
+        else:
+            resultado = {"pedido": pedido, "origen": "no_existe",
+                         "error": f"Pedido {pedido} no existe en FENIX_ANS."}
+
+        # Datos FENIX también para los ya registrados (útil en la lista)
+        if fila_registro is not None and fila_fenix is not None:
+            resultado["fenix"] = dict(fila_fenix)
+        resultados.append(resultado)
+
+    print(f"🔍 Consulta en lote: {len(pedidos)} pedidos")
+    return jsonify({"total": len(resultados), "resultados": resultados})
+
+# ------------------------------------------------------------
+# AUTOCOMPLETAR PEDIDO POR PREFIJO
+# ------------------------------------------------------------
+@app.route("/autocompletar_pedido")
+def autocompletar_pedido():
+    """?q=2326&n=8 → primeros pedidos que empiezan por 'q' con cliente y dirección."""
+    prefijo = request.args.get("q", "").strip()
+    limite = min(request.args.get("n", 8, type=int) or 8, MAX_PEDIDOS_LOTE)
+
+    if len(prefijo) < 3 or not prefijo.isdigit():
+        return jsonify({"sugerencias": []})
+
+    sugerencias = [
+        {"pedido": d["pedido"], "cliente": d["nombre_cliente"], "direccion": d["direccion"]}
+        for d in indice_fenix.buscar_prefijo(prefijo, limite)
+    ]
+    return jsonify({"sugerencias": sugerencias})
+
+# ------------------------------------------------------------
+# ESTADÍSTICAS DE DUPLICADOS DE EVIDENCIAS
+# ------------------------------------------------------------
+@app.route("/estadisticas_evidencias")
+def estadisticas_evidencias():
+    return jsonify(blobs_evidencias.estadisticas())
+
+# ------------------------------------------------------------
+# EXPORTAR REGISTROS A EXCEL (bajo demanda)
+# ------------------------------------------------------------
+@app.route("/exportar_registros")
+def exportar_registros():
+    ruta = registros.exportar_excel()
+    if ruta is None:
+        return jsonify({"error": "registros_formulario.xlsx está abierto; cierre el archivo e intente de nuevo."})
+    return send_file(ruta, as_attachment=True)
+
+# ------------------------------------------------------------
 # EJECUCIÓN
 # ------------------------------------------------------------
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+"""
+------------------------------------------------------------
+ÍNDICE EN MEMORIA DE PEDIDOS FENIX – Formulario Técnico ANS
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Lee FENIX_ANS.xlsx una sola vez y construye un índice
+  PEDIDO → datos listos para enviar al formulario (dict + JSON).
+- El índice es inmutable: cada recarga crea una instantánea
+  nueva y la publica con una sola asignación (atómica).
+- Se recarga solo cuando cambia la fecha de modificación
+  del archivo, así las consultas son O(1) y seguras entre hilos.
+- La recarga corre en un hilo aparte (una a la vez): mientras
+  tanto las consultas siguen respondiendo con la instantánea
+  anterior, aunque leer el Excel tarde segundos.
+- Mantiene además la lista ordenada de pedidos para
+  autocompletar por prefijo con búsqueda binaria (bisect).
+------------------------------------------------------------
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from types import MappingProxyType
+
+from modules.tablas_etapas import leer_tabla
+
+# Columnas de FENIX_ANS → claves que espera el formulario
+CAMPOS_FORMULARIO = {
+    "clienteid": "CLIENTEID",
+    "nombre_cliente": "NOMBRE_CLIENTE",
+    "telefono": "TELEFONO_CONTACTO",
+    "celular": "CELULAR_CONTACTO",
+    "direccion": "DIRECCION",
+    "fecha_limite_ans": "FECHA_LIMITE_ANS",
+    "estado_fenix": "ESTADO",
+}
+
+# Segundos mínimos entre dos revisiones del mtime del archivo
+INTERVALO_REVISION = 2.0
+
+
+class _Instantanea:
+    """Foto inmutable del índice en un momento dado."""
+
+    __slots__ = ("mtime", "datos", "json", "pedidos")
+
+    def __init__(self, mtime=None, datos=None, json_pedidos=None):
+        self.mtime = mtime
+        self.datos = MappingProxyType(datos or {})
+        self.json = MappingProxyType(json_pedidos or {})
+        self.pedidos = tuple(sorted(self.datos))
+
+
+class IndiceFenix:
+    """Índice PEDIDO → datos FENIX con recarga en caliente por mtime."""
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self._lock = threading.Lock()
+        self._recargando = False
+        self._ultima_revision = 0.0
+        self._actual = _Instantanea()
+        self.recargar_si_cambio(forzar=True)
+
+    # --------------------------------------------------------
+    # CONSTRUCCIÓN
+    # --------------------------------------------------------
+    def _construir(self, mtime):
+        df = leer_tabla(self.ruta)
+        df.columns = df.columns.str.strip().str.upper()
+
+        if "PEDIDO" not in df.columns:
+            print("⚠ FENIX_ANS no tiene columna PEDIDO; índice vacío.")
+            return _Instantanea(mtime)
+
+        df = df.fillna("")
+        df["PEDIDO"] = df["PEDIDO"].astype(str).str.strip()
+        df = df[df["PEDIDO"] != ""].drop_duplicates(subset="PEDIDO", keep="first")
+
+        columnas = {clave: col for clave, col in CAMPOS_FORMULARIO.items() if col in df.columns}
+        datos, json_pedidos = {}, {}
+
+        for registro in df[["PEDIDO"] + list(columnas.values())].to_dict("records"):
+            payload = {"origen": "fenix"}
+            for clave in CAMPOS_FORMULARIO:
+                payload[clave] = str(registro.get(columnas.get(clave), "")) if clave in columnas else ""
+            pedido = registro["PEDIDO"]
+            datos[pedido] = MappingProxyType(payload)
+            json_pedidos[pedido] = json.dumps(payload, ensure_ascii=False)
+
+        return _Instantanea(mtime, datos, json_pedidos)
+
+    def recargar_si_cambio(self, forzar=False):
+        """
+        Revisa el mtime de FENIX_ANS y, si cambió, reconstruye el índice en
+        segundo plano. forzar=True (arranque) lo reconstruye aquí mismo.
+        """
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_revision < INTERVALO_REVISION:
+            return
+        self._ultima_revision = ahora
+
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except FileNotFoundError:
+            if self._actual.datos:
+                print("⚠ FENIX_ANS no encontrado; se conserva el índice anterior.")
+            return
+
+        if forzar:
+            self._recargar(mtime)
+            return
+        if mtime == self._actual.mtime:
+            return
+
+        with self._lock:
+            # Ya hay una recarga en curso: al terminar, la próxima revisión ve si hubo otro cambio
+            if self._recargando:
+                return
+            self._recargando = True
+        threading.Thread(target=self._recargar_en_segundo_plano, args=(mtime,),
+                         name="recarga-indice-fenix", daemon=True).start()
+
+    def _recargar_en_segundo_plano(self, mtime):
+        try:
+            self._recargar(mtime)
+        finally:
+            with self._lock:
+                self._recargando = False
+
+    def _recargar(self, mtime):
+        inicio = time.perf_counter()
+        try:
+            nueva = self._construir(mtime)
+        except Exception as e:
+            # Archivo a medio escribir o bloqueado: se reintenta en la próxima revisión
+            print(f"⚠ No se pudo recargar FENIX_ANS ({e}); se conserva el índice anterior.")
+        else:
+            self._actual = nueva
+            print(f"📇 Índice FENIX cargado: {len(nueva.datos)} pedidos "
+                  f"en {time.perf_counter() - inicio:.2f} s")
+
+    # --------------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------------
+    def instantanea(self):
+        self.recargar_si_cambio()
+        return self._actual
+
+    def vacio(self):
+        return not self.instantanea().datos
+
+    def buscar(self, pedido):
+        """Devuelve los datos del pedido (solo lectura) o None."""
+        return self.instantanea().datos.get(str(pedido).strip())
+
+    def buscar_json(self, pedido):
+        """Devuelve el JSON ya serializado del pedido o None."""
+        return self.instantanea().json.get(str(pedido).strip())
+
+    def buscar_prefijo(self, prefijo, limite=10):
+        """
+        Pedidos que empiezan por 'prefijo' (máximo 'limite'), en orden.
+        Dos búsquedas binarias sobre la lista ordenada: O(log n + limite).
+        """
+        prefijo = str(prefijo).strip()
+        if not prefijo:
+            return []
+        actual = self.instantanea()
+        inicio = bisect_left(actual.pedidos, prefijo)
+        fin = bisect_left(actual.pedidos, prefijo + "\uffff", lo=inicio)
+        return [actual.datos[p] | {"pedido": p}
+                for p in actual.pedidos[inicio:min(fin, inicio + limite)]]
+
+    def __len__(self):
+        return len(self.instantanea().datos)
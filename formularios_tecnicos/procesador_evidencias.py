@@ -0,0 +1,131 @@
+"""
+------------------------------------------------------------
+PROCESADOR DE EVIDENCIAS EN SEGUNDO PLANO – Formulario ANS
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- El formulario guarda el archivo tal como llega y responde.
+- Un grupo de hilos reduce y recomprime después cada evidencia:
+  • Imágenes (JPG/PNG): corrige orientación, reduce a
+    LADO_MAXIMO px y recomprime con Pillow.
+  • PDF: reescribe imágenes internas y limpia/comprime los
+    flujos con PyMuPDF (modules/optimizacion_pdf.py), sin dejar
+    de ser PDF.
+- Solo reemplaza el archivo si el resultado pesa menos
+  (escritura en temporal + reemplazo atómico).
+- Registra tamaño original, tamaño final y tiempo de
+  proceso en la tabla 'evidencias' de registros_formulario.db.
+- Con almacén de blobs, una evidencia con el mismo contenido
+  que otra ya subida se enlaza a esa copia (estado DUPLICADO).
+------------------------------------------------------------
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from modules.almacen_blobs import hash_archivo
+from modules.optimizacion_pdf import fitz, optimizar_pdf  # fitz = None sin PyMuPDF
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow no instalado → imágenes se dejan como llegan
+    Image = None
+
+# Parámetros de compresión
+LADO_MAXIMO = 1600        # px del lado más largo en fotos
+CALIDAD_JPEG = 80
+
+EXT_IMAGEN = {"jpg", "jpeg", "png"}
+
+
+class ProcesadorEvidencias:
+    """Cola de post-procesamiento de evidencias subidas al formulario."""
+
+    def __init__(self, almacen=None, hilos=2, blobs=None):
+        self.almacen = almacen
+        self.blobs = blobs
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="evidencias")
+
+    def encolar(self, pedido, ruta):
+        """Agenda el procesamiento; no bloquea la respuesta del formulario."""
+        return self._pool.submit(self._procesar_seguro, str(pedido), Path(ruta))
+
+    def cerrar(self, esperar=True):
+        self._pool.shutdown(wait=esperar)
+
+    # --------------------------------------------------------
+    # PROCESAMIENTO
+    # --------------------------------------------------------
+    def _procesar_seguro(self, pedido, ruta):
+        inicio = time.perf_counter()
+        original = ruta.stat().st_size if ruta.exists() else 0
+        try:
+            # Hash de lo que llegó: el blob se guarda con el de los bytes ya optimizados
+            sha = hash_archivo(ruta) if self.blobs is not None else None
+            if sha and self.blobs.enlazar_llegada(ruta, sha):
+                # Mismo archivo ya subido: no se procesa de nuevo
+                estado = "DUPLICADO"
+            else:
+                estado = self.procesar(ruta)
+                if sha and self.blobs.incorporar(ruta, sha)[1]:
+                    estado = "DUPLICADO"
+        except Exception as e:
+            estado = f"ERROR: {e}"
+            print(f"⚠ No se pudo optimizar {ruta.name}: {e}")
+
+        final = ruta.stat().st_size if ruta.exists() else 0
+        segundos = time.perf_counter() - inicio
+        print(f"🗜️ {ruta.name}: {original / 1024:.0f} KB → {final / 1024:.0f} KB "
+              f"({estado}, {segundos:.2f} s)")
+
+        if self.almacen is not None:
+            self.almacen.registrar_evidencia(pedido, ruta.name, original, final, segundos, estado)
+        return estado
+
+    def procesar(self, ruta):
+        """Optimiza un archivo en sitio. Devuelve el estado del proceso."""
+        ext = ruta.suffix.lower().lstrip(".")
+        temporal = ruta.with_name(f"~tmp_{ruta.name}")
+
+        if ext in EXT_IMAGEN:
+            if Image is None:
+                return "SIN PILLOW"
+        elif ext == "pdf":
+            if fitz is None:
+                return "SIN PYMUPDF"
+        else:
+            return "OMITIDO"
+
+        try:
+            if ext == "pdf":
+                self._optimizar_pdf(ruta, temporal)
+            else:
+                self._optimizar_imagen(ruta, temporal, ext)
+
+            # Conservar el original si la versión optimizada no ahorra espacio
+            if temporal.stat().st_size >= ruta.stat().st_size:
+                return "SIN AHORRO"
+            os.replace(temporal, ruta)
+            return "OPTIMIZADO"
+        finally:
+            # Si Pillow / PyMuPDF fallan (o no hubo ahorro) el temporal no queda en uploads
+            temporal.unlink(missing_ok=True)
+
+    def _optimizar_imagen(self, ruta, temporal, ext):
+        with Image.open(ruta) as img:
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((LADO_MAXIMO, LADO_MAXIMO), Image.LANCZOS)
+
+            if ext == "png":
+                img.save(temporal, format="PNG", optimize=True)
+            else:
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                img.save(temporal, format="JPEG", quality=CALIDAD_JPEG,
+                         optimize=True, progressive=True)
+
+    def _optimizar_pdf(self, ruta, temporal):
+        optimizar_pdf(ruta, temporal)
@@ -0,0 +1,164 @@
+"""
+------------------------------------------------------------
+HISTÓRICO DE PEDIDOS ANS – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Etapa del informe (después de merge actas): agrega la foto
+  del día de FENIX_ANS a data_clean/historico_ans.db
+  (modules/almacen_historico.py). FENIX_ANS.xlsx se reescribe
+  en cada corrida; el histórico conserva un día por foto.
+- En la misma etapa, la bitácora de eventos: lo que cambió por
+  pedido desde la corrida anterior (aparece, cambia de ESTADO o
+  ESTADO_FENIX, el técnico reporta ejecutado, sale del informe)
+  y de ahí los tiempos de ciclo.
+- Consultas desde la terminal, sin abrir Excel viejos:
+    python historico_ans.py fotos
+    python historico_ans.py tendencia --por estado --actividad ALEGN --dias 90
+    python historico_ans.py cohorte --estado VENCIDO --actividad ALEGN \
+        --tipo-direccion Rural --desde 2025-07-01 --hasta 2025-09-30 --por subzona
+    python historico_ans.py pedido 22750001
+    python historico_ans.py eventos --pedido 22750001
+    python historico_ans.py eventos --evento ESTADO SALE --dias 7
+    python historico_ans.py ciclos --por actividad --dias 90
+    python historico_ans.py sql "SELECT estado, COUNT(*) FROM pedidos_dia GROUP BY 1"
+  --csv <ruta> guarda el resultado además de mostrarlo.
+------------------------------------------------------------
+"""
+
+import argparse
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from modules.almacen_historico import DIMENSIONES, DIMENSIONES_CICLO, EVENTOS, AlmacenHistorico
+from modules.instrumentacion import medido, medir
+from modules.tablas_etapas import leer_tabla
+
+base_path = Path(__file__).resolve().parent
+ruta_fenix_ans = base_path / "data_clean" / "FENIX_ANS.xlsx"
+ruta_historico = base_path / "data_clean" / "historico_ans.db"
+
+
+# ------------------------------------------------------------
+# ETAPA COMPLETA (importable desde el worker del panel)
+# ------------------------------------------------------------
+@medido("historico", "total")
+def ejecutar(df=None):
+    """
+    Agrega la foto de hoy al histórico. 'df' es la hoja FENIX_ANS que
+    dejó merge actas; sin él se lee FENIX_ANS. Devuelve la hoja.
+    """
+    with medir("historico", "leer") as paso:
+        if df is None:
+            df = leer_tabla(ruta_fenix_ans, texto=False, hoja="FENIX_ANS")
+        paso.filas(salida=len(df))
+
+    historico = AlmacenHistorico(ruta_historico)
+    with medir("historico", "escribir") as paso:
+        filas = historico.registrar_dia(df)
+        paso.filas(entrada=len(df), salida=filas)
+    print(f"🕰️ Histórico: {filas} pedidos en la foto del {datetime.now():%Y-%m-%d} ({ruta_historico.name})")
+
+    with medir("historico", "eventos") as paso:
+        resumen = historico.registrar_corrida(df)
+        paso.filas(entrada=len(df), salida=resumen["eventos"])
+    print(f"🧭 Bitácora: {resumen['cambios']} pedidos con cambios, {resumen['eventos']} eventos nuevos")
+    return df
+
+
+# ------------------------------------------------------------
+# CONSULTAS (CLI)
+# ------------------------------------------------------------
+def _filtros(args):
+    return {d: getattr(args, d) for d in DIMENSIONES if getattr(args, d, None)}
+
+
+def _rango(args):
+    desde = args.desde
+    if args.dias and not desde:
+        desde = (datetime.now() - timedelta(days=args.dias)).strftime("%Y-%m-%d")
+    return desde, args.hasta
+
+
+def consultar(args):
+    historico = AlmacenHistorico(args.db)
+    inicio = time.perf_counter()
+    try:
+        if args.consulta == "fotos":
+            resultado = historico.fotos()
+        elif args.consulta == "tendencia":
+            resultado = historico.tendencia(args.por, *_rango(args), **_filtros(args))
+        elif args.consulta == "cohorte":
+            filtros = _filtros(args)
+            filtros.pop("estado", None)
+            resultado = historico.cohorte(args.estado, args.por, *_rango(args), **filtros)
+        elif args.consulta == "pedido":
+            resultado = historico.pedido(args.pedido)
+        elif args.consulta == "eventos":
+            resultado = historico.eventos(args.pedido, args.evento, *_rango(args))
+        elif args.consulta == "ciclos":
+            resultado = historico.tiempos_ciclo(args.por, *_rango(args), detalle=args.detalle)
+        else:
+            resultado = historico.consultar(args.sql)
+    except (pd.errors.DatabaseError, sqlite3.Error, ValueError) as e:
+        # SQL libre mal escrito o que intenta escribir: el histórico es de solo lectura aquí
+        print(f"❌ Consulta no válida: {e}")
+        sys.exit(1)
+    segundos = time.perf_counter() - inicio
+
+    with pd.option_context("display.max_rows", args.filas, "display.max_columns", None, "display.width", 200):
+        print(resultado)
+    print(f"⏱️ {len(resultado)} filas en {segundos * 1000:.0f} ms")
+    if args.csv:
+        resultado.to_csv(args.csv, encoding="utf-8-sig")
+        print(f"💾 {args.csv}")
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Histórico diario de pedidos ANS")
+    parser.add_argument("--db", default=str(ruta_historico))
+    parser.add_argument("--csv", help="Guarda el resultado en este CSV")
+    parser.add_argument("--filas", type=int, default=60, help="Filas a mostrar")
+    sub = parser.add_subparsers(dest="consulta")
+
+    sub.add_parser("registrar", help="Agrega la foto de hoy desde FENIX_ANS (lo mismo que la etapa)")
+    sub.add_parser("fotos", help="Días guardados y pedidos por día")
+    for nombre, ayuda in (("tendencia", "Pedidos por día y por --por"),
+                          ("cohorte", "Pedidos distintos que estuvieron en --estado en el rango")):
+        p = sub.add_parser(nombre, help=ayuda)
+        p.add_argument("--por", choices=DIMENSIONES, default="estado" if nombre == "tendencia" else None)
+        p.add_argument("--desde", help="AAAA-MM-DD (día de la foto)")
+        p.add_argument("--hasta", help="AAAA-MM-DD (incluido)")
+        p.add_argument("--dias", type=int, help="Últimos N días (si no hay --desde)")
+        for dimension in DIMENSIONES:
+            p.add_argument(f"--{dimension.replace('_', '-')}", dest=dimension, nargs="+",
+                           required=nombre == "cohorte" and dimension == "estado")
+    p = sub.add_parser("pedido", help="Todas las fotos de un pedido")
+    p.add_argument("pedido")
+    p = sub.add_parser("eventos", help="Bitácora de cambios por corrida")
+    p.add_argument("--pedido", nargs="+")
+    p.add_argument("--evento", nargs="+", choices=["APARECE", "SALE", *EVENTOS.values()])
+    p = sub.add_parser("ciclos", help="Horas recepción → ejecución → digitación y en ALERTA (pedidos que salieron en el rango)")
+    p.add_argument("--por", choices=DIMENSIONES_CICLO)
+    p.add_argument("--detalle", action="store_true", help="Una fila por pedido")
+    for p in (sub.choices["eventos"], sub.choices["ciclos"]):
+        p.add_argument("--desde", help="AAAA-MM-DD")
+        p.add_argument("--hasta", help="AAAA-MM-DD (incluido)")
+        p.add_argument("--dias", type=int, help="Últimos N días (si no hay --desde)")
+    p = sub.add_parser("sql", help="Consulta SQL libre (pedidos_dia, conteos_dia, fotos, eventos, ciclo, corridas)")
+    p.add_argument("sql")
+    args = parser.parse_args()
+
+    if args.consulta in (None, "registrar"):
+        ejecutar()
+    else:
+        consultar(args)
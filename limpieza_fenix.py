@@ -21,6 +21,12 @@ from datetime import datetime
 from openpyxl import load_workbook
 from openpyxl.worksheet.table import Table, TableStyleInfo
 import sys   # ✅ agregado para permitir usar sys.exit()
+import re
+import unicodedata
+
+from modules.etapas_memoria import leer_precargado
+from modules.instrumentacion import medido
+from modules.tablas_etapas import guardar_tabla
 
 
 # ------------------------------------------------------------
@@ -30,57 +36,9 @@ base_path = Path(__file__).resolve().parent
 ruta_clean = base_path / "data_clean" / "FENIX_CLEAN.xlsx"
 ruta_log = base_path / "data_clean" / "log_limpieza.txt"
 
-# Buscar archivo CSV más reciente
-archivos_csv = sorted(base_path.glob("data_raw/pendientes_*.csv"), key=lambda x: x.stat().st_mtime, reverse=True)
-if not archivos_csv:
-    raise FileNotFoundError("No se encontró ningún archivo CSV en data_raw/")
-ruta_raw = archivos_csv[0]
-
-print(f"📂 Archivo detectado automáticamente: {ruta_raw.name}")
-
 # ------------------------------------------------------------
-# CARGA DE DATOS – Lectura segura del CSV con control de errores
+# PARÁMETROS DE LIMPIEZA
 # ------------------------------------------------------------
-try:
-    print(f"🔍 Intentando leer archivo CSV: {ruta_raw}")
-    
-    # Abrir manualmente con manejo de errores a nivel del sistema
-    with open(ruta_raw, "r", encoding="latin-1", errors="ignore") as f:
-        df = pd.read_csv(f, sep=",", dtype=str, quotechar='"', on_bad_lines="skip", engine="python")
-
-    print(f"✅ Archivo leído correctamente con codificación: latin-1")
-    print(f"📊 Registros cargados: {len(df)}")
-
-except Exception as e:
-    print(f"❌ Error al leer el archivo CSV: {e}")
-    sys.exit(1)
-
-# ------------------------------------------------------------
-# LIMPIEZA BÁSICA
-# ------------------------------------------------------------
-import unicodedata
-
-# Normaliza nombres de columnas: quita tildes, espacios y mayúsculas
-def normalizar_columna(nombre):
-    nombre = str(nombre).strip().upper().replace(" ", "_")
-    # elimina tildes y caracteres especiales
-    nombre = ''.join(
-        c for c in unicodedata.normalize('NFD', nombre)
-        if unicodedata.category(c) != 'Mn'
-    )
-    return nombre
-
-df.columns = [normalizar_columna(c) for c in df.columns]
-
-
-# Renombrar si hay tildes en columnas
-if "TIPO_DIRECCIÓN" in df.columns and "TIPO_DIRECCION" not in df.columns:
-    df.rename(columns={"TIPO_DIRECCIÓN": "TIPO_DIRECCION"}, inplace=True)
-
-if "INSTALACIÓN" in df.columns and "INSTALACION" not in df.columns:
-    df.rename(columns={"INSTALACIÓN": "INSTALACION"}, inplace=True)
-
-
 # Columnas requeridas
 columnas_utiles = [
     "PEDIDO", "PRODUCTO_ID", "TIPO_TRABAJO", "TIPO_ELEMENTO_ID",
@@ -90,64 +48,42 @@ columnas_utiles = [
     "NOMBRE", "TIPO_DIRECCION"
 ]
 
-# Crear columnas faltantes vacías
-for col in columnas_utiles:
-    if col not in df.columns:
-        df[col] = None
-
-# Reordenar columnas
-df = df[columnas_utiles].copy()
-print("✅ Todas las columnas requeridas presentes (faltantes creadas vacías).")
-
-# ------------------------------------------------------------
-# FILTRO DE ACTIVIDADES
-# ------------------------------------------------------------
 actividades_validas = [
     "ACREV", "ALEGN", "ALEGA", "ALECA", "ALEMN", "ACAMN",
     "AMRTR", "APLIN", "REEQU", "INPRE", "DIPRE",
     "ARTER", "AEJDO"
 ]
-df = df[df["ACTIVIDAD"].isin(actividades_validas)]
-# ------------------------------------------------------------
-# FILTRO DE ACTIVIDADES
-# ------------------------------------------------------------
-actividades_validas = [
-    "ACREV", "ALEGN", "ALEGA", "ALECA", "ALEMN", "ACAMN",
-    "AMRTR", "APLIN", "REEQU", "INPRE", "DIPRE",
-    "ARTER", "AEJDO"
-]
-df = df[df["ACTIVIDAD"].isin(actividades_validas)]
 
-# ------------------------------------------------------------
-# FILTRO DE NOMBRES PROHIBIDOS
-# ------------------------------------------------------------
 nombres_excluir = [
     "MET Rev-Inst-Concentra E_CR014",
     "Revisor Inst. Particulares Metrosur",
     # Agregar otros si aparecen
 ]
 
-df = df[~df["NOMBRE"].isin(nombres_excluir)]
-print("🧹 Filtro de nombres aplicado. Registros depurados.")
-
-# ------------------------------------------------------------
-# LIMPIEZA DE TEXTO Y COMILLAS
-# ------------------------------------------------------------
 columnas_a_limpieza = ["DIRECCION", "INSTALACION"]
-for col in columnas_a_limpieza:
-    if col in df.columns:
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.replace("^'", "", regex=True)
-            .str.replace("'", "", regex=False)
-            .str.strip()
-        )
-# ------------------------------------------------------------
-# CLASIFICACIÓN TIPO_DIRECCION SEGÚN PREFIJO NUMÉRICO (VERSIÓN FINAL BLINDADA)
-# ------------------------------------------------------------
+
 prefijos_urbanos = ("116", "136", "103", "114", "117", "119", "163", "140", "159", "167")
 
+columnas_fecha = [
+    "FECHA_RECIBO",
+    "FECHA_INICIO_ANS",
+    "FECHA_CONCEPTO",
+    "FECHA_INGRESO_SOL",
+    "FECHA_PROGRAMACION"
+]
+
+
+# Normaliza nombres de columnas: quita tildes, espacios y mayúsculas
+def normalizar_columna(nombre):
+    nombre = str(nombre).strip().upper().replace(" ", "_")
+    # elimina tildes y caracteres especiales
+    nombre = ''.join(
+        c for c in unicodedata.normalize('NFD', nombre)
+        if unicodedata.category(c) != 'Mn'
+    )
+    return nombre
+
+
 def clasificar_tipo_direccion(direccion, tipo_original):
     """
     - direccion: valor original de Fénix
@@ -173,7 +109,6 @@ def clasificar_tipo_direccion(direccion, tipo_original):
     # 2) ELIMINAR NÚMEROS DENTRO DE PARÉNTESIS
     #    EJ: (INTERIOR 114) → se elimina
     # --------------------------------------------------------
-    import re
     valor_sin_parentesis = re.sub(r"\(.*?\)", "", valor).strip()
 
     # --------------------------------------------------------
@@ -210,79 +145,29 @@ def clasificar_tipo_direccion(direccion, tipo_original):
     return tipo_original
 
 
-# Aplicación de la función
-df["TIPO_DIRECCION"] = df.apply(
-    lambda fila: clasificar_tipo_direccion(fila["DIRECCION"], fila["TIPO_DIRECCION"]),
-    axis=1
-)
-# ------------------------------------------------------------
-# 🔧 NORMALIZACIÓN DE FECHAS (detección dual ISO / Latino)
-# ------------------------------------------------------------
-columnas_fecha = [
-    "FECHA_RECIBO",
-    "FECHA_INICIO_ANS",
-    "FECHA_CONCEPTO",
-    "FECHA_INGRESO_SOL",
-    "FECHA_PROGRAMACION"
-]
+# Intentar detectar formato antes de convertir
+def convertir_fecha_segura(valor):
+    if pd.isna(valor) or valor in ["SIN DATOS", "nan", "NaT", "None"]:
+        return "SIN DATOS"
+    val = str(valor).strip()
+    try:
+        # Si viene en formato ISO (YYYY/MM/DD o YYYY-MM-DD)
+        if val[:4].isdigit() and val[4] in ["/", "-"]:
+            fecha = pd.to_datetime(val, errors="coerce", dayfirst=False)
+        # Si viene en formato latino (DD/MM/YYYY o D/M/YYYY)
+        else:
+            fecha = pd.to_datetime(val, errors="coerce", dayfirst=True)
 
-for col in columnas_fecha:
-    if col in df.columns:
-        # Limpieza previa de textos y espacios
-        df[col] = (
-            df[col]
-            .astype(str)
-            .str.strip()
-            .replace("p. m.", "PM", regex=False)
-            .replace("p.m.", "PM", regex=False)
-            .replace("a. m.", "AM", regex=False)
-            .replace("a.m.", "AM", regex=False)
-        )
-
-        # Intentar detectar formato antes de convertir
-        def convertir_fecha_segura(valor):
-            if pd.isna(valor) or valor in ["SIN DATOS", "nan", "NaT", "None"]:
-                return "SIN DATOS"
-            val = str(valor).strip()
-            try:
-                # Si viene en formato ISO (YYYY/MM/DD o YYYY-MM-DD)
-                if val[:4].isdigit() and val[4] in ["/", "-"]:
-                    fecha = pd.to_datetime(val, errors="coerce", dayfirst=False)
-                # Si viene en formato latino (DD/MM/YYYY o D/M/YYYY)
-                else:
-                    fecha = pd.to_datetime(val, errors="coerce", dayfirst=True)
-
-                if pd.isna(fecha):
-                    return "SIN DATOS"
-                return fecha.strftime("%d/%m/%Y %H:%M:%S")
-            except:
-                return "SIN DATOS"
-
-        df[col] = df[col].apply(convertir_fecha_segura)
-
-print("🧭 Columnas de fecha convertidas correctamente (ISO o Latino detectado automáticamente).")
+        if pd.isna(fecha):
+            return "SIN DATOS"
+        return fecha.strftime("%d/%m/%Y %H:%M:%S")
+    except:
+        return "SIN DATOS"
 
-# ------------------------------------------------------------
-# RELLENAR VACÍOS CON 'SIN DATOS'
-# ------------------------------------------------------------
-df = df.fillna("SIN DATOS")
-df.replace("", "SIN DATOS", inplace=True)
 
-# ------------------------------------------------------------
-# GENERAR RESUMEN
-# ------------------------------------------------------------
-total_registros = len(df)
-filas_vacias = (df == "SIN DATOS").all(axis=1).sum()
-duplicados_pedido = df.duplicated(subset="PEDIDO").sum()
-
-resumen = pd.DataFrame({
-    "MÉTRICA": ["Total registros", "Filas completamente vacías", "Duplicados por PEDIDO"],
-    "VALOR": [total_registros, filas_vacias, duplicados_pedido]
-})
 # ------------------------------------------------------------
 # CÁLCULO DE DIAS_PACTADOS SEGÚN ACTIVIDAD Y TIPO_DIRECCION
 # ------------------------------------------------------------
-
 def calcular_dias_pactados(fila):
     actividad = str(fila["ACTIVIDAD"]).upper().strip()
     tipo_dir = str(fila["TIPO_DIRECCION"]).upper().strip()
@@ -297,37 +182,192 @@ def calcular_dias_pactados(fila):
     else:
         return 0  # temporal mientras confirmas las demás reglas
 
-# Aplicar la función a cada fila
-df["DIAS_PACTADOS"] = df.apply(calcular_dias_pactados, axis=1)
-print("🧮 Columna 'DIAS_PACTADOS' generada exitosamente.")
 
 # ------------------------------------------------------------
-# EXPORTACIÓN A EXCEL (2 hojas)
+# CARGA DE DATOS – Lectura segura del CSV con control de errores
 # ------------------------------------------------------------
-ruta_clean.parent.mkdir(exist_ok=True)
-
-with pd.ExcelWriter(ruta_clean, engine="openpyxl") as writer:
-    # Hoja principal
-    df.to_excel(writer, index=False, sheet_name="FENIX_CLEAN")
-    ws = writer.sheets["FENIX_CLEAN"]
+def detectar_csv():
+    """Archivo pendientes_*.csv más reciente de data_raw/."""
+    archivos_csv = sorted(base_path.glob("data_raw/pendientes_*.csv"), key=lambda x: x.stat().st_mtime, reverse=True)
+    if not archivos_csv:
+        raise FileNotFoundError("No se encontró ningún archivo CSV en data_raw/")
+    return archivos_csv[0]
 
-    n_filas, n_cols = df.shape
-    ultima_col = chr(65 + n_cols - 1)
-    rango_tabla = f"A1:{ultima_col}{n_filas + 1}"
 
-    tabla = Table(displayName="TABLA_FENIX", ref=rango_tabla)
-    estilo = TableStyleInfo(
-        name="TableStyleMedium2",
-        showRowStripes=True
+def leer_archivo_csv(ruta_raw):
+    # Abrir manualmente con manejo de errores a nivel del sistema
+    with open(ruta_raw, "r", encoding="latin-1", errors="ignore") as f:
+        return pd.read_csv(f, sep=",", dtype=str, quotechar='"', on_bad_lines="skip", engine="python")
+
+
+def entradas_crudas():
+    """(ruta, lector) que el worker puede empezar a leer en paralelo."""
+    return [(detectar_csv(), leer_archivo_csv)]
+
+
+@medido("limpieza", "leer")
+def leer_csv(ruta_raw):
+    try:
+        print(f"🔍 Intentando leer archivo CSV: {ruta_raw}")
+        df = leer_precargado(ruta_raw, leer_archivo_csv)
+
+        print(f"✅ Archivo leído correctamente con codificación: latin-1")
+        print(f"📊 Registros cargados: {len(df)}")
+
+    except Exception as e:
+        print(f"❌ Error al leer el archivo CSV: {e}")
+        sys.exit(1)
+    return df
+
+
+@medido("limpieza", "transformar")
+def limpiar(df):
+    """Aplica la limpieza completa y devuelve (df, resumen)."""
+    # ------------------------------------------------------------
+    # LIMPIEZA BÁSICA
+    # ------------------------------------------------------------
+    df.columns = [normalizar_columna(c) for c in df.columns]
+
+    # Renombrar si hay tildes en columnas
+    if "TIPO_DIRECCIÓN" in df.columns and "TIPO_DIRECCION" not in df.columns:
+        df.rename(columns={"TIPO_DIRECCIÓN": "TIPO_DIRECCION"}, inplace=True)
+
+    if "INSTALACIÓN" in df.columns and "INSTALACION" not in df.columns:
+        df.rename(columns={"INSTALACIÓN": "INSTALACION"}, inplace=True)
+
+    # Crear columnas faltantes vacías
+    for col in columnas_utiles:
+        if col not in df.columns:
+            df[col] = None
+
+    # Reordenar columnas
+    df = df[columnas_utiles].copy()
+    print("✅ Todas las columnas requeridas presentes (faltantes creadas vacías).")
+
+    # ------------------------------------------------------------
+    # FILTRO DE ACTIVIDADES
+    # ------------------------------------------------------------
+    df = df[df["ACTIVIDAD"].isin(actividades_validas)]
+
+    # ------------------------------------------------------------
+    # FILTRO DE NOMBRES PROHIBIDOS
+    # ------------------------------------------------------------
+    df = df[~df["NOMBRE"].isin(nombres_excluir)]
+    print("🧹 Filtro de nombres aplicado. Registros depurados.")
+
+    # ------------------------------------------------------------
+    # LIMPIEZA DE TEXTO Y COMILLAS
+    # ------------------------------------------------------------
+    for col in columnas_a_limpieza:
+        if col in df.columns:
+            df[col] = (
+                df[col]
+                .astype(str)
+                .str.replace("^'", "", regex=True)
+                .str.replace("'", "", regex=False)
+                .str.strip()
+            )
+
+    # Clasificación TIPO_DIRECCION según prefijo numérico
+    df["TIPO_DIRECCION"] = df.apply(
+        lambda fila: clasificar_tipo_direccion(fila["DIRECCION"], fila["TIPO_DIRECCION"]),
+        axis=1
     )
-    tabla.tableStyleInfo = estilo
-    ws.add_table(tabla)
 
-    # Hoja de resumen
-    resumen.to_excel(writer, index=False, sheet_name="RESUMEN")
-    ws2 = writer.sheets["RESUMEN"]
+    # ------------------------------------------------------------
+    # 🔧 NORMALIZACIÓN DE FECHAS (detección dual ISO / Latino)
+    # ------------------------------------------------------------
+    for col in columnas_fecha:
+        if col in df.columns:
+            # Limpieza previa de textos y espacios
+            df[col] = (
+                df[col]
+                .astype(str)
+                .str.strip()
+                .replace("p. m.", "PM", regex=False)
+                .replace("p.m.", "PM", regex=False)
+                .replace("a. m.", "AM", regex=False)
+                .replace("a.m.", "AM", regex=False)
+            )
+            df[col] = df[col].apply(convertir_fecha_segura)
+
+    print("🧭 Columnas de fecha convertidas correctamente (ISO o Latino detectado automáticamente).")
+
+    # ------------------------------------------------------------
+    # RELLENAR VACÍOS CON 'SIN DATOS'
+    # ------------------------------------------------------------
+    df = df.fillna("SIN DATOS")
+    df.replace("", "SIN DATOS", inplace=True)
+
+    # ------------------------------------------------------------
+    # GENERAR RESUMEN
+    # ------------------------------------------------------------
+    total_registros = len(df)
+    filas_vacias = (df == "SIN DATOS").all(axis=1).sum()
+    duplicados_pedido = df.duplicated(subset="PEDIDO").sum()
+
+    resumen = pd.DataFrame({
+        "MÉTRICA": ["Total registros", "Filas completamente vacías", "Duplicados por PEDIDO"],
+        "VALOR": [total_registros, filas_vacias, duplicados_pedido]
+    })
+
+    # Aplicar la función a cada fila
+    df["DIAS_PACTADOS"] = df.apply(calcular_dias_pactados, axis=1)
+    print("🧮 Columna 'DIAS_PACTADOS' generada exitosamente.")
+
+    return df, resumen
+
+
+@medido("limpieza", "escribir")
+def exportar(df, resumen):
+    # ------------------------------------------------------------
+    # EXPORTACIÓN A EXCEL (2 hojas)
+    # ------------------------------------------------------------
+    ruta_clean.parent.mkdir(exist_ok=True)
+
+    with pd.ExcelWriter(ruta_clean, engine="openpyxl") as writer:
+        # Hoja principal
+        df.to_excel(writer, index=False, sheet_name="FENIX_CLEAN")
+        ws = writer.sheets["FENIX_CLEAN"]
+
+        n_filas, n_cols = df.shape
+        ultima_col = chr(65 + n_cols - 1)
+        rango_tabla = f"A1:{ultima_col}{n_filas + 1}"
+
+        tabla = Table(displayName="TABLA_FENIX", ref=rango_tabla)
+        estilo = TableStyleInfo(
+            name="TableStyleMedium2",
+            showRowStripes=True
+        )
+        tabla.tableStyleInfo = estilo
+        ws.add_table(tabla)
+
+        # Hoja de resumen
+        resumen.to_excel(writer, index=False, sheet_name="RESUMEN")
+        ws2 = writer.sheets["RESUMEN"]
+
+    # Copia tipada para las etapas siguientes (data_clean/tablas/)
+    guardar_tabla(df, ruta_clean)
+
+
+# ------------------------------------------------------------
+# ETAPA COMPLETA (importable desde el worker del panel)
+# ------------------------------------------------------------
+@medido("limpieza", "total")
+def ejecutar():
+    """Lee el CSV más reciente, limpia, exporta FENIX_CLEAN.xlsx y devuelve el DataFrame."""
+    ruta_raw = detectar_csv()
+    print(f"📂 Archivo detectado automáticamente: {ruta_raw.name}")
+
+    df, resumen = limpiar(leer_csv(ruta_raw))
+    exportar(df, resumen)
+
+    print("✅ Archivo limpio, con 'SIN DATOS' y resumen generado exitosamente.")
+    print(f"📁 Archivo: {ruta_clean}")
+    print(f"🧮 Registros: {len(df)}")
+    print(f"📝 Log: {ruta_log}")
+    return df
+
 
-print("✅ Archivo limpio, con 'SIN DATOS' y resumen generado exitosamente.")
-print(f"📁 Archivo: {ruta_clean}")
-print(f"🧮 Registros: {len(df)}")
-print(f"📝 Log: {ruta_log}")
\ No newline at end of file
+if __name__ == "__main__":
+    ejecutar()
@@ -19,6 +19,9 @@ from openpyxl import load_workbook
 from openpyxl.worksheet.table import Table, TableStyleInfo
 from openpyxl.formatting.rule import FormulaRule
 
+from modules.instrumentacion import iniciar_paso
+from modules.tablas_etapas import leer_tabla
+
 # ------------------------------------------------------------
 # RUTAS
 # ------------------------------------------------------------
@@ -31,7 +34,9 @@ ruta_salida = base / "data_clean" / "VALIDACION_EXPORT.xlsx"
 # ------------------------------------------------------------
 # CARGA DE ARCHIVOS
 # ------------------------------------------------------------
-df_fenix = pd.read_excel(ruta_fenix)
+paso_total = iniciar_paso("mano_obra", "total")
+paso = iniciar_paso("mano_obra", "leer")
+df_fenix = leer_tabla(ruta_fenix, texto=False)
 df_alm = pd.read_excel(ruta_almacen)
 df_rel = pd.read_excel(ruta_relacion)
 
@@ -43,10 +48,12 @@ df_fenix['pedido'] = df_fenix['pedido'].astype(str).str.strip()
 df_alm['pedido'] = df_alm['pedido'].astype(str).str.strip()
 df_rel['mano_obra'] = df_rel['mano_obra'].astype(str).str.strip()
 df_rel['material_obligatorio'] = df_rel['material_obligatorio'].astype(str).str.strip()
+paso.cerrar(entrada=len(df_alm) + len(df_rel), salida=len(df_fenix))
 
 # ------------------------------------------------------------
 # VALIDACIÓN PRINCIPAL
 # ------------------------------------------------------------
+paso = iniciar_paso("mano_obra", "transformar")
 resultados = []
 
 for _, fila in df_fenix.iterrows():
@@ -90,8 +97,12 @@ for _, fila in df_fenix.iterrows():
 # EXPORTAR RESULTADO
 # ------------------------------------------------------------
 df_out = pd.DataFrame(resultados)
+paso.cerrar(entrada=len(df_fenix), salida=len(df_out))
+
+paso = iniciar_paso("mano_obra", "escribir")
 ruta_salida.parent.mkdir(parents=True, exist_ok=True)
 df_out.to_excel(ruta_salida, index=False)
+paso.cerrar(entrada=len(df_out))
 
 # ------------------------------------------------------------
 # FORMATO VISUAL – TABLA + COLORES ESTILO DASHBOARD (sin cuadricula)
@@ -101,6 +112,7 @@ from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.table import Table, TableStyleInfo
 from openpyxl import load_workbook
 
+paso = iniciar_paso("mano_obra", "formato")
 wb = load_workbook(ruta_salida)
 ws = wb.active
 ws.title = "VALIDACION"
@@ -161,6 +173,8 @@ ws.sheet_view.showGridLines = False
 
 wb.save(ruta_salida)
 wb.close()
+paso.cerrar(salida=len(df_out))
+paso_total.cerrar(entrada=len(df_fenix), salida=len(df_out))
 
 print("✅ Validación con formato limpio (sin cuadrícula y justificado a la izquierda).")
 print("Archivo generado:", ruta_salida)
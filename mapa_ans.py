@@ -4,18 +4,16 @@ Google Maps + Panel ANS + Filtros + Actividad + Tooltip Multi-Estado
 Héctor + IA – 2025
 """
 
-import pandas as pd
 import folium
 from branca.element import Template, MacroElement
 from pathlib import Path
+import os
 import re
 import sys
 
-# ============================================================
-# 0. FIX UTF-8
-# ============================================================
-sys.stdout.reconfigure(encoding="utf-8")
-sys.stderr.reconfigure(encoding="utf-8")
+from modules.etapas_memoria import como_texto
+from modules.instrumentacion import medido, medir
+from modules.tablas_etapas import leer_tabla
 
 # ============================================================
 # 1. RUTAS BASE
@@ -25,25 +23,14 @@ base_path = script_path.parent
 
 ruta_fenix = base_path / "data_clean" / "FENIX_ANS.xlsx"
 
-ruta_salida_onedrive = Path(
+# CONTROL_ANS_MAPA_ONEDRIVE cambia la copia de OneDrive (benchmark, otro equipo)
+ruta_salida_onedrive = Path(os.environ.get(
+    "CONTROL_ANS_MAPA_ONEDRIVE",
     r"C:/Users/hector.gaviria/OneDrive - Elite Ingenieros SAS/Control_ANS/mapa_ans.html"
-)
+))
 ruta_salida_proyecto = base_path / "data_output" / "mapa_ans.html"
 ruta_log_errores = base_path / "data_output" / "errores_geolocalizacion.txt"
 
-ruta_salida_onedrive.parent.mkdir(exist_ok=True)
-ruta_salida_proyecto.parent.mkdir(exist_ok=True)
-
-# ============================================================
-# 2. CARGAR FENIX_ANS
-# ============================================================
-df = pd.read_excel(ruta_fenix, sheet_name="FENIX_ANS", dtype=str)
-df.columns = df.columns.str.upper().str.strip()
-
-# 🔒 Normalización ultra segura
-df["ESTADO"] = df["ESTADO"].astype(str).str.normalize("NFKC")
-
-print(f"[INFO] Registros cargados desde FENIX_ANS.xlsx: {len(df)}")
 
 # ============================================================
 # 2.1 NORMALIZAR ESTADO (BLINDADO)
@@ -79,14 +66,10 @@ def normalizar_estado(e):
     return "SIN FECHA"
 
 
-df["ESTADO"] = df["ESTADO"].apply(normalizar_estado)
-
 # ============================================================
 # 2.2 VALIDACIÓN COORDENADAS + LOG
 # ============================================================
-errores = []
-
-def validar_coord(x, y, pedido):
+def validar_coord(x, y, pedido, errores):
     try:
         x = float(str(x).replace(",", "."))
         y = float(str(y).replace(",", "."))
@@ -100,11 +83,6 @@ def validar_coord(x, y, pedido):
 
     return x, y
 
-df["COORD_X"], df["COORD_Y"] = zip(*[
-    validar_coord(row["COORDENADAX"], row["COORDENADAY"], row["PEDIDO"])
-    for _, row in df.iterrows()
-])
-
 # ============================================================
 # 2.3 AGRUPAR POR PEDIDO Y RESOLVER ESTADOS
 # ============================================================
@@ -116,58 +94,9 @@ prioridad = {
     "SIN FECHA": 0
 }
 
-grupo = df.groupby("PEDIDO").agg({
-    "ESTADO": list,
-    "COORD_X": "first",
-    "COORD_Y": "first",
-    "ACTIVIDAD": "first"
-}).reset_index()
-
 def estado_final(lista_estados):
     return sorted(lista_estados, key=lambda x: prioridad.get(x, 0), reverse=True)[0]
 
-grupo["ESTADO_FINAL"] = grupo["ESTADO"].apply(estado_final)
-
-df_mapa = grupo.copy()
-
-# ============================================================
-# 3. ACTIVIDADES ÚNICAS
-# ============================================================
-actividades_unicas = sorted(df_mapa["ACTIVIDAD"].dropna().unique().tolist())
-
-# ============================================================
-# 4. MAPA BASE
-# ============================================================
-mapa = folium.Map(
-    location=[6.24, -75.57],
-    zoom_start=13,
-    tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
-    attr="Google"
-)
-
-mapa_id = mapa.get_name()
-
-# ============================================================
-# 5. VARIABLES JS BASE
-# ============================================================
-mapa.get_root().html.add_child(folium.Element(f"""
-<script>
-document.addEventListener("DOMContentLoaded", function() {{
-    window.mapa = {mapa_id};
-    window.marcadores = {{}};
-    window.estadoMarcadores = {{
-        "A TIEMPO": [],
-        "ALERTA": [],
-        "ALERTA_0 DIAS": [],
-        "VENCIDO": [],
-        "SIN FECHA": []
-    }};
-    window.actividadMarcadores = {{}};
-    window.listaActividades = {actividades_unicas};
-}});
-</script>
-"""))
-
 # ============================================================
 # 6. COLORES
 # ============================================================
@@ -180,62 +109,10 @@ colores = {
     "SIN FECHA": "violet"
 }
 
-# ============================================================
-# 7. MARCADORES CON TOOLTIP MULTI-ESTADO
-# ============================================================
-markers_js = "<script>\ndocument.addEventListener('DOMContentLoaded', function() {\n"
-
-for _, row in df_mapa.iterrows():
-    pedido = row["PEDIDO"]
-    lat = row["COORD_Y"]
-    lon = row["COORD_X"]
-    actividad = row["ACTIVIDAD"]
-
-    lista_estados = row["ESTADO"]
-    estado_final = row["ESTADO_FINAL"]
-
-    # Contar estados
-    conteo = {}
-    for est in lista_estados:
-        conteo[est] = conteo.get(est, 0) + 1
-
-    # Construir tooltip
-    tooltip_html = f"<b>PEDIDO: {pedido}</b><br><br>"
-    tooltip_html += "<b>ESTADOS DETECTADOS:</b><br>"
-
-    for est, cant in conteo.items():
-        tooltip_html += f"- {est} ({cant})<br>"
-
-    tooltip_html += f"<br><b>Estado final usado:</b> {estado_final}<br>"
-
-    color = colores.get(estado_final, "red")
-
-    markers_js += f"""
-var mk_{pedido} = L.marker([{lat}, {lon}], {{
-    icon: L.icon({{
-        iconUrl: "https://raw.githubusercontent.com/pointhi/leaflet-color-markers/master/img/marker-icon-{color}.png",
-        shadowUrl: "https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.7.1/images/marker-shadow.png",
-        iconSize: [{ICON_SIZE[0]}, {ICON_SIZE[1]}],
-        iconAnchor: [10, 33],
-        popupAnchor: [0, -28]
-    }})
-}}).bindTooltip(`{tooltip_html}`).addTo(window.mapa);
-
-window.marcadores["{pedido}"] = mk_{pedido};
-window.estadoMarcadores["{estado_final}"].push("{pedido}");
-
-if (!window.actividadMarcadores["{actividad}"]) {{
-    window.actividadMarcadores["{actividad}"] = [];
-}}
-window.actividadMarcadores["{actividad}"].push("{pedido}");
-"""
-
-markers_js += "});\n</script>"
-mapa.get_root().html.add_child(folium.Element(markers_js))
 # ============================================================
 # 8. PANEL COMPLETO (TU PANEL ORIGINAL SIN CAMBIOS)
 # ============================================================
-panel_html = Template("""
+PANEL_HTML = """
 {% macro html(this, kwargs) %}
 
 <style>
@@ -410,16 +287,183 @@ window.limpiarBusqueda = ()=> {
 </script>
 
 {% endmacro %}
-""")
+"""
 
-panel = MacroElement()
-panel._template = panel_html
-mapa.get_root().add_child(panel)
 
 # ============================================================
-# 9. GUARDAR MAPA
+# 2. PREPARAR DATOS (estado normalizado, coordenadas, agrupación)
 # ============================================================
-mapa.save(ruta_salida_onedrive)
-mapa.save(ruta_salida_proyecto)
+@medido("mapa", "transformar")
+def preparar_datos(df):
+    df.columns = df.columns.str.upper().str.strip()
+
+    # 🔒 Normalización ultra segura
+    df["ESTADO"] = df["ESTADO"].astype(str).str.normalize("NFKC")
+
+    print(f"[INFO] Registros cargados desde FENIX_ANS.xlsx: {len(df)}")
+
+    df["ESTADO"] = df["ESTADO"].apply(normalizar_estado)
+
+    errores = []
+    df["COORD_X"], df["COORD_Y"] = zip(*[
+        validar_coord(row["COORDENADAX"], row["COORDENADAY"], row["PEDIDO"], errores)
+        for _, row in df.iterrows()
+    ])
+
+    grupo = df.groupby("PEDIDO").agg({
+        "ESTADO": list,
+        "COORD_X": "first",
+        "COORD_Y": "first",
+        "ACTIVIDAD": "first"
+    }).reset_index()
 
-print("🟢 Mapa ANS v8.3 guardado correctamente.")
+    grupo["ESTADO_FINAL"] = grupo["ESTADO"].apply(estado_final)
+
+    df_mapa = grupo.copy()
+    return df_mapa
+
+
+# ============================================================
+# 3. CONSTRUIR MAPA
+# ============================================================
+@medido("mapa", "construir")
+def construir_mapa(df_mapa):
+    # ============================================================
+    # 3. ACTIVIDADES ÚNICAS
+    # ============================================================
+    actividades_unicas = sorted(df_mapa["ACTIVIDAD"].dropna().unique().tolist())
+
+    # ============================================================
+    # 4. MAPA BASE
+    # ============================================================
+    mapa = folium.Map(
+        location=[6.24, -75.57],
+        zoom_start=13,
+        tiles="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+        attr="Google"
+    )
+
+    mapa_id = mapa.get_name()
+
+    # ============================================================
+    # 5. VARIABLES JS BASE
+    # ============================================================
+    mapa.get_root().html.add_child(folium.Element(f"""
+    <script>
+    document.addEventListener("DOMContentLoaded", function() {{
+        window.mapa = {mapa_id};
+        window.marcadores = {{}};
+        window.estadoMarcadores = {{
+            "A TIEMPO": [],
+            "ALERTA": [],
+            "ALERTA_0 DIAS": [],
+            "VENCIDO": [],
+            "SIN FECHA": []
+        }};
+        window.actividadMarcadores = {{}};
+        window.listaActividades = {actividades_unicas};
+    }});
+    </script>
+    """))
+
+    # ============================================================
+    # 7. MARCADORES CON TOOLTIP MULTI-ESTADO
+    # ============================================================
+    markers_js = "<script>\ndocument.addEventListener('DOMContentLoaded', function() {\n"
+
+    for _, row in df_mapa.iterrows():
+        pedido = row["PEDIDO"]
+        lat = row["COORD_Y"]
+        lon = row["COORD_X"]
+        actividad = row["ACTIVIDAD"]
+
+        lista_estados = row["ESTADO"]
+        estado_final = row["ESTADO_FINAL"]
+
+        # Contar estados
+        conteo = {}
+        for est in lista_estados:
+            conteo[est] = conteo.get(est, 0) + 1
+
+        # Construir tooltip
+        tooltip_html = f"<b>PEDIDO: {pedido}</b><br><br>"
+        tooltip_html += "<b>ESTADOS DETECTADOS:</b><br>"
+
+        for est, cant in conteo.items():
+            tooltip_html += f"- {est} ({cant})<br>"
+
+        tooltip_html += f"<br><b>Estado final usado:</b> {estado_final}<br>"
+
+        color = colores.get(estado_final, "red")
+
+        markers_js += f"""
+    var mk_{pedido} = L.marker([{lat}, {lon}], {{
+        icon: L.icon({{
+            iconUrl: "https://raw.githubusercontent.com/pointhi/leaflet-color-markers/master/img/marker-icon-{color}.png",
+            shadowUrl: "https://cdnjs.cloudflare.com/ajax/libs/leaflet/1.7.1/images/marker-shadow.png",
+            iconSize: [{ICON_SIZE[0]}, {ICON_SIZE[1]}],
+            iconAnchor: [10, 33],
+            popupAnchor: [0, -28]
+        }})
+    }}).bindTooltip(`{tooltip_html}`).addTo(window.mapa);
+
+    window.marcadores["{pedido}"] = mk_{pedido};
+    window.estadoMarcadores["{estado_final}"].push("{pedido}");
+
+    if (!window.actividadMarcadores["{actividad}"]) {{
+        window.actividadMarcadores["{actividad}"] = [];
+    }}
+    window.actividadMarcadores["{actividad}"].push("{pedido}");
+    """
+
+    markers_js += "});\n</script>"
+    mapa.get_root().html.add_child(folium.Element(markers_js))
+
+    panel = MacroElement()
+    panel._template = Template(PANEL_HTML)
+    mapa.get_root().add_child(panel)
+    return mapa
+
+
+# ============================================================
+# ETAPA COMPLETA (importable desde el worker del panel)
+# ============================================================
+@medido("mapa", "total")
+def ejecutar(df=None):
+    """
+    Genera mapa_ans.html. 'df' es la hoja FENIX_ANS que dejó la etapa
+    anterior; sin él se lee FENIX_ANS.xlsx. Devuelve los pedidos del mapa.
+    """
+    ruta_salida_onedrive.parent.mkdir(exist_ok=True)
+    ruta_salida_proyecto.parent.mkdir(exist_ok=True)
+
+    with medir("mapa", "leer") as paso:
+        if df is None:
+            df = leer_tabla(ruta_fenix, hoja="FENIX_ANS")
+        else:
+            df = como_texto(df)
+        paso.filas(salida=len(df))
+
+    df_mapa = preparar_datos(df)
+    mapa = construir_mapa(df_mapa)
+
+    # ============================================================
+    # 9. GUARDAR MAPA
+    # ============================================================
+    with medir("mapa", "escribir") as paso:
+        mapa.save(ruta_salida_onedrive)
+        mapa.save(ruta_salida_proyecto)
+        paso.filas(entrada=len(df_mapa))
+
+    print("🟢 Mapa ANS v8.3 guardado correctamente.")
+    return df_mapa
+
+
+if __name__ == "__main__":
+    # ============================================================
+    # 0. FIX UTF-8
+    # ============================================================
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+    ejecutar()
@@ -14,8 +14,12 @@ from tkinter import ttk, scrolledtext, messagebox as mbox
 from PIL import Image, ImageTk
 import sys
 import io
+import json
+import queue
+import re
 from datetime import datetime
 from modules.calendario_ans import abrir_calendario
+from modules.instrumentacion import comparar_ultima_corrida, formatear_comparacion, VENTANA_MEDIANA
 
 # ------------------------------------------------------------
 # CONFIGURACIÓN UTF-8 GLOBAL
@@ -36,6 +40,7 @@ RUTA_SCRIPT_ANS = r"calculos_ans.py"
 RUTA_SCRIPT_LIMPIEZA = r"limpieza_fenix.py"
 RUTA_SCRIPT_MERGE = r"merge_fenix_actas.py"
 RUTA_MAPA = r"data_output/mapa_ans.html"
+RUTA_PRONOSTICO = BASE_DIR / "data_output" / "pronostico_ans.json"
 
 # ============================================================
 # ANIMACIÓN HOVER (ELEGANTE Y SEGURA)
@@ -65,27 +70,92 @@ def restaurar_boton(boton, color_original):
     boton.config(bg=color_original)
     ventana.update_idletasks()
 
+# ------------------------------------------------------------
+# LOG DEL PANEL (cola → Tk por lotes)
+# ------------------------------------------------------------
+# Los hilos nunca tocan los widgets: dejan texto (o una función)
+# en la cola y el bucle de Tk lo aplica cada INTERVALO_LOG_MS.
+cola_ui = queue.Queue()
+INTERVALO_LOG_MS = 50
+MAX_ITEMS_POR_LOTE = 5000
+MAX_LINEAS_LOG = 5000
+
+COLORES_ETAPA = {
+    "limpieza": "#7D3C98",
+    "calculos": "#1F618D",
+    "cruce_digitacion": "#117864",
+    "merge_actas": "#9A7D0A",
+    "mapa": "#AF601A",
+    "control_almacen": "#6E2C00",
+    "mano_obra": "#5D6D7E",
+    "historico": "#1C2833",
+    "pronostico": "#7B241C",
+}
+_RE_ETAPA = re.compile(r"^▶️ Etapa (\w+)")
+_RE_RAMA = re.compile(r"^\[(\w+)\] ")
+
+def log(texto, tag=None):
+    cola_ui.put((texto, tag))
+
+def en_ui(funcion, *args, **kwargs):
+    """Ejecuta funcion(*args) en el hilo de Tk (en orden con el log)."""
+    cola_ui.put((lambda: funcion(*args, **kwargs), None))
+
+def tag_linea(linea, etapa=None):
+    if "❌" in linea or "⛔" in linea or "Traceback" in linea:
+        return "error"
+    return f"etapa_{etapa}" if etapa in COLORES_ETAPA else None
+
+def drenar_log():
+    """Vuelca la cola al ScrolledText: un insert por tramo del mismo color."""
+    tramo, tag_tramo, hubo_texto = [], None, False
+
+    def volcar():
+        if tramo:
+            log_text.insert(tk.END, "".join(tramo), tag_tramo)
+            tramo.clear()
+
+    try:
+        for _ in range(MAX_ITEMS_POR_LOTE):
+            item, tag = cola_ui.get_nowait()
+            if callable(item):
+                volcar()
+                item()
+                continue
+            if tag != tag_tramo:
+                volcar()
+                tag_tramo = tag
+            tramo.append(item)
+            hubo_texto = True
+    except queue.Empty:
+        pass
+    volcar()
+
+    if hubo_texto:
+        # Scrollback acotado: se descartan las líneas más viejas
+        lineas = int(log_text.index("end-1c").split(".")[0])
+        if lineas > MAX_LINEAS_LOG:
+            log_text.delete("1.0", f"{lineas - MAX_LINEAS_LOG + 1}.0")
+        log_text.see(tk.END)
+
+    ventana.after(INTERVALO_LOG_MS, drenar_log)
+
 # ------------------------------------------------------------
 # FUNCIÓN PRINCIPAL DE EJECUCIÓN
 # ------------------------------------------------------------
 def ejecutar_comando(nombre, comando, boton=None):
-    def tarea():
-        log_text.insert(tk.END, f"\n🚀 Iniciando {nombre}...\n", "info")
-        log_text.see(tk.END)
-
-        barra_progreso["value"] = 0
-        ventana.update_idletasks()
+    log(f"\n🚀 Iniciando {nombre}...\n", "info")
+    barra_progreso["value"] = 0
 
-        hora = datetime.now().strftime("%I:%M %p")
-        pie_estado.config(text=f"🔄 Procesando {nombre}... | {hora}", fg="#1A5276")
-        ventana.update_idletasks()
+    hora = datetime.now().strftime("%I:%M %p")
+    pie_estado.config(text=f"🔄 Procesando {nombre}... | {hora}", fg="#1A5276")
 
-        color_original = resaltar_boton(boton) if boton else None
+    color_original = resaltar_boton(boton) if boton else None
+    barra_progreso.config(mode="indeterminate")
+    barra_progreso.start(20)
 
+    def tarea():
         try:
-            barra_progreso.config(mode="indeterminate")
-            barra_progreso.start(20)
-
             proceso = subprocess.Popen(
                 comando,
                 shell=True,
@@ -98,155 +168,192 @@ def ejecutar_comando(nombre, comando, boton=None):
             )
 
             for linea in iter(proceso.stdout.readline, ''):
-                log_text.insert(tk.END, linea)
-                log_text.see(tk.END)
-                ventana.update_idletasks()
+                log(linea, tag_linea(linea))
 
             proceso.wait()
 
-            barra_progreso.stop()
-            barra_progreso.config(mode="determinate")
+            en_ui(barra_progreso.stop)
+            en_ui(barra_progreso.config, mode="determinate")
 
             if proceso.returncode == 0:
-                barra_progreso["value"] = 100
-                ventana.update_idletasks()
-                log_text.insert(tk.END, f"\n✅ {nombre} completado con éxito.\n", "success")
-                pie_estado.config(text=f"✅ {nombre} completado con éxito. | {hora}", fg="#27AE60")
+                en_ui(barra_progreso.config, value=100)
+                log(f"\n✅ {nombre} completado con éxito.\n", "success")
+                en_ui(pie_estado.config, text=f"✅ {nombre} completado con éxito. | {hora}", fg="#27AE60")
             else:
-                log_text.insert(tk.END, f"\n❌ Error en {nombre} (código {proceso.returncode}).\n", "error")
-                pie_estado.config(text=f"⚠️ Error en {nombre}. Revisa el log.", fg="#C0392B")
+                log(f"\n❌ Error en {nombre} (código {proceso.returncode}).\n", "error")
+                en_ui(pie_estado.config, text=f"⚠️ Error en {nombre}. Revisa el log.", fg="#C0392B")
 
         except Exception as e:
-            barra_progreso.stop()
-            barra_progreso.config(mode="determinate", value=100)
-            log_text.insert(tk.END, f"\n⚠️ Error inesperado: {e}\n", "error")
-            pie_estado.config(text=f"⚠️ Error inesperado", fg="#C0392B")
+            en_ui(barra_progreso.stop)
+            en_ui(barra_progreso.config, mode="determinate", value=100)
+            log(f"\n⚠️ Error inesperado: {e}\n", "error")
+            en_ui(pie_estado.config, text=f"⚠️ Error inesperado", fg="#C0392B")
 
         finally:
             if boton and color_original:
-                restaurar_boton(boton, color_original)
-            log_text.insert(tk.END, "-" * 60 + "\n", "separador")
-            log_text.see(tk.END)
-            pie_estado.config(text="⚙️ Esperando acción del usuario...", fg="#1B263B")
-            ventana.update_idletasks()
-            ventana.after(1500, lambda: barra_progreso.config(value=0))
+                en_ui(restaurar_boton, boton, color_original)
+            log("-" * 60 + "\n", "separador")
+            en_ui(pie_estado.config, text="⚙️ Esperando acción del usuario...", fg="#1B263B")
+            en_ui(ventana.after, 1500, lambda: barra_progreso.config(value=0))
 
     threading.Thread(target=tarea, daemon=True).start()
 
 # ------------------------------------------------------------
-# FUNCIÓN EJECUTAR INFORME COMPLETO
-# ------------------------------------------------------------
-def ejecutar_informe():
-    def tarea():
+# WORKER PERSISTENTE DEL INFORME (librerías cargadas una sola vez)
+# ------------------------------------------------------------
+RUTA_WORKER = r"worker_pipeline.py"
+MARCA_FIN = "@@FIN@@"
+_worker = None
+_lock_worker = threading.Lock()
+
+def _leer_hasta_marca(proceso):
+    """Vuelca la salida del worker al log hasta la marca de fin del comando."""
+    etapa = None
+    for linea in iter(proceso.stdout.readline, ''):
+        if linea.startswith(MARCA_FIN):
+            return json.loads(linea[len(MARCA_FIN):])
+        inicio = _RE_ETAPA.match(linea)
+        if inicio:
+            etapa = inicio.group(1)
+        rama = _RE_RAMA.match(linea)
+        log(linea, tag_linea(linea, rama.group(1) if rama else etapa))
+    return None  # el worker terminó antes de responder
+
+def _obtener_worker():
+    global _worker
+    if _worker is None or _worker.poll() is not None:
+        _worker = subprocess.Popen(
+            [sys.executable, "-X", "utf8", "-u", str(BASE_DIR / RUTA_WORKER)],
+            cwd=BASE_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT, text=True, encoding="utf-8", bufsize=1
+        )
+        listo = _leer_hasta_marca(_worker)
+        if listo is None:
+            raise RuntimeError("El worker del informe no pudo iniciar (revisa el log).")
+        log(f"⚡ Worker del informe listo ({listo.get('segundos_carga', 0):.1f} s de carga).\n", "info")
+    return _worker
+
+def enviar_al_worker(comando, **datos):
+    """Envía un comando al worker y espera su respuesta (dict)."""
+    with _lock_worker:
+        proceso = _obtener_worker()
         try:
-            log_text.insert(tk.END, "\n🚀 Iniciando proceso completo Informe ANS...\n", "info")
-            log_text.see(tk.END)
-            ventana.update_idletasks()
-
-            color_original = resaltar_boton(btn_informe)
-            barra_progreso.config(mode="indeterminate")
-            barra_progreso.start(20)
-
-            python_exe = sys.executable
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            ruta_merge = os.path.join(base_dir, "merge_fenix_actas.py")
-
-            # ---- 1) LIMPIEZA ----
-            proceso1 = subprocess.Popen(
-                [python_exe, "-X", "utf8", os.path.join(base_dir, RUTA_SCRIPT_LIMPIEZA)],
-                cwd=base_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, encoding="utf-8"
-            )
-            for l in iter(proceso1.stdout.readline, ''):
-                log_text.insert(tk.END, l); log_text.see(tk.END)
-            proceso1.wait()
-
-            # ---- 2) CÁLCULOS ----
-            proceso2 = subprocess.Popen(
-                [python_exe, "-X", "utf8", os.path.join(base_dir, RUTA_SCRIPT_ANS)],
-                cwd=base_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, encoding="utf-8"
-            )
-            for l in iter(proceso2.stdout.readline, ''):
-                log_text.insert(tk.END, l); log_text.see(tk.END)
-            proceso2.wait()
+            proceso.stdin.write(json.dumps(dict(datos, comando=comando)) + "\n")
+            proceso.stdin.flush()
+        except OSError:
+            # Murió entre comandos: se relanza una vez
+            proceso = _obtener_worker()
+            proceso.stdin.write(json.dumps(dict(datos, comando=comando)) + "\n")
+            proceso.stdin.flush()
+        respuesta = _leer_hasta_marca(proceso)
+    return respuesta or {"ok": False, "error": "el worker terminó inesperadamente"}
+
+def precalentar_worker():
+    try:
+        with _lock_worker:
+            _obtener_worker()
+    except Exception as e:
+        log(f"⚠️ {e}\n", "error")
 
-            # ---- 2.5) CRUCE DIGITACIÓN FÉNIX ----
-            ruta_digitacion = os.path.join(base_dir, "cruce_digitacion_fenix.py")
+def cerrar_worker():
+    if _worker is not None and _worker.poll() is None:
+        try:
+            _worker.stdin.write(json.dumps({"comando": "salir"}) + "\n")
+            _worker.stdin.flush()
+            _worker.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            _worker.kill()
 
-            log_text.insert(tk.END, "\n🔄 Ejecutando Cruce Digitación Fénix...\n", "info")
-            log_text.see(tk.END)
+# ------------------------------------------------------------
+# FUNCIÓN EJECUTAR INFORME COMPLETO
+# ------------------------------------------------------------
+# ------------------------------------------------------------
+# PRONÓSTICO DE VENCIMIENTOS (lo deja la etapa pronostico)
+# ------------------------------------------------------------
+def resumen_pronostico(ruta=RUTA_PRONOSTICO, dias_visibles=5, top=3):
+    """Texto corto de data_output/pronostico_ans.json para el log; None si no está."""
+    try:
+        datos = json.loads(Path(ruta).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    # total / por: [vencidos, día hábil 1..N, posterior, sin fecha]
+    total, dias = datos["total"], datos["dias"]
+    n = len(dias)
+    lineas = [
+        f"   Ya vencidos: {total[0]} · se vencen en los próximos {n} días hábiles: {sum(total[1:n + 1])}",
+        "   " + "  ".join(f"{d[8:10]}/{d[5:7]}: {v}" for d, v in zip(dias[:dias_visibles], total[1:])),
+    ]
+    for dimension, titulo in (("actividad", "Actividades"), ("subzona", "Subzonas"), ("tecnico", "Técnicos")):
+        en_riesgo = sorted(((sum(v[1:n + 1]), k) for k, v in datos["por"].get(dimension, {}).items()), reverse=True)
+        en_riesgo = [f"{k} ({v})" for v, k in en_riesgo[:top] if v]
+        if en_riesgo:
+            lineas.append(f"   {titulo} con más por vencer: {', '.join(en_riesgo)}")
+    return "\n".join(lineas)
 
-            proceso_digit = subprocess.Popen(
-                [python_exe, "-X", "utf8", ruta_digitacion],
-                cwd=base_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding="utf-8"
-            )
 
-            for l in iter(proceso_digit.stdout.readline, ''):
-                log_text.insert(tk.END, l)
-                log_text.see(tk.END)
+def ejecutar_informe():
+    log("\n🚀 Iniciando proceso completo Informe ANS...\n", "info")
+    color_original = resaltar_boton(btn_informe)
+    barra_progreso.config(mode="indeterminate")
+    barra_progreso.start(20)
 
-            proceso_digit.wait()
+    def tarea():
+        try:
+            # limpieza → cálculos → cruce digitación → merge actas en el worker;
+            # control almacén, mapa y mano de obra en paralelo (líneas [rama]).
+            # Las etapas cuyas entradas no cambiaron se omiten
+            respuesta = enviar_al_worker("informe")
+            etapas = respuesta.get("etapas", {})
+
+            for nombre, datos in etapas.items():
+                if datos.get("omitida_por"):
+                    log(f"   ⛔ No se corrió {nombre}: falló {datos['omitida_por']}.\n", "error")
+                elif not datos["ok"]:
+                    log(f"   ❌ Falló la etapa {nombre} (revisa el log).\n", "error")
+
+            en_cache = [nombre for nombre, datos in etapas.items() if datos.get("cache")]
+            if en_cache:
+                log(f"   ⚡ Sin cambios, reutilizadas: {', '.join(en_cache)}\n", "info")
+
+            if etapas.get("mapa", {}).get("ok"):
+                log("   ✔ Mapa ANS generado correctamente.\n", "success")
+            else:
+                log("   ❌ Hubo un error al generar el mapa ANS.\n", "error")
 
-            # ---- 3) MERGE ----
-            proceso3 = subprocess.Popen(
-                [python_exe, "-X", "utf8", ruta_merge],
-                cwd=base_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                text=True, encoding="utf-8"
-            )
-            for l in iter(proceso3.stdout.readline, ''):
-                log_text.insert(tk.END, l); log_text.see(tk.END)
-            proceso3.wait()
+            if respuesta.get("error"):
+                log(f"\n⚠️ {respuesta['error']}\n", "error")
 
-            # ---- 4) GENERAR MAPA ANS ----
-            log_text.insert(tk.END, "\n🌎 Generando Mapa ANS...\n", "info")
-            log_text.see(tk.END)
+            # Tiempos de esta corrida vs la mediana de las anteriores (logs/metricas_etapas.jsonl)
+            corridas = [datos for datos in etapas.values() if not datos.get("cache")]
+            comparacion = comparar_ultima_corrida() if corridas else []
+            if comparacion:
+                log(f"\n⏱️ Esta corrida vs mediana de las últimas {VENTANA_MEDIANA}:\n", "info")
+                log(formatear_comparacion(comparacion, solo_totales=True) + "\n", "info")
 
-            if generar_mapa():
-                log_text.insert(tk.END, "   ✔ Mapa ANS generado correctamente.\n", "success")
-            else:
-                log_text.insert(tk.END, "   ❌ Hubo un error al generar el mapa ANS.\n", "error")    
+            pronostico = resumen_pronostico() if etapas.get("pronostico", {}).get("ok") else None
+            if pronostico:
+                log("\n📈 Pronóstico de vencimientos (pedidos sin ejecutar en campo):\n", "info")
+                log(pronostico + "\n", "info")
 
+            log("\n✅ Informe completado.\n", "success")
+            en_ui(mbox.showinfo, "Control ANS", "Informe ANS generado correctamente.")
 
-            log_text.insert(tk.END, "\n✅ Informe completado.\n", "success")
-            mbox.showinfo("Control ANS", "Informe ANS generado correctamente.")
+        except Exception as e:
+            log(f"\n⚠️ Error inesperado: {e}\n", "error")
 
         finally:
-            barra_progreso.stop()
-            restaurar_boton(btn_informe, color_original)
+            en_ui(barra_progreso.stop)
+            en_ui(restaurar_boton, btn_informe, color_original)
 
     threading.Thread(target=tarea, daemon=True).start()
 def generar_mapa():
     """Genera el mapa ANS antes de abrirlo"""
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        ruta_script = os.path.join(base_dir, "mapa_ans.py")
-
-        if not os.path.exists(ruta_script):
-            mbox.showerror("Mapa ANS", "❌ No se encontró mapa_ans.py")
-            return False
-
-        proceso = subprocess.Popen(
-            [sys.executable, ruta_script],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8"
-        )
-
-        for linea in iter(proceso.stdout.readline, ''):
-            log_text.insert(tk.END, linea)
-            log_text.see(tk.END)
-
-        proceso.wait()
-        return proceso.returncode == 0
+        respuesta = enviar_al_worker("etapa", etapa="mapa", solo=True)
+        return respuesta.get("ok", False)
 
     except Exception as e:
-        mbox.showerror("Mapa ANS", f"Error al generar el mapa: {e}")
+        en_ui(mbox.showerror, "Mapa ANS", f"Error al generar el mapa: {e}")
         return False
 
 # ------------------------------------------------------------
@@ -254,27 +361,30 @@ def generar_mapa():
 # ------------------------------------------------------------
 def abrir_mapa():
     """Genera el mapa ANS y lo abre actualizado"""
-    try:
-        log_text.insert(tk.END, "\n🔄 Generando VISOR GEOGRÁFICO ANS...\n", "info")
-        log_text.see(tk.END)
+    log("\n🔄 Generando VISOR GEOGRÁFICO ANS...\n", "info")
+
+    # En un hilo: si el informe está corriendo, espera su turno sin congelar el panel
+    def tarea():
+        try:
+            ok = generar_mapa()
 
-        ok = generar_mapa()
+            if not ok:
+                en_ui(mbox.showerror, "Mapa ANS", "❌ Error generando mapa ANS.")
+                return
 
-        if not ok:
-            mbox.showerror("Mapa ANS", "❌ Error generando mapa ANS.")
-            return
+            ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), RUTA_MAPA)
 
-        ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), RUTA_MAPA)
+            if not os.path.exists(ruta):
+                en_ui(mbox.showerror, "Mapa ANS", "❌ No se generó mapa_ans.html")
+                return
 
-        if not os.path.exists(ruta):
-            mbox.showerror("Mapa ANS", "❌ No se generó mapa_ans.html")
-            return
+            os.startfile(ruta)
+            log("🗺️ Mapa actualizado y abierto correctamente.\n", "success")
 
-        os.startfile(ruta)
-        log_text.insert(tk.END, "🗺️ Mapa actualizado y abierto correctamente.\n", "success")
+        except Exception as e:
+            en_ui(mbox.showerror, "Error", f"No se pudo abrir el mapa: {e}")
 
-    except Exception as e:
-        mbox.showerror("Error", f"No se pudo abrir el mapa: {e}")
+    threading.Thread(target=tarea, daemon=True).start()
 
 # ------------------------------------------------------------
 # INTERFAZ PRINCIPAL
@@ -473,6 +583,8 @@ log_text.tag_config("info", foreground="#2980B9")
 log_text.tag_config("success", foreground="#27AE60")
 log_text.tag_config("error", foreground="#C0392B")
 log_text.tag_config("separador", foreground="#95A5A6")
+for _etapa, _color in COLORES_ETAPA.items():
+    log_text.tag_config(f"etapa_{_etapa}", foreground=_color)
 
 # ------------------------------------------------------------
 # BOTÓN SALIR
@@ -535,4 +647,10 @@ except Exception as e:
 # ------------------------------------------------------------
 # INICIAR INTERFAZ
 # ------------------------------------------------------------
+ventana.after(INTERVALO_LOG_MS, drenar_log)
+
+# El worker del informe arranca en segundo plano: el primer clic ya lo encuentra cargado
+threading.Thread(target=precalentar_worker, daemon=True).start()
+
 ventana.mainloop()
+cerrar_worker()
@@ -0,0 +1,286 @@
+# ------------------------------------------------------------
+# 🧬 ALMACÉN DE EVIDENCIAS POR CONTENIDO (SHA-256) – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Cada contenido distinto se guarda una sola vez como blob.
+#   Clave: SHA-256 de los bytes del blob (ya optimizado o
+#   comprimido), así hash_archivo(blob) == clave siempre.
+# - 'llegadas': SHA-256 del archivo tal como llegó → blob. Con
+#   eso un archivo repetido se reconoce antes de optimizarlo o
+#   comprimirlo otra vez (enlazar_llegada).
+# - Los nombres de siempre (EPM-FNX-{pedido}-257-(n), uploads
+#   del formulario) quedan como enlaces duros al blob; si el
+#   disco no permite enlaces se deja una copia.
+# - El ahorro es solo de disco local. Dentro de OneDrive cada
+#   nombre se sube (y ocupa cuota) por separado: OneDrive no
+#   sabe de enlaces duros. Y como todos los nombres comparten
+#   el mismo archivo físico, editar uno en sitio cambia el blob
+#   y los demás nombres: las evidencias no se editan; si hay
+#   que corregir una, se reemplaza el archivo (se guarda uno
+#   nuevo con ese nombre), lo que rompe solo ese enlace.
+# - blobs.db lleva las referencias nombre → hash y permite
+#   medir la proporción de duplicados.
+# - Un blobs.db de antes (clave = hash de llegada) se migra una
+#   vez al abrirlo: se rehashea cada blob y la clave vieja queda
+#   en 'llegadas'.
+#
+# Uso manual (estadísticas):
+#   python -m modules.almacen_blobs <carpeta_blobs>
+# ------------------------------------------------------------
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+BLOQUE_HASH = 1024 * 1024
+
+
+def hash_archivo(ruta):
+    """SHA-256 leyendo por bloques (no carga el archivo en memoria)."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE_HASH), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class AlmacenBlobs:
+    """Blobs únicos por contenido + referencias con el nombre original."""
+
+    def __init__(self, raiz):
+        self.raiz = Path(raiz)
+        self.raiz.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        with self._conexion() as con:
+            migrar = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blobs'"
+            ).fetchone() and not con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'llegadas'"
+            ).fetchone()
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    archivo TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    creado TEXT NOT NULL
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS referencias (
+                    ruta TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    modo TEXT NOT NULL,
+                    creado TEXT NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_referencias_sha ON referencias(sha256)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS llegadas (
+                    sha256_llegada TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    creado TEXT NOT NULL
+                )
+            """)
+        if migrar:
+            self._migrar_claves()
+
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.raiz / "blobs.db", timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA busy_timeout=30000")
+            self._local.con = con
+        return con
+
+    # --------------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------------
+    def buscar(self, sha256):
+        """Ruta del blob con ese contenido o None."""
+        fila = self._conexion().execute(
+            "SELECT archivo FROM blobs WHERE sha256 = ?", (sha256,)
+        ).fetchone()
+        if fila and (self.raiz / fila["archivo"]).exists():
+            return self.raiz / fila["archivo"]
+        return None
+
+    def _blob_de_llegada(self, sha256_llegada):
+        """(sha256 del blob, ruta) del archivo que llegó con ese hash, o None."""
+        fila = self._conexion().execute(
+            "SELECT sha256 FROM llegadas WHERE sha256_llegada = ?", (sha256_llegada,)
+        ).fetchone()
+        blob = self.buscar(fila["sha256"]) if fila else None
+        return (fila["sha256"], blob) if blob else None
+
+    def buscar_llegada(self, sha256_llegada):
+        """Ruta del blob de un archivo que ya llegó igual (hash antes de optimizar) o None."""
+        encontrado = self._blob_de_llegada(sha256_llegada)
+        return encontrado[1] if encontrado else None
+
+    def estadisticas(self):
+        con = self._conexion()
+        referencias, logicos = con.execute(
+            "SELECT COUNT(*), COALESCE(SUM(b.bytes), 0) FROM referencias r "
+            "JOIN blobs b ON b.sha256 = r.sha256"
+        ).fetchone()
+        unicos, fisicos = con.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM blobs"
+        ).fetchone()
+        return {
+            "referencias": referencias,
+            "blobs": unicos,
+            "duplicados": referencias - unicos,
+            "ratio_duplicados": round((referencias - unicos) / referencias, 4) if referencias else 0.0,
+            "bytes_logicos": logicos,
+            "bytes_fisicos": fisicos,
+            "bytes_ahorrados": logicos - fisicos,
+        }
+
+    # --------------------------------------------------------
+    # INCORPORAR ARCHIVOS
+    # --------------------------------------------------------
+    def incorporar(self, ruta, sha256_llegada=None, ajustar_extension=False):
+        """
+        Pasa 'ruta' (ya optimizada / comprimida) al almacén con el hash de
+        sus bytes. Si el contenido ya existía, el archivo se reemplaza por
+        un enlace al blob existente.
+        'sha256_llegada' es el hash del archivo tal como llegó (antes de
+        optimizarlo): queda en 'llegadas' para enlazar_llegada.
+        Con ajustar_extension=True el nombre toma la extensión del blob
+        (p. ej. .zip). Devuelve (ruta_final, es_duplicado).
+        """
+        ruta = Path(ruta)
+        sha256 = hash_archivo(ruta)
+
+        with self._lock:
+            blob = self.buscar(sha256)
+            duplicado = blob is not None
+
+            if duplicado:
+                destino, modo = self._reemplazar_por_enlace(blob, ruta, ajustar_extension)
+            else:
+                relativo = Path(sha256[:2]) / f"{sha256}{ruta.suffix.lower()}"
+                blob = self.raiz / relativo
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                destino = ruta
+                try:
+                    blob.unlink(missing_ok=True)
+                    os.link(ruta, blob)
+                    modo = "ENLACE"
+                except OSError:
+                    shutil.copy2(ruta, blob)
+                    modo = "COPIA"
+                with self._conexion() as con:
+                    con.execute(
+                        "INSERT OR REPLACE INTO blobs (sha256, archivo, bytes, creado) VALUES (?, ?, ?, ?)",
+                        (sha256, relativo.as_posix(), blob.stat().st_size, _ahora())
+                    )
+
+            self._referenciar(destino, sha256, modo, sha256_llegada)
+        return destino, duplicado
+
+    def enlazar_llegada(self, ruta, sha256_llegada, ajustar_extension=False):
+        """
+        Si ya se procesó un archivo que llegó idéntico, 'ruta' pasa a ser un
+        enlace a ese blob (sin optimizar / comprimir otra vez). Devuelve la
+        ruta final, o None si la llegada es nueva.
+        """
+        ruta = Path(ruta)
+        with self._lock:
+            encontrado = self._blob_de_llegada(sha256_llegada)
+            if encontrado is None:
+                return None
+            sha256, blob = encontrado
+            destino, modo = self._reemplazar_por_enlace(blob, ruta, ajustar_extension)
+            self._referenciar(destino, sha256, modo, None)
+        return destino
+
+    def _reemplazar_por_enlace(self, blob, ruta, ajustar_extension):
+        destino = ruta.with_suffix(blob.suffix) if ajustar_extension else ruta
+        modo = self._enlazar(blob, destino)
+        if destino != ruta:
+            ruta.unlink(missing_ok=True)
+        return destino, modo
+
+    def _referenciar(self, destino, sha256, modo, sha256_llegada):
+        with self._conexion() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO referencias (ruta, sha256, modo, creado) VALUES (?, ?, ?, ?)",
+                (str(destino), sha256, modo, _ahora())
+            )
+            if sha256_llegada:
+                con.execute(
+                    "INSERT OR REPLACE INTO llegadas (sha256_llegada, sha256, creado) VALUES (?, ?, ?)",
+                    (sha256_llegada, sha256, _ahora())
+                )
+
+    def _migrar_claves(self):
+        """blobs.db con clave = hash de llegada → clave = hash del blob (una sola vez)."""
+        con = self._conexion()
+        cambios = 0
+        for fila in con.execute("SELECT sha256, archivo FROM blobs").fetchall():
+            viejo, ruta = fila["sha256"], self.raiz / fila["archivo"]
+            if not ruta.exists():
+                continue
+            nuevo = hash_archivo(ruta)
+            with con:
+                con.execute(
+                    "INSERT OR REPLACE INTO llegadas (sha256_llegada, sha256, creado) VALUES (?, ?, ?)",
+                    (viejo, nuevo, _ahora())
+                )
+                if nuevo == viejo:
+                    continue
+                cambios += 1
+                relativo = Path(nuevo[:2]) / f"{nuevo}{ruta.suffix.lower()}"
+                if con.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (nuevo,)).fetchone():
+                    # Dos llegadas que quedaron con los mismos bytes: un solo blob
+                    con.execute("DELETE FROM blobs WHERE sha256 = ?", (viejo,))
+                    ruta.unlink(missing_ok=True)
+                else:
+                    (self.raiz / relativo).parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(ruta, self.raiz / relativo)  # los enlaces de los nombres siguen valiendo
+                    con.execute("UPDATE blobs SET sha256 = ?, archivo = ? WHERE sha256 = ?",
+                                (nuevo, relativo.as_posix(), viejo))
+                con.execute("UPDATE referencias SET sha256 = ? WHERE sha256 = ?", (nuevo, viejo))
+        if cambios:
+            print(f"🧬 Almacén de blobs: {cambios} blobs con la clave del contenido final")
+
+    @staticmethod
+    def _enlazar(blob, destino):
+        """Deja 'destino' apuntando al blob (enlace duro o, si no se puede, copia)."""
+        temporal = destino.with_name(f"~lnk_{destino.name}")
+        temporal.unlink(missing_ok=True)
+        try:
+            os.link(blob, temporal)
+            modo = "ENLACE"
+        except OSError:
+            # Otro volumen o sistema de archivos sin enlaces duros
+            shutil.copy2(blob, temporal)
+            modo = "COPIA"
+        os.replace(temporal, destino)
+        return modo
+
+
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ------------------------------------------------------------
+# EJECUCIÓN MANUAL: estadísticas de duplicados
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python -m modules.almacen_blobs <carpeta_blobs>")
+        sys.exit(1)
+    for clave, valor in AlmacenBlobs(sys.argv[1]).estadisticas().items():
+        print(f"{clave:>18}: {valor}")
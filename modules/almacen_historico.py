@@ -0,0 +1,501 @@
+# ------------------------------------------------------------
+# 🕰️ HISTÓRICO DIARIO DE PEDIDOS ANS – SQLite
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Cada corrida del informe deja en data_clean/historico_ans.db
+#   la foto de FENIX_ANS del día: una fila por (fecha, pedido)
+#   con actividad, tipo de dirección, zona, técnico, ESTADO,
+#   ESTADO_FENIX y fechas ANS. Otra corrida el mismo día
+#   reemplaza la foto de ese día (queda la última).
+# - Tabla sin rowid agrupada por fecha + índices por pedido,
+#   actividad, subzona y estado (los tres últimos con la fecha
+#   como segunda columna, para rangos de fechas).
+# - conteos_dia: pedidos por día, actividad, tipo de dirección,
+#   subzona y estado, calculado al guardar la foto. Las
+#   tendencias que solo usan esas columnas salen de ahí (años de
+#   fotos en milisegundos); las demás van a pedidos_dia.
+# - Consultas de tendencia (conteos por día) y de cohorte
+#   (pedidos distintos que estuvieron en un estado en un rango)
+#   con filtros por las mismas columnas.
+# - Bitácora de eventos por corrida: la hoja se cruza por PEDIDO
+#   (merge = hash join) con el último estado conocido de cada
+#   pedido abierto (estado_pedidos, una huella por fila) y solo
+#   se escriben los cambios: APARECE, ESTADO, ESTADO_FENIX,
+#   EJECUTADO (reporte del técnico), TECNICO y SALE (deja el
+#   informe: cruce lo pasó al repositorio de cerrados).
+# - 'ciclo' guarda por pedido recibido / ejecutado / salida y
+#   el tiempo acumulado en ALERTA → tiempos de ciclo.
+# - Las consultas (y el SQL libre de historico_ans.py sql) van
+#   por una conexión aparte de solo lectura (URI mode=ro).
+# ------------------------------------------------------------
+
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from modules.reglas_vectorizadas import ejecutado_en_campo
+from modules.tablas_etapas import a_fecha
+
+# Columna de FENIX_ANS → columna del histórico
+COLUMNAS = {
+    "PEDIDO": "pedido",
+    "ACTIVIDAD": "actividad",
+    "TIPO_DIRECCION": "tipo_direccion",
+    "SUBZONA": "subzona",
+    "AREA_OPERATIVA": "area_operativa",
+    "MUNICIPIO": "municipio",
+    "TECNICO_EJECUTA": "tecnico",
+    "ESTADO": "estado",
+    "ESTADO_FENIX": "estado_fenix",
+    "FECHA_RECIBO": "fecha_recibo",
+    "FECHA_INICIO_ANS": "fecha_inicio_ans",
+    "FECHA_LIMITE_ANS": "fecha_limite_ans",
+    "DIAS_PACTADOS": "dias_pactados",
+}
+FECHAS = ["FECHA_RECIBO", "FECHA_INICIO_ANS", "FECHA_LIMITE_ANS"]
+
+# Columnas por las que se puede filtrar y agrupar
+DIMENSIONES = ["actividad", "tipo_direccion", "subzona", "area_operativa", "municipio", "tecnico", "estado", "estado_fenix"]
+# Las que además van precontadas por día en conteos_dia
+DIMENSIONES_CONTEO = ["actividad", "tipo_direccion", "subzona", "estado"]
+
+# Campo seguido entre corridas → evento que registra su cambio
+EVENTOS = {"estado": "ESTADO", "estado_fenix": "ESTADO_FENIX", "ejecutado": "EJECUTADO", "tecnico": "TECNICO"}
+ESTADOS_ALERTA = ("ALERTA", "ALERTA_0 Días")
+# Dimensiones de 'ciclo' para agrupar los tiempos
+DIMENSIONES_CICLO = ["actividad", "tipo_direccion", "subzona", "tecnico"]
+
+
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _fecha_iso(serie):
+    """Fechas de FENIX_ANS (datetime o texto en los formatos de las etapas) → 'AAAA-MM-DD HH:MM:SS'."""
+    serie = a_fecha(serie)
+    return serie.dt.strftime("%Y-%m-%d %H:%M:%S").astype(object).where(serie.notna(), None)
+
+
+class AlmacenHistorico:
+    """Fotos diarias de FENIX_ANS en SQLite para tendencias y cohortes."""
+
+    def __init__(self, ruta_db):
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._crear_esquema()
+
+    # --------------------------------------------------------
+    # CONEXIÓN Y ESQUEMA
+    # --------------------------------------------------------
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta_db, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA busy_timeout=30000")
+            self._local.con = con
+        return con
+
+    def _conexion_lectura(self):
+        """Conexión de solo lectura por hilo (mode=ro): para las consultas, incluido el SQL libre."""
+        con = getattr(self._local, "lectura", None)
+        if con is None:
+            con = sqlite3.connect(f"{self.ruta_db.resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA query_only=ON")  # tampoco tablas TEMP
+            con.execute("PRAGMA busy_timeout=30000")
+            self._local.lectura = con
+        return con
+
+    def _crear_esquema(self):
+        with self._conexion() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS fotos (
+                    fecha TEXT PRIMARY KEY,
+                    momento TEXT NOT NULL,
+                    filas INTEGER NOT NULL
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS pedidos_dia (
+                    fecha TEXT NOT NULL,
+                    pedido TEXT NOT NULL,
+                    actividad TEXT,
+                    tipo_direccion TEXT,
+                    subzona TEXT,
+                    area_operativa TEXT,
+                    municipio TEXT,
+                    tecnico TEXT,
+                    estado TEXT,
+                    estado_fenix TEXT,
+                    fecha_recibo TEXT,
+                    fecha_inicio_ans TEXT,
+                    fecha_limite_ans TEXT,
+                    dias_pactados INTEGER,
+                    PRIMARY KEY (fecha, pedido)
+                ) WITHOUT ROWID
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_pedidos_dia_pedido ON pedidos_dia(pedido)")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_pedidos_dia_actividad ON pedidos_dia(actividad, fecha)")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_pedidos_dia_subzona ON pedidos_dia(subzona, fecha)")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_pedidos_dia_estado ON pedidos_dia(estado, fecha)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS conteos_dia (
+                    fecha TEXT NOT NULL,
+                    actividad TEXT,
+                    tipo_direccion TEXT,
+                    subzona TEXT,
+                    estado TEXT,
+                    pedidos INTEGER NOT NULL
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_conteos_dia_fecha ON conteos_dia(fecha)")
+
+            # Bitácora de eventos
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS corridas (
+                    momento TEXT PRIMARY KEY,
+                    pedidos INTEGER,
+                    cambios INTEGER,
+                    eventos INTEGER,
+                    segundos REAL
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS estado_pedidos (
+                    pedido TEXT PRIMARY KEY,
+                    huella INTEGER NOT NULL,
+                    estado TEXT,
+                    estado_fenix TEXT,
+                    ejecutado TEXT,
+                    tecnico TEXT
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS eventos (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    momento TEXT NOT NULL,
+                    pedido TEXT NOT NULL,
+                    evento TEXT NOT NULL,
+                    desde TEXT,
+                    hasta TEXT
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_eventos_pedido ON eventos(pedido, momento)")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_eventos_evento ON eventos(evento, momento)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS ciclo (
+                    pedido TEXT PRIMARY KEY,
+                    actividad TEXT,
+                    tipo_direccion TEXT,
+                    subzona TEXT,
+                    tecnico TEXT,
+                    fecha_recibo TEXT,
+                    aparece TEXT NOT NULL,
+                    ejecutado TEXT,
+                    sale TEXT,
+                    alerta_desde TEXT,
+                    segundos_alerta REAL NOT NULL DEFAULT 0
+                )
+            """)
+            con.execute("CREATE INDEX IF NOT EXISTS ix_ciclo_sale ON ciclo(sale)")
+
+    # --------------------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------------------
+    @staticmethod
+    def _foto(df):
+        """Hoja FENIX_ANS → columnas del histórico (texto limpio, fechas ISO), un pedido por fila."""
+        foto = pd.DataFrame(index=df.index)
+        for origen, destino in COLUMNAS.items():
+            if origen not in df.columns:
+                foto[destino] = None
+            elif origen in FECHAS:
+                foto[destino] = _fecha_iso(df[origen])
+            elif origen == "DIAS_PACTADOS":
+                dias = pd.to_numeric(df[origen], errors="coerce")
+                foto[destino] = dias.astype(object).where(dias.notna(), None).map(
+                    lambda d: d if d is None else int(d))
+            else:
+                texto = df[origen].astype(object).map(lambda v: v if v is None or pd.isna(v) else str(v).strip())
+                foto[destino] = texto.where(texto.notna() & (texto != ""), None)
+
+        # Un pedido repetido en la hoja cuenta una vez
+        return foto[foto["pedido"].notna()].drop_duplicates(subset="pedido", keep="first")
+
+    def registrar_dia(self, df, fecha=None):
+        """Guarda 'df' (hoja FENIX_ANS) como la foto de 'fecha' (hoy por defecto). Devuelve las filas."""
+        fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+        foto = self._foto(df)
+        foto.insert(0, "fecha", fecha)
+
+        columnas = list(foto.columns)
+        with self._conexion() as con:
+            con.execute("DELETE FROM pedidos_dia WHERE fecha = ?", (fecha,))
+            con.executemany(
+                f"INSERT INTO pedidos_dia ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                foto.itertuples(index=False, name=None)
+            )
+            con.execute("DELETE FROM conteos_dia WHERE fecha = ?", (fecha,))
+            dimensiones = ", ".join(DIMENSIONES_CONTEO)
+            con.execute(
+                f"INSERT INTO conteos_dia (fecha, {dimensiones}, pedidos) "
+                f"SELECT fecha, {dimensiones}, COUNT(*) FROM pedidos_dia WHERE fecha = ? "
+                f"GROUP BY {dimensiones}",
+                (fecha,)
+            )
+            con.execute(
+                "INSERT INTO fotos (fecha, momento, filas) VALUES (?, ?, ?) "
+                "ON CONFLICT(fecha) DO UPDATE SET momento = excluded.momento, filas = excluded.filas",
+                (fecha, _ahora(), len(foto))
+            )
+        return len(foto)
+
+    # --------------------------------------------------------
+    # BITÁCORA DE EVENTOS
+    # --------------------------------------------------------
+    def registrar_corrida(self, df, momento=None):
+        """
+        Compara 'df' (hoja FENIX_ANS) con la corrida anterior y agrega a 'eventos'
+        solo lo que cambió. Devuelve {"pedidos", "cambios", "eventos"}.
+        """
+        inicio = time.perf_counter()
+        momento = momento or _ahora()
+        df = df.reset_index(drop=True)
+        actual = self._foto(df)
+        reporte = df.loc[actual.index, "REPORTE_TECNICO"] if "REPORTE_TECNICO" in df.columns else pd.Series("", index=actual.index)
+        actual["ejecutado"] = ejecutado_en_campo(reporte).map({True: "SI", False: "NO"})
+        seguidos = list(EVENTOS)
+        actual["huella"] = pd.util.hash_pandas_object(actual[seguidos], index=False).to_numpy().view("int64")
+
+        con = self._conexion()
+        previo = pd.read_sql_query(f"SELECT pedido, huella, {', '.join(seguidos)} FROM estado_pedidos", con)
+        # Primera corrida: todo "aparece", pero no se sabe desde cuándo estaba ejecutado o en alerta
+        inicial = previo.empty and con.execute("SELECT 1 FROM corridas LIMIT 1").fetchone() is None
+
+        cruce = actual.merge(previo, on="pedido", how="outer", suffixes=("", "_previo"), indicator=True)
+        nuevos = cruce[cruce["_merge"] == "left_only"]
+        salen = cruce[cruce["_merge"] == "right_only"]
+        comunes = cruce[cruce["_merge"] == "both"]
+        cambian = comunes[comunes["huella"] != comunes["huella_previo"]]
+
+        eventos = [
+            pd.DataFrame({"pedido": nuevos["pedido"], "evento": "APARECE", "desde": None, "hasta": nuevos["estado"]}),
+            pd.DataFrame({"pedido": salen["pedido"], "evento": "SALE", "desde": salen["estado_previo"], "hasta": None}),
+        ]
+        ejecutados_nuevos = nuevos[nuevos["ejecutado"] == "SI"]
+        eventos.append(pd.DataFrame({"pedido": ejecutados_nuevos["pedido"], "evento": "EJECUTADO",
+                                     "desde": None, "hasta": "SI"}))
+        for campo, evento in EVENTOS.items():
+            antes, ahora = cambian[f"{campo}_previo"], cambian[campo]
+            distinto = ~((antes == ahora) | (antes.isna() & ahora.isna()))
+            eventos.append(pd.DataFrame({"pedido": cambian.loc[distinto, "pedido"], "evento": evento,
+                                         "desde": antes[distinto], "hasta": ahora[distinto]}))
+        eventos = pd.concat(eventos, ignore_index=True)
+        eventos = eventos.astype(object).where(eventos.notna(), None)
+
+        # Ciclo por pedido (solo filas que cambiaron)
+        en_alerta = cruce["estado"].isin(ESTADOS_ALERTA)
+        en_alerta_antes = cruce["estado_previo"].isin(ESTADOS_ALERTA)
+        entra_alerta = cruce.loc[(cruce["_merge"] == "both") & en_alerta & ~en_alerta_antes, "pedido"]
+        sale_alerta = cruce.loc[
+            ((cruce["_merge"] == "both") & ~en_alerta & en_alerta_antes) | (cruce["_merge"] == "right_only"), "pedido"]
+        se_ejecuta = cambian.loc[(cambian["ejecutado"] == "SI") & (cambian["ejecutado_previo"] != "SI"), "pedido"]
+        cambia_tecnico = cambian.loc[cambian["tecnico"].fillna("") != cambian["tecnico_previo"].fillna(""), ["tecnico", "pedido"]]
+
+        ciclo_nuevos = nuevos[["pedido", "actividad", "tipo_direccion", "subzona", "tecnico", "fecha_recibo"]].copy()
+        ciclo_nuevos["aparece"] = momento
+        ciclo_nuevos["ejecutado"] = None if inicial else nuevos["ejecutado"].map({"SI": momento, "NO": None})
+        ciclo_nuevos["alerta_desde"] = None if inicial else nuevos["estado"].isin(ESTADOS_ALERTA).map({True: momento, False: None})
+        ciclo_nuevos = ciclo_nuevos.astype(object).where(ciclo_nuevos.notna(), None)
+
+        def filas(marco):
+            return list(marco.itertuples(index=False, name=None))
+
+        with con:
+            con.executemany(
+                "INSERT INTO eventos (momento, pedido, evento, desde, hasta) VALUES (?, ?, ?, ?, ?)",
+                [(momento, *fila) for fila in filas(eventos)]
+            )
+            # Sale de alerta (o del informe): suma lo que estuvo en alerta
+            con.executemany(
+                "UPDATE ciclo SET segundos_alerta = segundos_alerta + "
+                "(julianday(?) - julianday(alerta_desde)) * 86400, alerta_desde = NULL "
+                "WHERE pedido = ? AND alerta_desde IS NOT NULL",
+                [(momento, p) for p in sale_alerta]
+            )
+            con.executemany("UPDATE ciclo SET alerta_desde = ? WHERE pedido = ?", [(momento, p) for p in entra_alerta])
+            con.executemany(
+                "UPDATE ciclo SET ejecutado = ? WHERE pedido = ? AND ejecutado IS NULL",
+                [(momento, p) for p in se_ejecuta]
+            )
+            con.executemany("UPDATE ciclo SET tecnico = ? WHERE pedido = ?", filas(cambia_tecnico))
+            con.executemany("UPDATE ciclo SET sale = ? WHERE pedido = ?", [(momento, p) for p in salen["pedido"]])
+            # Un pedido que vuelve al informe empieza un ciclo nuevo
+            con.executemany(
+                "INSERT OR REPLACE INTO ciclo (pedido, actividad, tipo_direccion, subzona, tecnico, fecha_recibo, "
+                "aparece, ejecutado, alerta_desde) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                filas(ciclo_nuevos)
+            )
+
+            # Último estado: se reescriben solo los pedidos nuevos o con cambios
+            guardar = pd.concat([nuevos, cambian])[["pedido", "huella"] + seguidos]
+            guardar = guardar.astype(object).where(guardar.notna(), None)
+            con.executemany(
+                f"INSERT OR REPLACE INTO estado_pedidos (pedido, huella, {', '.join(seguidos)}) "
+                f"VALUES ({', '.join('?' * (len(seguidos) + 2))})",
+                [(p, int(h), *resto) for p, h, *resto in filas(guardar)]
+            )
+            con.executemany("DELETE FROM estado_pedidos WHERE pedido = ?", [(p,) for p in salen["pedido"]])
+
+            resumen = {"pedidos": len(actual), "cambios": len(nuevos) + len(salen) + len(cambian), "eventos": len(eventos)}
+            con.execute(
+                "INSERT OR REPLACE INTO corridas (momento, pedidos, cambios, eventos, segundos) VALUES (?, ?, ?, ?, ?)",
+                (momento, resumen["pedidos"], resumen["cambios"], resumen["eventos"],
+                 round(time.perf_counter() - inicio, 3))
+            )
+        return resumen
+
+    def eventos(self, pedido=None, evento=None, desde=None, hasta=None):
+        """Eventos en orden (filtrados por pedido, tipo de evento y rango de 'momento')."""
+        condiciones, parametros = [], []
+        for columna, valor in (("pedido", pedido), ("evento", evento)):
+            if valor:
+                valores = [valor] if isinstance(valor, str) else list(valor)
+                condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+                parametros.extend(str(v).strip() for v in valores)
+        if desde:
+            condiciones.append("momento >= ?")
+            parametros.append(str(desde))
+        if hasta:
+            condiciones.append("momento < date(?, '+1 day')")
+            parametros.append(str(hasta))
+        donde = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return self.consultar(
+            f"SELECT momento, pedido, evento, desde, hasta FROM eventos{donde} ORDER BY momento, id", parametros
+        )
+
+    def tiempos_ciclo(self, por=None, desde=None, hasta=None, detalle=False):
+        """
+        Horas recepción → ejecución, ejecución → salida del informe (digitación)
+        y en ALERTA, por pedido (detalle=True) o resumidas (pedidos, mediana,
+        p90, promedio) por 'por'. Con rango: pedidos que salieron en el rango.
+        """
+        if por and por not in DIMENSIONES_CICLO:
+            raise ValueError(f"No se puede agrupar por '{por}'. Opciones: {', '.join(DIMENSIONES_CICLO)}")
+        condiciones, parametros = [], [_ahora()]
+        if desde:
+            condiciones.append("sale >= ?")
+            parametros.append(str(desde))
+        if hasta:
+            condiciones.append("sale < date(?, '+1 day')")
+            parametros.append(str(hasta))
+        donde = (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        tiempos = self.consultar(
+            "SELECT pedido, actividad, tipo_direccion, subzona, tecnico, fecha_recibo, aparece, ejecutado, sale, "
+            "(julianday(ejecutado) - julianday(fecha_recibo)) * 24 AS recepcion_ejecucion_h, "
+            "(julianday(sale) - julianday(ejecutado)) * 24 AS ejecucion_digitacion_h, "
+            "(segundos_alerta + COALESCE((julianday(COALESCE(sale, ?)) - julianday(alerta_desde)) * 86400, 0)) "
+            f"/ 3600 AS alerta_h FROM ciclo{donde}",
+            parametros
+        )
+        tiempos["alerta_h"] = tiempos["alerta_h"].where(tiempos["alerta_h"] > 0)
+        if detalle:
+            return tiempos
+
+        metricas = ["recepcion_ejecucion_h", "ejecucion_digitacion_h", "alerta_h"]
+        grupos = tiempos.groupby(tiempos[por].fillna("(vacío)")) if por else tiempos.assign(todos="TOTAL").groupby("todos")
+        resumen = grupos[metricas].agg(["count", "median", lambda s: s.quantile(0.9), "mean"])
+        resumen.columns = pd.MultiIndex.from_tuples(
+            [(m, {"count": "pedidos", "<lambda_0>": "p90", "median": "mediana", "mean": "promedio"}[e])
+             for m, e in resumen.columns]
+        )
+        return resumen.round(1)
+
+    # --------------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------------
+    def _donde(self, desde=None, hasta=None, **filtros):
+        """WHERE con rango de fechas de la foto y filtros {dimensión: valor o lista}."""
+        condiciones, parametros = [], []
+        if desde:
+            condiciones.append("fecha >= ?")
+            parametros.append(str(desde))
+        if hasta:
+            condiciones.append("fecha <= ?")
+            parametros.append(str(hasta))
+        for columna, valores in filtros.items():
+            if columna not in DIMENSIONES:
+                raise ValueError(f"No se puede filtrar por '{columna}'. Opciones: {', '.join(DIMENSIONES)}")
+            if valores is None:
+                continue
+            valores = [valores] if isinstance(valores, str) else list(valores)
+            condiciones.append(f"{columna} IN ({', '.join('?' * len(valores))})")
+            parametros.extend(valores)
+        return (" WHERE " + " AND ".join(condiciones)) if condiciones else "", parametros
+
+    def consultar(self, sql, parametros=()):
+        """
+        DataFrame con el resultado de una consulta SQL libre, por la conexión de
+        solo lectura: lo que intente escribir falla con pd.errors.DatabaseError.
+        """
+        try:
+            return pd.read_sql_query(sql, self._conexion_lectura(), params=list(parametros))
+        except TypeError:  # la sentencia no devuelve filas (read_sql_query no tiene columnas que leer)
+            raise ValueError("La consulta no devuelve filas: use SELECT.") from None
+
+    def fotos(self):
+        return self.consultar("SELECT * FROM fotos ORDER BY fecha")
+
+    def tendencia(self, por="estado", desde=None, hasta=None, **filtros):
+        """Pedidos por día de foto (filas) y valor de 'por' (columnas)."""
+        if por not in DIMENSIONES:
+            raise ValueError(f"No se puede agrupar por '{por}'. Opciones: {', '.join(DIMENSIONES)}")
+        donde, parametros = self._donde(desde, hasta, **filtros)
+        usadas = {por} | {c for c, v in filtros.items() if v is not None}
+        if usadas <= set(DIMENSIONES_CONTEO):
+            tabla, conteo = "conteos_dia", "SUM(pedidos)"
+        else:
+            tabla, conteo = "pedidos_dia", "COUNT(*)"
+        conteos = self.consultar(
+            f"SELECT fecha, COALESCE({por}, '(vacío)') AS {por}, {conteo} AS pedidos "
+            f"FROM {tabla}{donde} GROUP BY fecha, {por}",
+            parametros
+        )
+        return conteos.pivot(index="fecha", columns=por, values="pedidos").fillna(0).astype(int)
+
+    def cohorte(self, estado, por=None, desde=None, hasta=None, **filtros):
+        """
+        Pedidos distintos que estuvieron en 'estado' al menos un día del rango,
+        con la primera y la última foto en ese estado. Con 'por': conteo por esa columna.
+        """
+        donde, parametros = self._donde(desde, hasta, estado=estado, **filtros)
+        if por:
+            if por not in DIMENSIONES:
+                raise ValueError(f"No se puede agrupar por '{por}'. Opciones: {', '.join(DIMENSIONES)}")
+            return self.consultar(
+                f"SELECT COALESCE({por}, '(vacío)') AS {por}, COUNT(DISTINCT pedido) AS pedidos "
+                f"FROM pedidos_dia{donde} GROUP BY 1 ORDER BY pedidos DESC",
+                parametros
+            )
+        return self.consultar(
+            "SELECT pedido, MIN(fecha) AS primera_foto, MAX(fecha) AS ultima_foto, COUNT(*) AS dias, "
+            "MAX(actividad) AS actividad, MAX(subzona) AS subzona, MAX(tecnico) AS tecnico "
+            f"FROM pedidos_dia{donde} GROUP BY pedido ORDER BY primera_foto, pedido",
+            parametros
+        )
+
+    def pedido(self, pedido):
+        """Todas las fotos de un pedido, en orden."""
+        return self.consultar(
+            "SELECT * FROM pedidos_dia WHERE pedido = ? ORDER BY fecha", (str(pedido).strip(),)
+        )
@@ -0,0 +1,278 @@
+# ------------------------------------------------------------
+# 🔌 CLIENTES GOOGLE COMPARTIDOS – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Credenciales del service account cacheadas por (archivo, scopes).
+# - Sesiones HTTP autorizadas reutilizables (pool de conexiones),
+#   una por hilo, para Drive (requests / httplib2) y gspread.
+# - Limitador token-bucket por API + reintentos con espera
+#   exponencial ante 429 / 5xx (respeta Retry-After). Las sesiones
+#   de descarga usan reintentos=0: reintenta descarga_reanudable
+#   (desde el checkpoint), una sola capa.
+# - Contadores por API: llamadas, reintentos, errores, latencia
+#   y tiempo esperando cupo → estadisticas() / imprimir_estadisticas().
+# - Con CONTROL_ANS_GOOGLE_STUB=http://127.0.0.1:8080 las llamadas
+#   de Drive y de Sheets (gspread) van a ese servidor local con
+#   credenciales anónimas (pruebas sin red ni service account):
+#   https://www.googleapis.com/drive/v3/... → <stub>/drive/v3/...
+#   https://sheets.googleapis.com/v4/...    → <stub>/v4/...
+# ------------------------------------------------------------
+
+import os
+import random
+import threading
+import time
+
+import google_auth_httplib2
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+
+SCOPE_DRIVE = "https://www.googleapis.com/auth/drive"
+SCOPE_SHEETS = "https://www.googleapis.com/auth/spreadsheets"
+SCOPE_SHEETS_LECTURA = "https://www.googleapis.com/auth/spreadsheets.readonly"
+
+# Cupos por API: (peticiones por segundo, ráfaga máxima)
+LIMITES = {
+    "drive": (20.0, 40),
+    "sheets": (1.0, 5),     # Sheets: 60 lecturas/min por usuario
+}
+
+CODIGOS_REINTENTO = {429, 500, 502, 503, 504}
+REINTENTOS = 5
+ESPERA_MAXIMA = 32.0
+CONEXIONES_POR_HOST = 16
+
+# Servidor local que reemplaza a googleapis.com en pruebas
+ENDPOINT_STUB = os.environ.get("CONTROL_ANS_GOOGLE_STUB", "").rstrip("/")
+HOSTS_GOOGLE = ("https://www.googleapis.com", "https://sheets.googleapis.com")
+
+
+def al_stub(url):
+    """Con ENDPOINT_STUB, la misma URL contra el servidor local; si no, igual."""
+    if ENDPOINT_STUB:
+        for host in HOSTS_GOOGLE:
+            if url.startswith(host):
+                return ENDPOINT_STUB + url[len(host):]
+    return url
+
+
+# ============================================================
+# LIMITADOR TOKEN-BUCKET
+# ============================================================
+class LimitadorTasa:
+    """Entrega 'por_segundo' permisos por segundo con ráfagas de hasta 'rafaga'."""
+
+    def __init__(self, por_segundo, rafaga):
+        self.por_segundo = float(por_segundo)
+        self.rafaga = float(rafaga)
+        self._fichas = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self):
+        """Bloquea hasta tener cupo. Devuelve los segundos esperados."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultimo) * self.por_segundo)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return esperado
+                espera = (1 - self._fichas) / self.por_segundo
+            time.sleep(espera)
+            esperado += espera
+
+
+# ============================================================
+# ESTADÍSTICAS POR API
+# ============================================================
+_lock_stats = threading.Lock()
+_estadisticas = {}
+_limitadores = {}
+
+
+def limitador(api):
+    with _lock_stats:
+        if api not in _limitadores:
+            _limitadores[api] = LimitadorTasa(*LIMITES.get(api, (10.0, 20)))
+        return _limitadores[api]
+
+
+def _registrar(api, segundos, reintentos=0, error=False, espera_cupo=0.0):
+    with _lock_stats:
+        e = _estadisticas.setdefault(api, {
+            "llamadas": 0, "reintentos": 0, "errores": 0,
+            "segundos": 0.0, "max_segundos": 0.0, "espera_cupo": 0.0,
+        })
+        e["llamadas"] += 1
+        e["reintentos"] += reintentos
+        e["errores"] += int(error)
+        e["segundos"] += segundos
+        e["max_segundos"] = max(e["max_segundos"], segundos)
+        e["espera_cupo"] += espera_cupo
+
+
+def estadisticas():
+    """Copia de los contadores por API (con latencia promedio)."""
+    with _lock_stats:
+        salida = {}
+        for api, e in _estadisticas.items():
+            salida[api] = dict(e, promedio_segundos=e["segundos"] / e["llamadas"] if e["llamadas"] else 0.0)
+        return salida
+
+
+def imprimir_estadisticas():
+    for api, e in sorted(estadisticas().items()):
+        print(f"📡 {api}: {e['llamadas']} llamadas, {e['reintentos']} reintentos, "
+              f"{e['errores']} errores | prom {e['promedio_segundos'] * 1000:.0f} ms, "
+              f"máx {e['max_segundos'] * 1000:.0f} ms | espera por cupo {e['espera_cupo']:.1f} s")
+
+
+def _espera_reintento(intento, retry_after=None):
+    if retry_after:
+        try:
+            return min(ESPERA_MAXIMA, float(retry_after))
+        except ValueError:
+            pass
+    return min(ESPERA_MAXIMA, 2 ** intento) * random.uniform(0.5, 1.0)
+
+
+def _con_control(api, hacer_peticion, obtener_estado, obtener_retry_after, descartar=None,
+                 reintentos_max=REINTENTOS):
+    """Aplica cupo, reintentos (hasta 'reintentos_max') y medición a una petición HTTP."""
+    espera_cupo = limitador(api).tomar()
+    inicio = time.perf_counter()
+    reintentos = 0
+    while True:
+        try:
+            respuesta = hacer_peticion()
+        except Exception:
+            _registrar(api, time.perf_counter() - inicio, reintentos, True, espera_cupo)
+            raise
+        estado = obtener_estado(respuesta)
+        if estado not in CODIGOS_REINTENTO or reintentos >= reintentos_max:
+            _registrar(api, time.perf_counter() - inicio, reintentos, estado >= 400, espera_cupo)
+            return respuesta
+        if descartar:
+            descartar(respuesta)   # liberar la conexión antes de reintentar
+        time.sleep(_espera_reintento(reintentos, obtener_retry_after(respuesta)))
+        reintentos += 1
+        espera_cupo += limitador(api).tomar()
+
+
+# ============================================================
+# TRANSPORTES CON CONTROL
+# ============================================================
+class SesionControlada(AuthorizedSession):
+    """AuthorizedSession (requests) con cupo, reintentos y métricas."""
+
+    def __init__(self, credenciales, api, reintentos=REINTENTOS):
+        super().__init__(credenciales)
+        self.api = api
+        self.reintentos = reintentos
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=CONEXIONES_POR_HOST)
+        self.mount("https://", adaptador)
+        self.mount("http://", adaptador)
+
+    def request(self, method, url, *args, **kwargs):
+        url = al_stub(url)  # también las URL que arma gspread
+        return _con_control(
+            self.api,
+            lambda: super(SesionControlada, self).request(method, url, *args, **kwargs),
+            lambda r: r.status_code,
+            lambda r: r.headers.get("Retry-After"),
+            lambda r: r.close(),
+            self.reintentos,
+        )
+
+
+class HttpControlado(google_auth_httplib2.AuthorizedHttp):
+    """AuthorizedHttp (httplib2, usado por googleapiclient) con cupo y métricas."""
+
+    def __init__(self, credenciales, api):
+        super().__init__(credenciales)
+        self.api = api
+
+    def request(self, uri, method="GET", *args, **kwargs):
+        return _con_control(
+            self.api,
+            lambda: super(HttpControlado, self).request(uri, method, *args, **kwargs),
+            lambda r: r[0].status,
+            lambda r: r[0].get("retry-after"),
+        )
+
+
+# ============================================================
+# CACHÉ DE CREDENCIALES Y CLIENTES
+# ============================================================
+_lock_creds = threading.Lock()
+_credenciales = {}
+_por_hilo = threading.local()
+
+
+def credenciales(ruta_cred, scopes):
+    """Credenciales del service account, leídas una vez por (archivo, scopes)."""
+    clave = (str(ruta_cred), tuple(sorted(scopes)))
+    with _lock_creds:
+        if ENDPOINT_STUB:
+            return AnonymousCredentials()
+        if clave not in _credenciales:
+            _credenciales[clave] = service_account.Credentials.from_service_account_file(
+                str(ruta_cred), scopes=list(scopes)
+            )
+        return _credenciales[clave]
+
+
+def _cache_hilo(clave, crear):
+    # Los clientes HTTP no son seguros entre hilos: uno por hilo y clave
+    cache = getattr(_por_hilo, "clientes", None)
+    if cache is None:
+        cache = _por_hilo.clientes = {}
+    if clave not in cache:
+        cache[clave] = crear()
+    return cache[clave]
+
+
+def sesion_google(ruta_cred, scopes=(SCOPE_DRIVE,), api="drive", reintentos=REINTENTOS):
+    """
+    Sesión requests autorizada y controlada (descargas por URL, gspread).
+    Para descarga_reanudable: reintentos=0 (los reintentos los hace ella).
+    """
+    return _cache_hilo(
+        ("sesion", str(ruta_cred), tuple(sorted(scopes)), api, reintentos),
+        lambda: SesionControlada(credenciales(ruta_cred, scopes), api, reintentos),
+    )
+
+
+def servicio_drive(ruta_cred, scopes=(SCOPE_DRIVE,)):
+    """Cliente googleapiclient de Drive v3 sobre HttpControlado."""
+    from googleapiclient.discovery import build
+
+    opciones = {"api_endpoint": ENDPOINT_STUB} if ENDPOINT_STUB else None
+    return _cache_hilo(
+        ("drive", str(ruta_cred), tuple(sorted(scopes))),
+        lambda: build("drive", "v3", http=HttpControlado(credenciales(ruta_cred, scopes), "drive"),
+                      cache_discovery=False, client_options=opciones),
+    )
+
+
+def url_contenido_drive(file_id):
+    """URL de descarga directa (alt=media) de un archivo de Drive."""
+    return al_stub(f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media")
+
+
+def cliente_gspread(ruta_cred, solo_lectura=False):
+    """Cliente gspread que comparte credenciales, pool y cupo de 'sheets'."""
+    import gspread
+
+    scopes = (SCOPE_SHEETS_LECTURA,) if solo_lectura else (SCOPE_SHEETS,)
+    return _cache_hilo(
+        ("gspread", str(ruta_cred), scopes),
+        lambda: gspread.Client(auth=credenciales(ruta_cred, scopes),
+                               session=sesion_google(ruta_cred, scopes, api="sheets")),
+    )
@@ -0,0 +1,125 @@
+# ------------------------------------------------------------
+# 🗜️ COMPRESIÓN ADAPTATIVA DE EVIDENCIAS – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - El tipo real se detecta por contenido (firma del archivo),
+#   no por la extensión: Drive entrega fotos guardadas como .pdf.
+# - PDF: se optimiza con PyMuPDF (modules/optimizacion_pdf.py,
+#   lo mismo que el formulario) y sigue siendo PDF.
+# - JPG / PNG / ZIP: ya vienen comprimidos → se dejan igual.
+# - Otros: se toma una muestra con zlib y solo se empaqueta
+#   en .zip si el ahorro estimado pasa el umbral.
+# - Cada llamada devuelve bytes antes/después y tiempo de CPU;
+#   pensada para correr dentro de un ProcessPoolExecutor.
+# ------------------------------------------------------------
+
+import os
+import time
+import zlib
+import zipfile
+from pathlib import Path
+
+# Sin PyMuPDF (fitz = None) los PDF pasan por el muestreo zlib
+from modules.optimizacion_pdf import fitz, optimizar_pdf
+
+# Parámetros
+MUESTRA_BLOQUE = 64 * 1024      # se leen 3 bloques: inicio, mitad y final
+AHORRO_MINIMO = 0.10            # comprimir solo si se ahorra al menos 10 %
+TAMANO_MINIMO = 20 * 1024       # por debajo de 20 KB no vale la pena
+
+FIRMAS = [
+    (b"%PDF", "pdf"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG", "png"),
+    (b"PK\x03\x04", "zip"),
+    (b"GIF8", "gif"),
+]
+YA_COMPRIMIDOS = {"jpg", "png", "zip", "gif"}
+
+
+def detectar_tipo(ruta):
+    with open(ruta, "rb") as f:
+        cabecera = f.read(8)
+    for firma, tipo in FIRMAS:
+        if cabecera.startswith(firma):
+            return tipo
+    # Sin firma conocida (texto, CSV, etc.): la extensión no es confiable
+    return "otro"
+
+
+def estimar_ratio(ruta):
+    """Ratio comprimido/original de una muestra del archivo (1.0 = no comprime)."""
+    tamano = os.path.getsize(ruta)
+    if tamano == 0:
+        return 1.0
+    with open(ruta, "rb") as f:
+        if tamano <= 3 * MUESTRA_BLOQUE:
+            muestra = f.read()
+        else:
+            muestra = b""
+            for posicion in (0, tamano // 2, tamano - MUESTRA_BLOQUE):
+                f.seek(posicion)
+                muestra += f.read(MUESTRA_BLOQUE)
+    return len(zlib.compress(muestra, 6)) / len(muestra)
+
+
+def _optimizar_pdf(ruta):
+    temporal = ruta.with_name(f"~tmp_{ruta.name}")
+    try:
+        optimizar_pdf(ruta, temporal)
+        if temporal.stat().st_size >= ruta.stat().st_size:
+            return ruta, "PDF_SIN_AHORRO"
+        os.replace(temporal, ruta)
+        return ruta, "PDF_OPTIMIZADO"
+    finally:
+        temporal.unlink(missing_ok=True)
+
+
+def _empaquetar_zip(ruta):
+    zip_path = ruta.with_suffix(".zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(ruta, ruta.name)
+    ruta.unlink()
+    return zip_path, "ZIP"
+
+
+def comprimir_evidencia(ruta):
+    """
+    Decide y aplica la compresión de una evidencia.
+    Devuelve dict con ruta final, tipo, método, bytes y CPU.
+    """
+    ruta = Path(ruta)
+    cpu_inicio = time.process_time()
+    antes = ruta.stat().st_size
+    tipo = detectar_tipo(ruta)
+    ratio = None
+    error = None
+
+    if antes < TAMANO_MINIMO:
+        final, metodo = ruta, "PEQUENO"
+    elif tipo == "pdf" and fitz is not None:
+        try:
+            final, metodo = _optimizar_pdf(ruta)
+        except Exception as e:
+            # PDF dañado o protegido: se conserva tal cual
+            final, metodo, error = ruta, "PDF_ERROR", str(e)
+    elif tipo in YA_COMPRIMIDOS:
+        final, metodo = ruta, "YA_COMPRIMIDO"
+    else:
+        ratio = estimar_ratio(ruta)
+        if ratio <= 1 - AHORRO_MINIMO:
+            final, metodo = _empaquetar_zip(ruta)
+        else:
+            final, metodo = ruta, "SIN_AHORRO"
+
+    return {
+        "ruta": str(final),
+        "tipo": tipo,
+        "metodo": metodo,
+        "ratio_muestra": ratio,
+        "bytes_antes": antes,
+        "bytes_despues": final.stat().st_size,
+        "cpu_segundos": time.process_time() - cpu_inicio,
+        "error": error,
+    }
@@ -0,0 +1,143 @@
+# ------------------------------------------------------------
+# ⏯️ DESCARGA REANUDABLE POR BLOQUES – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Escribe en '<destino>.part' y guarda en '<destino>.part.ckpt'
+#   el último byte confirmado (flush + fsync).
+# - Si la conexión se cae, el siguiente intento (o la siguiente
+#   corrida) pide solo lo que falta con 'Range: bytes=N-'.
+# - Reintentos con espera exponencial + aleatoria.
+# - Al terminar verifica tamaño y md5Checksum de Drive y recién
+#   ahí renombra el archivo (os.replace, atómico).
+# - Un parcial que ya no calza con el archivo de Drive (md5
+#   distinto, más bytes que el tamaño, 416 antes del final) se
+#   borra y se baja de nuevo desde el byte 0.
+# - Recibe la URL y una sesión tipo requests: sirve igual con
+#   AuthorizedSession de Google que contra un servidor local.
+# ------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import random
+import time
+from pathlib import Path
+
+BLOQUE = 1024 * 1024          # bytes por lectura / checkpoint
+INTENTOS = 6
+ESPERA_BASE = 1.0             # s; se duplica en cada reintento
+ESPERA_MAXIMA = 30.0
+TIMEOUT = (10, 60)            # (conexión, lectura) en segundos
+
+
+class DescargaError(Exception):
+    """La descarga no se completó (reintentos agotados o error definitivo)."""
+
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+
+def md5_archivo(ruta):
+    h = hashlib.md5()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _leer_checkpoint(ckpt, url):
+    try:
+        datos = json.loads(Path(ckpt).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return 0
+    # Un checkpoint de otra URL no sirve para reanudar
+    return int(datos.get("offset", 0)) if datos.get("url") == url else 0
+
+
+def _guardar_checkpoint(ckpt, url, offset):
+    temporal = Path(f"{ckpt}.tmp")
+    temporal.write_text(json.dumps({"url": url, "offset": offset}), encoding="utf-8")
+    os.replace(temporal, ckpt)
+
+
+def _limpiar(*rutas):
+    for ruta in rutas:
+        Path(ruta).unlink(missing_ok=True)
+
+
+def descargar_reanudable(url, destino, sesion, md5=None, tamano=None,
+                         intentos=INTENTOS, espera_base=ESPERA_BASE, al_avanzar=None):
+    """
+    Descarga 'url' en 'destino' retomando desde el último checkpoint.
+    Devuelve el número de bytes del archivo final.
+    'al_avanzar(bytes_nuevos)' se llama tras cada bloque confirmado.
+    """
+    destino = Path(destino)
+    parte = destino.with_name(destino.name + ".part")
+    ckpt = destino.with_name(destino.name + ".part.ckpt")
+    tamano = int(tamano) if tamano else None
+
+    for intento in range(1, intentos + 1):
+        offset = _leer_checkpoint(ckpt, url) if parte.exists() else 0
+        if tamano is not None and offset > tamano:
+            _limpiar(parte, ckpt)   # el archivo cambió en Drive: el parcial no sirve
+            offset = 0
+        try:
+            cabeceras = {"Range": f"bytes={offset}-"} if offset else {}
+            with sesion.get(url, headers=cabeceras, stream=True, timeout=TIMEOUT) as resp:
+
+                codigo = resp.status_code
+                if codigo == 416 and offset and (tamano is None or offset >= tamano):
+                    pass  # ya estaba completo; solo falta verificar
+                elif codigo == 416 and offset:
+                    # Rango fuera del archivo antes de su tamaño: el parcial es de otra versión
+                    _limpiar(parte, ckpt)
+                    raise DescargaError(f"HTTP 416 desde byte {offset} de {tamano}")
+                else:
+                    if codigo == 200 and offset:
+                        offset = 0  # el servidor ignoró el Range → desde cero
+                    elif codigo not in (200, 206):
+                        # 404/403... no mejoran reintentando; 408, 429 y 5xx sí
+                        raise DescargaError(
+                            f"HTTP {codigo}",
+                            reintentable=codigo in (408, 429) or codigo >= 500
+                        )
+
+                    with open(parte, "r+b" if offset else "wb") as fh:
+                        # Descartar bytes escritos después del último checkpoint
+                        fh.seek(offset)
+                        fh.truncate()
+                        for bloque in resp.iter_content(BLOQUE):
+                            if not bloque:
+                                continue
+                            fh.write(bloque)
+                            fh.flush()
+                            os.fsync(fh.fileno())
+                            offset += len(bloque)
+                            _guardar_checkpoint(ckpt, url, offset)
+                            if al_avanzar:
+                                al_avanzar(len(bloque))
+
+            # Verificación antes de publicar el archivo
+            if tamano is not None and offset != tamano:
+                if offset > tamano:
+                    _limpiar(parte, ckpt)   # más bytes de los esperados: no se puede reanudar
+                raise DescargaError(f"tamaño {offset} ≠ {tamano} esperado")
+            if md5 and md5_archivo(parte) != md5:
+                _limpiar(parte, ckpt)   # contenido corrupto: no se puede reanudar
+                raise DescargaError("md5Checksum no coincide")
+
+            os.replace(parte, destino)
+            _limpiar(ckpt)
+            return destino.stat().st_size
+
+        except Exception as e:
+            if intento == intentos or not getattr(e, "reintentable", True):
+                raise DescargaError(f"{destino.name}: {e}", reintentable=False) from e
+            espera = min(ESPERA_MAXIMA, espera_base * 2 ** (intento - 1)) * random.uniform(0.5, 1.0)
+            print(f"⚠️ {destino.name}: {e} → reintento {intento}/{intentos - 1} "
+                  f"desde byte {_leer_checkpoint(ckpt, url) if parte.exists() else 0} "
+                  f"en {espera:.1f} s")
+            time.sleep(espera)
@@ -0,0 +1,104 @@
+# ------------------------------------------------------------
+# 📁 METADATOS GOOGLE DRIVE EN LOTE – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - listar_carpeta:    lista TODAS las páginas de una carpeta
+#                      (sigue nextPageToken, nada queda por fuera).
+# - obtener_metadatos: resuelve muchos IDs por petición HTTP
+#                      (batch de hasta 100 llamadas).
+# - mover_archivos:    cambia de carpeta en lote, usando los
+#                      'parents' ya conocidos (sin get previo).
+# ------------------------------------------------------------
+
+# Campos que necesitan los descargadores
+CAMPOS_ARCHIVO = "id, name, mimeType, md5Checksum, size, parents"
+
+# Límite de llamadas por petición batch que acepta Drive
+MAX_LOTE = 100
+
+TIPO_CARPETA = "application/vnd.google-apps.folder"
+
+
+def _bloques(lista, tamano=MAX_LOTE):
+    for i in range(0, len(lista), tamano):
+        yield lista[i:i + tamano]
+
+
+# ============================================================
+# LISTAR CARPETA CON PAGINACIÓN
+# ============================================================
+def listar_carpeta(service, folder_id, incluir_carpetas=False, campos=CAMPOS_ARCHIVO):
+    """Devuelve la lista completa de archivos dentro de 'folder_id'."""
+    query = f"'{folder_id}' in parents and trashed = false"
+    if not incluir_carpetas:
+        query += f" and mimeType != '{TIPO_CARPETA}'"
+
+    archivos, token = [], None
+    while True:
+        respuesta = service.files().list(
+            q=query,
+            fields=f"nextPageToken, files({campos})",
+            pageSize=1000,
+            pageToken=token,
+        ).execute()
+        archivos.extend(respuesta.get("files", []))
+        token = respuesta.get("nextPageToken")
+        if not token:
+            return archivos
+
+
+# ============================================================
+# METADATOS DE MUCHOS IDS EN POCAS PETICIONES
+# ============================================================
+def obtener_metadatos(service, file_ids, campos=CAMPOS_ARCHIVO):
+    """
+    Devuelve {file_id: metadatos} para los IDs que existen.
+    Los IDs inexistentes o sin permiso quedan con valor None.
+    """
+    resultado = {}
+
+    def recibir(request_id, respuesta, error):
+        resultado[request_id] = None if error is not None else respuesta
+
+    ids = list(dict.fromkeys(str(i) for i in file_ids if i))
+    for bloque in _bloques(ids):
+        lote = service.new_batch_http_request(callback=recibir)
+        for file_id in bloque:
+            lote.add(service.files().get(fileId=file_id, fields=campos), request_id=file_id)
+        lote.execute()
+
+    return resultado
+
+
+# ============================================================
+# MOVER ARCHIVOS A OTRA CARPETA EN LOTE
+# ============================================================
+def mover_archivos(service, archivos, carpeta_destino):
+    """
+    'archivos' es una lista de dicts con 'id' y 'parents' (tal como
+    los entrega listar_carpeta). Devuelve (ids_movidos, {id: error}).
+    """
+    movidos, errores = [], {}
+
+    def recibir(request_id, respuesta, error):
+        if error is not None:
+            errores[request_id] = error
+        else:
+            movidos.append(request_id)
+
+    for bloque in _bloques(list(archivos)):
+        lote = service.new_batch_http_request(callback=recibir)
+        for archivo in bloque:
+            lote.add(
+                service.files().update(
+                    fileId=archivo["id"],
+                    addParents=carpeta_destino,
+                    removeParents=",".join(archivo.get("parents", [])),
+                    fields="id",
+                ),
+                request_id=archivo["id"],
+            )
+        lote.execute()
+
+    return movidos, errores
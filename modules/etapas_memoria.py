@@ -0,0 +1,120 @@
+# ------------------------------------------------------------
+# 🧠 TRASPASO EN MEMORIA ENTRE ETAPAS DEL INFORME – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - como_texto(df): el DataFrame que dejó la etapa anterior,
+#   con los mismos tipos que daría pd.read_excel(..., dtype=str).
+# - hoja_como_texto(ws): lo mismo leyendo una hoja openpyxl
+#   que ya está abierta (sin volver a parsear el .xlsx).
+# - abrir_libro / guardar_libro: el último libro guardado queda
+#   en memoria; si el archivo en disco no cambió desde entonces
+#   la siguiente etapa lo reutiliza en vez de load_workbook.
+#   Corriendo cada script por separado el caché simplemente
+#   está vacío y todo se lee del disco como siempre.
+# - precargar / leer_precargado: el worker arranca en hilos la
+#   lectura de los archivos crudos (pendientes, digitación,
+#   actas) al inicio del informe; la etapa recoge el resultado
+#   si el archivo no cambió y si no, lo lee ella misma.
+# ------------------------------------------------------------
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+_lock = threading.Lock()
+_libros = {}   # ruta → (firma del archivo, Workbook)
+_precargas = {}  # (ruta, lector) → (firma del archivo, Future)
+_hilos = ThreadPoolExecutor(max_workers=4, thread_name_prefix="precarga")
+
+
+def _valor_texto(valor):
+    # Mismas reglas que el lector openpyxl de pandas con dtype=str
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    texto = str(valor)
+    return texto if texto != "" else None
+
+
+def _tabla_texto(filas, columnas):
+    df = pd.DataFrame(filas, columns=columnas, dtype=object)
+    return df.where(df.notna(), np.nan)
+
+
+def como_texto(df):
+    """Copia de 'df' con todas las columnas como texto (vacíos → NaN)."""
+    filas = [[_valor_texto(v) for v in fila] for fila in df.itertuples(index=False, name=None)]
+    return _tabla_texto(filas, list(df.columns))
+
+
+def hoja_como_texto(ws):
+    """DataFrame (texto) con el contenido actual de una hoja openpyxl."""
+    filas = ws.iter_rows(values_only=True)
+    encabezado = next(filas, None)
+    if encabezado is None:
+        return pd.DataFrame()
+    columnas = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(encabezado)]
+    datos = [[_valor_texto(v) for v in fila] for fila in filas if any(v is not None for v in fila)]
+    return _tabla_texto(datos, columnas)
+
+
+def _firma(ruta):
+    try:
+        st = Path(ruta).stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def abrir_libro(ruta, **kwargs):
+    """Workbook de 'ruta': el que quedó en memoria si el archivo no cambió."""
+    clave = str(Path(ruta).resolve())
+    with _lock:
+        guardado = _libros.get(clave)
+    if guardado and guardado[0] == _firma(ruta):
+        return guardado[1]
+    return load_workbook(ruta, **kwargs)
+
+
+def guardar_libro(wb, ruta):
+    """wb.save(ruta) y deja el libro disponible para la siguiente etapa."""
+    wb.save(ruta)
+    with _lock:
+        _libros[str(Path(ruta).resolve())] = (_firma(ruta), wb)
+
+
+def _clave_lectura(ruta, lector):
+    return (str(Path(ruta).resolve()), f"{lector.__module__}.{lector.__qualname__}")
+
+
+def precargar(ruta, lector):
+    """Empieza lector(ruta) en un hilo; la etapa lo recoge con leer_precargado."""
+    firma = _firma(ruta)
+    if firma is None:
+        return
+    with _lock:
+        _precargas[_clave_lectura(ruta, lector)] = (firma, _hilos.submit(lector, ruta))
+
+
+def leer_precargado(ruta, lector):
+    """Resultado de la precarga si el archivo no cambió; si no, lector(ruta)."""
+    with _lock:
+        guardado = _precargas.pop(_clave_lectura(ruta, lector), None)
+    if guardado and guardado[0] == _firma(ruta):
+        return guardado[1].result()
+    return lector(ruta)
+
+
+def descartar_precargas():
+    """Olvida las precargas que ninguna etapa recogió."""
+    with _lock:
+        pendientes = list(_precargas.values())
+        _precargas.clear()
+    for _, futuro in pendientes:
+        futuro.cancel()
@@ -0,0 +1,388 @@
+# ------------------------------------------------------------
+# ⏱️ MEDICIÓN DE ETAPAS (tiempo, CPU, memoria, filas) – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - with medir("calculos", "leer") as m: ...; m.filas(salida=len(df))
+# - @medido("calculos", "transformar"): filas de entrada = primer
+#   DataFrame que recibe, de salida = el que devuelve.
+# - paso = iniciar_paso(...) / paso.cerrar(...) en scripts planos.
+# - Cada paso agrega una línea a logs/metricas_etapas.jsonl con
+#   segundos, CPU, RSS actual, pico RSS del paso, pico RSS del
+#   proceso, filas y (si está activo) el pico de tracemalloc.
+# - Pico RSS del paso: en Linux cada paso reinicia el pico del
+#   proceso (VmHWM, "5" en /proc/self/clear_refs) y lo lee al
+#   cerrar; los pasos que siguen abiertos se quedan con lo que
+#   llevaban. Donde no se puede reiniciar (Windows) queda en
+#   None: ahí solo está el pico del proceso, que en el worker
+#   persistente es el de toda su vida.
+# - CONTROL_ANS_TRACEMALLOC=1 activa tracemalloc (más lento).
+# - CONTROL_ANS_PERFIL=1 guarda un cProfile del paso exterior de
+#   cada etapa en logs/perfiles/<etapa>_<paso>_<corrida>.prof.
+# - python -m modules.instrumentacion → última corrida contra la
+#   mediana de las anteriores.
+# ------------------------------------------------------------
+
+import cProfile
+import functools
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUTA_METRICAS = BASE_DIR / "logs" / "metricas_etapas.jsonl"
+RUTA_PERFILES = BASE_DIR / "logs" / "perfiles"
+
+CON_TRACEMALLOC = os.environ.get("CONTROL_ANS_TRACEMALLOC") == "1"
+CON_PERFIL = os.environ.get("CONTROL_ANS_PERFIL") == "1"
+
+VENTANA_MEDIANA = 10      # corridas anteriores para la mediana
+UMBRAL_LENTO = 1.25       # ▲ si tarda 25 % más que la mediana
+MINIMO_SEGUNDOS = 0.5     # ...y al menos esto más (los pasos cortos son ruido)
+MB = 1024 * 1024
+
+_lock = threading.Lock()
+_local = threading.local()   # pila de pasos abiertos (por hilo)
+_abiertos = set()            # pasos abiertos de todos los hilos (el pico RSS es del proceso)
+_pico_proceso = 0.0          # pico RSS del proceso, aunque se reinicie VmHWM
+
+
+def _id_corrida():
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+
+
+_corrida = _id_corrida()
+
+
+def nueva_corrida():
+    """Identificador nuevo para todo lo que se mida de aquí en adelante."""
+    global _corrida
+    _corrida = _id_corrida()
+    return _corrida
+
+
+def fijar_corrida(identificador):
+    """Usa la corrida del proceso principal (ramas del pool)."""
+    global _corrida
+    _corrida = identificador
+
+
+# ============================================================
+# MEMORIA DEL PROCESO (sin dependencias externas)
+# ============================================================
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class _ContadoresMemoria(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+
+def memoria_proceso():
+    """
+    (RSS actual, RSS pico) del proceso en MB; None donde no se pueda leer.
+    En Linux el pico es desde el último reiniciar_pico_rss().
+    """
+    try:
+        if sys.platform == "win32":
+            contadores = _ContadoresMemoria()
+            contadores.cb = ctypes.sizeof(contadores)
+            proceso = ctypes.windll.kernel32.GetCurrentProcess()
+            ctypes.windll.psapi.GetProcessMemoryInfo(proceso, ctypes.byref(contadores), contadores.cb)
+            return contadores.WorkingSetSize / MB, contadores.PeakWorkingSetSize / MB
+
+        valores = {}
+        with open("/proc/self/status", encoding="ascii") as f:
+            for linea in f:
+                if linea.startswith(("VmRSS:", "VmHWM:")):
+                    clave, kb = linea.split()[:2]
+                    valores[clave] = int(kb) / 1024
+        return valores.get("VmRSS:"), valores.get("VmHWM:")
+    except (OSError, AttributeError, ValueError):
+        pass
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, pico / (MB if sys.platform == "darwin" else 1024)
+    except (ImportError, OSError):
+        return None, None
+
+
+def reiniciar_pico_rss():
+    """Pico RSS del proceso = RSS actual (solo Linux). False si no se pudo."""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _pila():
+    if not hasattr(_local, "pila"):
+        _local.pila = []
+    return _local.pila
+
+
+def _contar(objeto):
+    """Filas de un DataFrame (o del primero de una tupla); None si no aplica."""
+    if isinstance(objeto, tuple) and objeto:
+        objeto = objeto[0]
+    forma = getattr(objeto, "shape", None)
+    if hasattr(objeto, "columns") and forma and len(forma) == 2:
+        return int(forma[0])
+    return None
+
+
+def _escribir(registro):
+    RUTA_METRICAS.parent.mkdir(parents=True, exist_ok=True)
+    linea = json.dumps(registro, ensure_ascii=False) + "\n"
+    with _lock, open(RUTA_METRICAS, "a", encoding="utf-8") as f:
+        f.write(linea)
+
+
+# ============================================================
+# PASO MEDIDO
+# ============================================================
+class Paso:
+    """Un paso medido de una etapa; se usa con 'with' o iniciar()/cerrar()."""
+
+    def __init__(self, etapa, paso):
+        self.etapa = etapa
+        self.paso = paso
+        self.filas_entrada = None
+        self.filas_salida = None
+        self._pico_tm = 0
+        self._pico_rss = 0.0
+        self._pico_por_paso = False
+        self._perfil = None
+        self._cerrado = False
+
+    def filas(self, entrada=None, salida=None):
+        if entrada is not None:
+            self.filas_entrada = int(entrada)
+        if salida is not None:
+            self.filas_salida = int(salida)
+        return self
+
+    def iniciar(self):
+        pila = _pila()
+        if CON_TRACEMALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if pila:
+                pila[-1]._pico_tm = max(pila[-1]._pico_tm, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        if CON_PERFIL and not pila:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        pila.append(self)
+
+        global _pico_proceso
+        with _lock:
+            rss, rss_pico = memoria_proceso()
+            if rss_pico is not None:
+                # Lo que llevan los pasos abiertos antes de reiniciar el pico
+                _pico_proceso = max(_pico_proceso, rss_pico)
+                for abierto in _abiertos:
+                    abierto._pico_rss = max(abierto._pico_rss, rss_pico)
+            self._pico_por_paso = reiniciar_pico_rss()
+            _abiertos.add(self)
+        self._rss_inicio = rss
+        self._t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+        return self
+
+    def cerrar(self, ok=True, entrada=None, salida=None):
+        if self._cerrado:
+            return
+        self._cerrado = True
+        segundos = time.perf_counter() - self._t0
+        cpu = time.process_time() - self._cpu0
+        self.filas(entrada, salida)
+
+        global _pico_proceso
+        with _lock:
+            rss, rss_pico = memoria_proceso()
+            _abiertos.discard(self)
+            if rss_pico is not None:
+                _pico_proceso = max(_pico_proceso, rss_pico)
+        pico_paso = max(self._pico_rss, rss_pico) if self._pico_por_paso and rss_pico is not None else None
+
+        # Pasos internos que quedaron abiertos (excepción antes de cerrar)
+        pila = _pila()
+        if self in pila:
+            del pila[pila.index(self):]
+
+        registro = {
+            "corrida": _corrida,
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "etapa": self.etapa,
+            "paso": self.paso,
+            "ok": ok,
+            "segundos": round(segundos, 3),
+            "cpu_s": round(cpu, 3),
+            "rss_mb": None if rss is None else round(rss, 1),
+            "rss_delta_mb": None if rss is None or self._rss_inicio is None else round(rss - self._rss_inicio, 1),
+            "rss_pico_mb": None if pico_paso is None else round(pico_paso, 1),
+            "rss_pico_proceso_mb": round(_pico_proceso, 1) if _pico_proceso else None,
+            "filas_entrada": self.filas_entrada,
+            "filas_salida": self.filas_salida,
+        }
+
+        if CON_TRACEMALLOC and tracemalloc.is_tracing():
+            self._pico_tm = max(self._pico_tm, tracemalloc.get_traced_memory()[1])
+            registro["tracemalloc_pico_mb"] = round(self._pico_tm / MB, 1)
+            if pila:
+                pila[-1]._pico_tm = max(pila[-1]._pico_tm, self._pico_tm)
+
+        if self._perfil is not None:
+            self._perfil.disable()
+            RUTA_PERFILES.mkdir(parents=True, exist_ok=True)
+            ruta = RUTA_PERFILES / f"{self.etapa}_{self.paso}_{_corrida}.prof"
+            self._perfil.dump_stats(ruta)
+            registro["perfil"] = ruta.relative_to(BASE_DIR).as_posix()
+
+        _escribir(registro)
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, tipo, valor, traza):
+        # sys.exit(0) también es una salida correcta
+        ok = tipo is None or (tipo is SystemExit and valor.code in (0, None))
+        self.cerrar(ok=ok)
+        return False
+
+
+def medir(etapa, paso):
+    """with medir(etapa, paso) as m: ..."""
+    return Paso(etapa, paso)
+
+
+def iniciar_paso(etapa, paso):
+    return Paso(etapa, paso).iniciar()
+
+
+def medido(etapa, paso):
+    """Decorador: mide la función y cuenta filas del primer argumento y del resultado."""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with Paso(etapa, paso) as medicion:
+                medicion.filas(entrada=_contar(args[0]) if args else None)
+                resultado = funcion(*args, **kwargs)
+                medicion.filas(salida=_contar(resultado))
+                return resultado
+        return envoltura
+    return decorador
+
+
+# ============================================================
+# HISTÓRICO: ÚLTIMA CORRIDA VS MEDIANA
+# ============================================================
+def leer_metricas(ruta=RUTA_METRICAS, max_bytes=8 * MB):
+    """Registros del JSONL (solo la cola del archivo si creció mucho)."""
+    try:
+        with open(ruta, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            tamano = f.tell()
+            f.seek(max(0, tamano - max_bytes))
+            contenido = f.read().decode("utf-8", errors="ignore")
+    except OSError:
+        return []
+    lineas = contenido.splitlines()
+    if tamano > max_bytes:
+        lineas = lineas[1:]  # la primera quedó cortada
+    registros = []
+    for linea in lineas:
+        try:
+            registros.append(json.loads(linea))
+        except ValueError:
+            continue
+    return registros
+
+
+def comparar_ultima_corrida(registros=None, ventana=VENTANA_MEDIANA):
+    """
+    Para cada (etapa, paso) de la última corrida: segundos contra la
+    mediana de sus 'ventana' corridas anteriores. Lista de dicts.
+    """
+    registros = leer_metricas() if registros is None else registros
+    if not registros:
+        return []
+    ultima = registros[-1]["corrida"]
+
+    historia = {}
+    for r in registros:
+        historia.setdefault((r["etapa"], r["paso"]), []).append(r)
+
+    filas = []
+    for (etapa, paso), lista in historia.items():
+        if lista[-1]["corrida"] != ultima:
+            continue
+        previos = [r["segundos"] for r in lista[:-1] if r["corrida"] != ultima and r.get("ok", True)][-ventana:]
+        mediana = statistics.median(previos) if previos else None
+        actual = lista[-1]
+        filas.append({
+            "etapa": etapa,
+            "paso": paso,
+            "ok": actual.get("ok", True),
+            "segundos": actual["segundos"],
+            "mediana": mediana,
+            "relacion": actual["segundos"] / mediana if mediana else None,
+            "rss_pico_mb": actual.get("rss_pico_mb"),
+            "filas_salida": actual.get("filas_salida"),
+        })
+    return filas
+
+
+def formatear_comparacion(filas, solo_totales=False):
+    """Tabla de texto (fuente monoespaciada) para el panel o la consola."""
+    lineas = [f"{'ETAPA':<17}{'PASO':<19}{'ÚLTIMA':>9}{'MEDIANA':>9}  {'PICO MB':>8}{'FILAS':>9}"]
+    for f in filas:
+        marca = " "
+        if f["mediana"] is not None and abs(f["segundos"] - f["mediana"]) >= MINIMO_SEGUNDOS:
+            if f["relacion"] >= UMBRAL_LENTO:
+                marca = "▲"
+            elif f["relacion"] <= 1 / UMBRAL_LENTO:
+                marca = "▼"
+        if solo_totales and f["paso"] != "total" and marca != "▲":
+            continue
+        mediana = f"{f['mediana']:.2f}s" if f["mediana"] is not None else "—"
+        pico = f"{f['rss_pico_mb']:.0f}" if f["rss_pico_mb"] is not None else "—"
+        filas_salida = f["filas_salida"] if f["filas_salida"] is not None else "—"
+        lineas.append(
+            f"{f['etapa']:<17}{f['paso']:<19}{f['segundos']:>8.2f}s{mediana:>9}{marca} {pico:>8}{filas_salida:>9}"
+            + ("" if f["ok"] else "  ❌")
+        )
+    return "\n".join(lineas)
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    filas = comparar_ultima_corrida()
+    if not filas:
+        print(f"Sin métricas en {RUTA_METRICAS}")
+    else:
+        print(f"Última corrida vs mediana de las {VENTANA_MEDIANA} anteriores (▲ ≥ {UMBRAL_LENTO:.2f}×)")
+        print(formatear_comparacion(filas))
@@ -0,0 +1,182 @@
+# ------------------------------------------------------------
+# 🧾 MANIFIESTO DE DESCARGAS DE EVIDENCIAS – SQLite
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Una fila por archivo de Drive (clave: file_id) con md5,
+#   tamaño, ruta local y estado de descarga/compresión.
+# - Antes de descargar se registra la tarea como PENDIENTE con
+#   su nombre final: si la corrida se interrumpe, la siguiente
+#   retoma esos mismos archivos con el mismo consecutivo.
+# - Tabla 'corridas' con el rendimiento de cada ejecución.
+# ------------------------------------------------------------
+
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+PENDIENTE = "PENDIENTE"
+DESCARGADO = "DESCARGADO"
+
+
+def _ahora():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class ManifiestoDescargas:
+    """Registro persistente de evidencias descargadas desde Drive."""
+
+    def __init__(self, ruta_db):
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._crear_esquema()
+
+    # --------------------------------------------------------
+    # CONEXIÓN Y ESQUEMA
+    # --------------------------------------------------------
+    def _conexion(self):
+        """Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.ruta_db, timeout=30)
+            con.row_factory = sqlite3.Row
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA busy_timeout=30000")
+            self._local.con = con
+        return con
+
+    def _crear_esquema(self):
+        with self._conexion() as con:
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS archivos (
+                    file_id TEXT PRIMARY KEY,
+                    pedido TEXT,
+                    fecha_form TEXT,
+                    md5 TEXT,
+                    bytes INTEGER,
+                    ruta_local TEXT,
+                    estado TEXT NOT NULL,
+                    compresion TEXT,
+                    bytes_final INTEGER,
+                    cpu_segundos REAL,
+                    corrida INTEGER,
+                    actualizado TEXT
+                )
+            """)
+            # Manifiestos creados antes de registrar el resultado de la compresión
+            existentes = {fila["name"] for fila in con.execute("PRAGMA table_info(archivos)")}
+            for columna, tipo in (("bytes_final", "INTEGER"), ("cpu_segundos", "REAL")):
+                if columna not in existentes:
+                    con.execute(f"ALTER TABLE archivos ADD COLUMN {columna} {tipo}")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_archivos_pedido ON archivos(pedido)")
+            con.execute("CREATE INDEX IF NOT EXISTS ix_archivos_actualizado ON archivos(actualizado)")
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS corridas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    inicio TEXT NOT NULL,
+                    fin TEXT,
+                    desde TEXT,
+                    planificados INTEGER,
+                    omitidos INTEGER,
+                    descargados INTEGER,
+                    errores INTEGER,
+                    bytes INTEGER,
+                    segundos REAL,
+                    archivos_s REAL,
+                    mb_s REAL
+                )
+            """)
+
+    # --------------------------------------------------------
+    # CONSULTAS
+    # --------------------------------------------------------
+    def estados(self):
+        """{file_id: fila} de todo el manifiesto (una sola lectura)."""
+        return {
+            fila["file_id"]: dict(fila)
+            for fila in self._conexion().execute("SELECT * FROM archivos")
+        }
+
+    def buscar(self, file_id):
+        fila = self._conexion().execute(
+            "SELECT * FROM archivos WHERE file_id = ?", (file_id,)
+        ).fetchone()
+        return dict(fila) if fila else None
+
+    def descargados(self, desde=None):
+        """
+        Filas ya descargadas (pedido, ruta_local, ...). Con 'desde' solo
+        las actualizadas en ese momento o después ('AAAA-MM-DD HH:MM:SS').
+        """
+        consulta = "SELECT * FROM archivos WHERE estado = ?"
+        parametros = [DESCARGADO]
+        if desde:
+            # >= : las del mismo segundo se repiten, no se pierden
+            consulta += " AND actualizado >= ?"
+            parametros.append(desde)
+        return [
+            dict(fila) for fila in self._conexion().execute(
+                consulta + " ORDER BY fecha_form, pedido", parametros
+            )
+        ]
+
+    def ultima_actualizacion(self):
+        return self._conexion().execute("SELECT MAX(actualizado) FROM archivos").fetchone()[0]
+
+    # --------------------------------------------------------
+    # ESCRITURA
+    # --------------------------------------------------------
+    def planificar(self, tareas, corrida=None):
+        """Registra como PENDIENTE las tareas nuevas (no pisa las existentes)."""
+        with self._conexion() as con:
+            con.executemany(
+                "INSERT INTO archivos (file_id, pedido, fecha_form, md5, bytes, ruta_local, "
+                "estado, corrida, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(file_id) DO UPDATE SET md5 = excluded.md5, bytes = excluded.bytes, "
+                "corrida = excluded.corrida, actualizado = excluded.actualizado",
+                [
+                    (t["file_id"], t.get("pedido"), t.get("fecha_form"), t.get("md5"),
+                     t.get("bytes"), str(t["ruta_local"]), PENDIENTE, corrida, _ahora())
+                    for t in tareas
+                ]
+            )
+
+    def marcar_descargado(self, file_id, ruta_local, bytes_):
+        with self._conexion() as con:
+            con.execute(
+                "UPDATE archivos SET estado = ?, ruta_local = ?, bytes = ?, actualizado = ? "
+                "WHERE file_id = ?",
+                (DESCARGADO, str(ruta_local), int(bytes_), _ahora(), file_id)
+            )
+
+    def marcar_compresion(self, file_id, ruta_local, compresion, bytes_final=None, cpu_segundos=None):
+        with self._conexion() as con:
+            con.execute(
+                "UPDATE archivos SET ruta_local = ?, compresion = ?, bytes_final = ?, "
+                "cpu_segundos = ?, actualizado = ? WHERE file_id = ?",
+                (str(ruta_local), compresion, bytes_final,
+                 None if cpu_segundos is None else round(cpu_segundos, 3), _ahora(), file_id)
+            )
+
+    # --------------------------------------------------------
+    # CORRIDAS
+    # --------------------------------------------------------
+    def iniciar_corrida(self, desde=None):
+        with self._conexion() as con:
+            return con.execute(
+                "INSERT INTO corridas (inicio, desde) VALUES (?, ?)", (_ahora(), desde)
+            ).lastrowid
+
+    def cerrar_corrida(self, corrida, planificados, omitidos, descargados, errores, bytes_, segundos):
+        segundos = max(segundos, 1e-6)
+        with self._conexion() as con:
+            con.execute(
+                "UPDATE corridas SET fin = ?, planificados = ?, omitidos = ?, descargados = ?, "
+                "errores = ?, bytes = ?, segundos = ?, archivos_s = ?, mb_s = ? WHERE id = ?",
+                (_ahora(), planificados, omitidos, descargados, errores, int(bytes_),
+                 round(segundos, 2), round(descargados / segundos, 2),
+                 round(bytes_ / 1048576 / segundos, 2), corrida)
+            )
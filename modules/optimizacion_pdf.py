@@ -0,0 +1,38 @@
+# ------------------------------------------------------------
+# 📄 OPTIMIZACIÓN DE PDF DE EVIDENCIAS – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Misma optimización para las evidencias que llegan por el
+#   formulario (formularios_tecnicos/procesador_evidencias.py)
+#   y las que se bajan de Drive (modules/compresion_evidencias.py):
+#   reescribe las imágenes internas por encima de PDF_DPI_UMBRAL
+#   a PDF_DPI_OBJETIVO y limpia / comprime los flujos. Sigue
+#   siendo PDF.
+# - Escribe en un temporal: quien llama decide si reemplaza el
+#   original (solo si pesa menos).
+# - fitz es None sin PyMuPDF; quien llama deja el PDF como llegó.
+# ------------------------------------------------------------
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:  # PyMuPDF no instalado → los PDF se dejan como llegan
+    fitz = None
+
+PDF_DPI_UMBRAL = 200      # imágenes del PDF por encima de este DPI se reducen...
+PDF_DPI_OBJETIVO = 150    # ...a este DPI
+PDF_CALIDAD_JPEG = 75
+
+
+def optimizar_pdf(ruta, temporal):
+    """Escribe en 'temporal' la versión optimizada del PDF 'ruta'."""
+    with fitz.open(ruta) as doc:
+        # rewrite_images existe desde PyMuPDF 1.24
+        if hasattr(doc, "rewrite_images"):
+            doc.rewrite_images(
+                dpi_threshold=PDF_DPI_UMBRAL,
+                dpi_target=PDF_DPI_OBJETIVO,
+                quality=PDF_CALIDAD_JPEG,
+            )
+        doc.save(temporal, garbage=4, deflate=True, deflate_images=True,
+                 deflate_fonts=True, clean=True)
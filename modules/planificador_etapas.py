@@ -0,0 +1,301 @@
+# ------------------------------------------------------------
+# 🗂️ PLANIFICADOR DE ETAPAS CON CACHÉ POR CONTENIDO – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Cada etapa declara su script, sus archivos de entrada
+#   (admite globs), sus salidas y de qué etapas depende.
+# - Firma de la etapa = SHA-256 del script + de cada entrada.
+#   Si coincide con la última corrida exitosa y sus salidas
+#   siguen en disco tal como las dejó el informe, se omite.
+# - Como make: también se corre si una dependencia se corrió
+#   después que ella (p. ej. con --etapa sobre una intermedia).
+# - Lo que se corre arrastra a sus dependientes y, si una
+#   salida compartida ya fue reescrita por una etapa posterior
+#   (FENIX_ANS.xlsx pasa por cálculos → cruce → merge), también
+#   a la etapa de arriba que la produjo.
+# - 'vigencia_min': etapas que dependen del reloj o de datos
+#   externos se repiten pasado ese tiempo aunque nada cambie.
+# - Las etapas 'paralela' corren en otro proceso (el worker
+#   entrega un Future) y avanzan junto con la cadena principal.
+# - Una etapa que falla no queda registrada: la siguiente
+#   corrida retoma desde ella. forzar=True ignora el caché.
+# - Lo que depende (directa o indirectamente) de una etapa que
+#   falló no se corre: trabajaría sobre las salidas de la
+#   corrida anterior. Queda ok=False con 'omitida_por' y sin
+#   registro, para que la próxima corrida (o --reanudar) la haga.
+# - Los hashes se recalculan solo si cambia (mtime, tamaño).
+# ------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from datetime import datetime
+from pathlib import Path
+
+from modules.almacen_blobs import hash_archivo
+
+
+class PlanificadorEtapas:
+    """DAG de etapas del informe con estado en un JSON."""
+
+    def __init__(self, base, etapas, ruta_estado):
+        self.base = Path(base)
+        self.etapas = {e["nombre"]: e for e in etapas}
+        self.orden = [e["nombre"] for e in etapas]
+        self.ruta_estado = Path(ruta_estado)
+
+        # La lista debe venir en orden topológico
+        vistas = set()
+        for nombre in self.orden:
+            faltantes = [d for d in self.etapas[nombre].get("depende", []) if d not in vistas]
+            if faltantes:
+                raise ValueError(f"La etapa '{nombre}' depende de {faltantes}, declaradas después o inexistentes.")
+            vistas.add(nombre)
+
+        self.estado = self._cargar()
+        self._firmas = {}
+
+    # --------------------------------------------------------
+    # ESTADO EN DISCO
+    # --------------------------------------------------------
+    def _cargar(self):
+        try:
+            estado = json.loads(self.ruta_estado.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            estado = {}
+        for clave in ("etapas", "hashes", "archivos"):
+            estado.setdefault(clave, {})
+        estado.setdefault("fallo", None)
+        return estado
+
+    def _guardar(self):
+        self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+        temporal = self.ruta_estado.with_name(self.ruta_estado.name + ".tmp")
+        temporal.write_text(json.dumps(self.estado, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(temporal, self.ruta_estado)
+
+    # --------------------------------------------------------
+    # HASHES Y FIRMAS
+    # --------------------------------------------------------
+    def _rel(self, ruta):
+        try:
+            return Path(ruta).relative_to(self.base).as_posix()
+        except ValueError:
+            return str(ruta)
+
+    def _archivos(self, patrones):
+        rutas = []
+        for patron in patrones:
+            if any(c in patron for c in "*?["):
+                rutas.extend(sorted(self.base.glob(patron)))
+            else:
+                rutas.append(self.base / patron)
+        return list(dict.fromkeys(rutas))
+
+    def _hash(self, ruta):
+        """SHA-256 del archivo (None si no existe), reutilizando el último si no cambió."""
+        try:
+            st = Path(ruta).stat()
+        except OSError:
+            return None
+        clave = self._rel(ruta)
+        previo = self.estado["hashes"].get(clave)
+        if previo and previo[0] == st.st_mtime_ns and previo[1] == st.st_size:
+            return previo[2]
+        sha = hash_archivo(ruta)
+        self.estado["hashes"][clave] = [st.st_mtime_ns, st.st_size, sha]
+        return sha
+
+    def firma(self, nombre):
+        etapa = self.etapas[nombre]
+        rutas = self._archivos([etapa["script"]] + etapa.get("entradas", []))
+        partes = [[self._rel(r), self._hash(r)] for r in rutas]
+        return hashlib.sha256(json.dumps(partes).encode("utf-8")).hexdigest()
+
+    def _fin(self, nombre):
+        return self.estado["etapas"].get(nombre, {}).get("fin", 0)
+
+    def _salidas(self, nombre):
+        return self._archivos(self.etapas[nombre].get("salidas", []))
+
+    def _salidas_intactas(self, nombre):
+        """Salidas tal como las dejó la última etapa que las escribió."""
+        for ruta in self._salidas(nombre):
+            sha = self._hash(ruta)
+            if sha is None or sha != self.estado["archivos"].get(self._rel(ruta)):
+                return False
+        return True
+
+    def _salidas_reescritas(self, nombre):
+        """True si alguna salida ya no es la que produjo esta etapa."""
+        registro = self.estado["etapas"].get(nombre, {})
+        return any(
+            self._hash(self.base / rel) != sha
+            for rel, sha in registro.get("salidas", {}).items()
+        )
+
+    # --------------------------------------------------------
+    # PLAN
+    # --------------------------------------------------------
+    def _cierre(self, objetivos):
+        """Objetivos + todas sus dependencias."""
+        incluidas = set()
+        pendientes = list(objetivos)
+        while pendientes:
+            nombre = pendientes.pop()
+            if nombre not in self.etapas:
+                raise KeyError(f"Etapa desconocida: {nombre}")
+            if nombre not in incluidas:
+                incluidas.add(nombre)
+                pendientes.extend(self.etapas[nombre].get("depende", []))
+        return incluidas
+
+    def planificar(self, objetivos=None, forzar=False, reanudar=False, solo=False):
+        """
+        Devuelve (etapas incluidas en orden, {etapa: motivo} de las que hay que correr).
+        'solo' limita la corrida a los objetivos, sin revisar sus dependencias.
+        """
+        objetivos = objetivos or self.orden
+        incluidas = set(objetivos) if solo else self._cierre(objetivos)
+        incluidas = [n for n in self.orden if n in incluidas]
+        ahora = time.time()
+
+        motivos = {}
+        for nombre in incluidas:
+            self._firmas[nombre] = self.firma(nombre)
+            registro = self.estado["etapas"].get(nombre)
+            vigencia = self.etapas[nombre].get("vigencia_min")
+            if forzar:
+                motivos[nombre] = "forzada"
+            elif not registro:
+                motivos[nombre] = "sin corrida previa"
+            elif registro["firma"] != self._firmas[nombre]:
+                motivos[nombre] = "cambiaron sus entradas"
+            elif not self._salidas_intactas(nombre):
+                motivos[nombre] = "salidas modificadas o ausentes"
+            elif any(self._fin(d) > registro["fin"] for d in self.etapas[nombre].get("depende", [])):
+                motivos[nombre] = "una dependencia se corrió después"
+            elif vigencia and not reanudar and ahora - registro["fin"] > vigencia * 60:
+                motivos[nombre] = f"más de {vigencia} min desde la última corrida"
+
+        # Propagar hasta que no cambie nada
+        cambio = True
+        while cambio:
+            cambio = False
+            for nombre in incluidas:
+                if nombre in motivos:
+                    continue
+                deps = [d for d in self.etapas[nombre].get("depende", []) if d in motivos]
+                hijas = [
+                    n for n in incluidas
+                    if n in motivos and nombre in self.etapas[n].get("depende", [])
+                ]
+                if deps:
+                    motivos[nombre] = f"depende de {deps[0]}"
+                    cambio = True
+                elif hijas and self._salidas_reescritas(nombre):
+                    motivos[nombre] = f"{hijas[0]} necesita su salida y ya fue reescrita"
+                    cambio = True
+
+        return incluidas, motivos
+
+    # --------------------------------------------------------
+    # EJECUCIÓN
+    # --------------------------------------------------------
+    def _registrar(self, nombre):
+        salidas = {self._rel(r): self._hash(r) for r in self._salidas(nombre)}
+        self.estado["etapas"][nombre] = {
+            "firma": self._firmas[nombre],
+            "fin": time.time(),
+            "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "salidas": salidas,
+        }
+        self.estado["archivos"].update(salidas)
+
+    def _cerrar(self, nombre, salida, datos, resumen, salidas, fallos):
+        resumen[nombre] = dict(datos, cache=False)
+        if datos["ok"]:
+            salidas[nombre] = salida
+            self._registrar(nombre)
+        else:
+            # Sin registro: la próxima corrida la repite (y lo que dependa de ella)
+            self.estado["etapas"].pop(nombre, None)
+            fallos.append(nombre)
+        self._guardar()
+
+    def ejecutar(self, correr, objetivos=None, forzar=False, reanudar=False, solo=False, antes=None):
+        """
+        Corre las etapas pendientes apenas estén listas sus dependencias.
+        'correr(nombre, df)' → (DataFrame o None, resumen con 'ok'), o un
+        Future con eso si la etapa corre en otro proceso: mientras tanto
+        se sigue con las demás. Las 'paralela' se lanzan primero.
+        'antes(etapas)' recibe las etapas que se van a correr.
+        Devuelve {etapa: resumen}; las omitidas llevan 'cache': True y las
+        que no se corrieron por una falla aguas arriba, 'omitida_por'.
+        """
+        self.estado = self._cargar()
+        if reanudar and self.estado["fallo"]:
+            print(f"↩️ Reanudando desde la etapa {self.estado['fallo']}")
+
+        incluidas, motivos = self.planificar(objetivos, forzar, reanudar, solo)
+        if antes:
+            antes([n for n in incluidas if n in motivos])
+
+        resumen, salidas, fallos = {}, {}, []
+        bloqueadas = {}  # etapa → etapa que falló aguas arriba
+        pendientes = list(incluidas)
+        en_curso = {}   # Future → etapa
+
+        while pendientes or en_curso:
+            listas = [
+                n for n in pendientes
+                if not any(d in pendientes or d in en_curso.values()
+                           for d in self.etapas[n].get("depende", []))
+            ]
+            listas.sort(key=lambda n: not self.etapas[n].get("paralela", False))
+
+            if listas:
+                nombre = listas[0]
+                pendientes.remove(nombre)
+                causa = next((bloqueadas.get(d, d) for d in self.etapas[nombre].get("depende", [])
+                              if d in fallos or d in bloqueadas), None)
+                if causa:
+                    print(f"⛔ Etapa {nombre}: no se corre porque falló {causa}")
+                    bloqueadas[nombre] = causa
+                    resumen[nombre] = {"ok": False, "segundos": None, "filas": None, "cache": False,
+                                       "omitida_por": causa}
+                    self.estado["etapas"].pop(nombre, None)
+                    continue
+                if nombre not in motivos:
+                    print(f"⏭️ Etapa {nombre}: sin cambios, se reutiliza la corrida anterior")
+                    resumen[nombre] = {"ok": True, "segundos": 0, "filas": None, "cache": True}
+                    continue
+
+                print(f"\n▶️ Etapa {nombre} ({motivos[nombre]})...")
+                deps = self.etapas[nombre].get("depende", [])
+                resultado = correr(nombre, salidas.get(deps[0]) if deps else None)
+                if isinstance(resultado, Future):
+                    en_curso[resultado] = nombre
+                else:
+                    self._cerrar(nombre, *resultado, resumen, salidas, fallos)
+                continue
+
+            hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                nombre = en_curso.pop(futuro)
+                try:
+                    salida, datos = futuro.result()
+                except Exception as e:
+                    # El proceso de la rama se cayó (memoria, pool roto...)
+                    print(f"❌ Etapa {nombre}: {e}")
+                    salida, datos = None, {"ok": False, "segundos": None, "filas": None}
+                self._cerrar(nombre, salida, datos, resumen, salidas, fallos)
+
+        fallo = min(fallos, key=self.orden.index, default=None)
+        if fallo or self.estado["fallo"] in incluidas:
+            self.estado["fallo"] = fallo
+        self._guardar()
+        return {n: resumen[n] for n in incluidas}
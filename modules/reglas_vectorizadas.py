@@ -0,0 +1,193 @@
+# ------------------------------------------------------------
+# ⚡ REGLAS ANS VECTORIZADAS (candidatas a reemplazar los apply)
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Misma regla de negocio que la versión fila a fila, pero
+#   sobre columnas completas (numpy / pandas .str):
+#     dias_pactados            ← calculos_ans.dias_pactados
+#     clasificar_tipo_direccion← limpieza_fenix.clasificar_tipo_direccion
+#     dias_restantes           ← calculos_ans.calcular_dias_restantes
+#     estado_fenix             ← cruce_digitacion_fenix.calcular_estado_fenix
+#     evaluar_diferencia       ← validar_export_almacen.evaluar
+#     ajustar_complementarios  ← validar_export_almacen (7.1, bucle por pedido)
+# - Las tablas y el calendario se reciben como parámetro para
+#   usar exactamente los mismos que el script original.
+# - Antes de usarlas en una etapa: python -m benchmark.equivalencia
+#   debe terminar sin filas distintas.
+# ------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+
+SEPARADOR = "\x1f"  # no aparece en ACTIVIDAD / TIPO_DIRECCION
+
+
+def _texto(serie):
+    """Como str(valor) fila a fila."""
+    return pd.Series(serie).astype(object).map(str, na_action=None)
+
+
+# ============================================================
+# DÍAS PACTADOS
+# ============================================================
+def dias_pactados(actividad, tipo_direccion, tabla):
+    """tabla = {ACTIVIDAD: {URBANO/RURAL: días}}; 0 si no está."""
+    act = _texto(actividad).str.strip().str.upper()
+    tipo = _texto(tipo_direccion).str.strip().str.upper()
+    claves = {f"{a}{SEPARADOR}{t}": dias for a, por_tipo in tabla.items() for t, dias in por_tipo.items()}
+    return (act + SEPARADOR + tipo.values).map(claves).fillna(0).astype("int64")
+
+
+# ============================================================
+# TIPO DE DIRECCIÓN
+# ============================================================
+def clasificar_tipo_direccion(direccion, tipo_original, patrones_calle, prefijos_urbanos):
+    direccion = pd.Series(direccion).astype(object)
+    tipo_original = pd.Series(tipo_original, index=direccion.index).astype(object)
+
+    vacia = direccion.isna() | (_texto(direccion).str.strip() == "")
+    valor = _texto(direccion).str.strip().str.upper()
+    calle = valor.str.startswith(tuple(patrones_calle))
+
+    sin_parentesis = valor.str.replace(r"\(.*?\)", "", regex=True).str.strip()
+    numerica = sin_parentesis.str.replace(r"[^0-9]", "", regex=True)
+    # str.isdigit() también acepta dígitos no ASCII (²,٣...): esas filas por la vía lenta
+    no_ascii = sin_parentesis.str.contains(r"[^\x00-\x7f]", regex=True)
+    if no_ascii.any():
+        numerica[no_ascii] = sin_parentesis[no_ascii].map(lambda s: "".join(c for c in s if c.isdigit()))
+
+    resultado = np.select(
+        [
+            vacia | calle | (numerica.str.len() < 6),
+            numerica.str.startswith(tuple(prefijos_urbanos)),
+            valor.str.contains("RURAL", regex=False),
+            valor.str.contains("URB", regex=False),
+        ],
+        [tipo_original, "Urbano", "Rural", "Urbano"],
+        default=tipo_original.to_numpy(),
+    )
+    return pd.Series(resultado, index=direccion.index, dtype=object)
+
+
+# ============================================================
+# DÍAS RESTANTES
+# ============================================================
+def dias_restantes(fecha_inicio, fecha_limite, ahora, weekmask, festivos):
+    """'N días HH:MM', 'VENCIDO' o '' (sin fechas), respecto a 'ahora' (fijo o uno por fila)."""
+    ini = pd.to_datetime(pd.Series(fecha_inicio))
+    lim = pd.to_datetime(pd.Series(fecha_limite, index=ini.index))
+    if isinstance(ahora, pd.Series):
+        ahora = ahora.to_numpy()
+    ahora = pd.to_datetime(pd.Series(ahora, index=ini.index))
+
+    falta = ini.isna() | lim.isna()
+    hoy = ahora.to_numpy().astype("datetime64[D]")
+    dia_limite = lim.to_numpy().astype("datetime64[D]")
+    dia_limite = np.where(falta, hoy, dia_limite)
+
+    dias = np.busday_count(hoy, dia_limite, weekmask=weekmask, holidays=festivos)
+    mismo_dia = dia_limite == hoy
+    dias = np.where((dias == 0) & ~mismo_dia, 1, dias)
+    # Viernes → lunes (o víspera de festivo): el siguiente hábil cuenta como 1
+    siguiente = np.busday_offset(hoy, 1, roll="forward", weekmask=weekmask, holidays=festivos)
+    dias = np.where(dia_limite == siguiente, 1, dias)
+
+    # Mismo día y ya pasó la hora (o es exactamente la hora) también vence
+    vencido = (lim <= ahora).to_numpy()
+    texto = pd.Series(dias.astype(str), index=ini.index) + " días " + ini.dt.strftime("%H:%M")
+    resultado = np.where(falta, "", np.where(vencido, "VENCIDO", texto.to_numpy(dtype=object)))
+    return pd.Series(resultado, index=ini.index, dtype=object)
+
+
+# ============================================================
+# ESTADO FÉNIX (cruce con digitación)
+# ============================================================
+def _dias_y_horas(textos):
+    """Como el int(partes[0]) / partes[2] del cruce, sin apply en el caso común."""
+    partes = _texto(textos).str.split(" ")
+    primera = partes.str[0]
+
+    dias = pd.Series(0, index=partes.index, dtype="int64")
+    comun = primera.str.fullmatch(r"[+-]?[0-9]+")
+    dias[comun] = primera[comun].astype("int64")
+    # Lo raro (espacios, '_', dígitos no ASCII) lo resuelve int() como el original
+    raro = ~comun & primera.str.contains(r"\d", regex=True)
+
+    def entero(texto):
+        try:
+            return int(texto)
+        except ValueError:
+            return None
+
+    convertidos = primera[raro].map(entero)
+    dias[convertidos.dropna().index] = convertidos.dropna().astype("int64")
+    valido = comun | primera.index.isin(convertidos.dropna().index)
+
+    horas = partes.str[2].where(valido & (partes.str.len() > 2), "00:00")
+    return dias, horas
+
+
+def ejecutado_en_campo(reporte):
+    """REPORTE_TECNICO → True si dice EJECUTADO ... CAMPO, sin tildes (lo que no es texto cuenta como vacío)."""
+    reporte = pd.Series(reporte).astype(object)
+    reporte = reporte.where(reporte.map(lambda v: isinstance(v, str)), "")  # como limpiar_texto
+    # REPORTE_TECNICO se repite mucho: una vez por texto distinto
+    codigos, unicos = pd.factorize(reporte)
+    unicos = (
+        pd.Series(unicos, dtype=object).str.normalize("NFD").str.encode("ascii", "ignore").str.decode("utf-8")
+        .str.strip().str.upper()
+    )
+    ejecutado = unicos.str.contains("EJECUTADO", regex=False) & unicos.str.contains("CAMPO", regex=False)
+    return pd.Series(ejecutado.to_numpy(dtype=bool)[codigos], index=reporte.index)
+
+
+def estado_fenix(df, pedidos_digitacion):
+    pedido = _texto(df["PEDIDO"]).str.strip()
+
+    ejecutado = ejecutado_en_campo(df["REPORTE_TECNICO"]).to_numpy()
+
+    # DIAS_RESTANTES se repite mucho: una vez por texto distinto
+    codigos, unicos = pd.factorize(_texto(df["DIAS_RESTANTES"]))
+    dias, horas = _dias_y_horas(pd.Series(unicos, dtype=object))
+    dias, horas = dias.to_numpy()[codigos], horas.to_numpy()[codigos]
+
+    resultado = np.select(
+        [
+            pedido.isin(pedidos_digitacion),
+            ejecutado & (dias > 2),
+            ejecutado & (dias >= 1),
+            ejecutado & (dias == 0) & (horas != "00:00"),
+            ejecutado,
+        ],
+        ["CERRADO", "A TIEMPO", "ALERTA", "ALERTA_0_DIAS", "CRÍTICO"],
+        default="ABIERTO",
+    )
+    return pd.Series(resultado, index=df.index, dtype=object)
+
+
+# ============================================================
+# CONTROL ALMACÉN
+# ============================================================
+def evaluar_diferencia(diferencia):
+    d = pd.Series(diferencia)
+    resultado = np.select([d == 0, d > 0], ["OK", "FALTANTE EN ELITE"], default="EXCESO EN ELITE")
+    return pd.Series(resultado, index=d.index, dtype=object)
+
+
+def ajustar_complementarios(df, complementos):
+    """
+    Base + complemento del mismo pedido: si Elite tiene igual o más que
+    Fénix (y Fénix > 0) ambos quedan OK con diferencia 0.
+    Devuelve (df, ajustes) con ajustes = pares (pedido, base) marcados.
+    """
+    ajustes = 0
+    for base, comp in complementos.items():
+        en_par = df["codigo"].isin([base, comp])
+        totales = df[en_par].groupby("pedido")[["cantidad_fenix", "cantidad_elite"]].sum()
+        cubiertos = totales.index[
+            (totales["cantidad_elite"] >= totales["cantidad_fenix"]) & (totales["cantidad_fenix"] > 0)
+        ]
+        df.loc[en_par & df["pedido"].isin(cubiertos), ["estado", "diferencia"]] = ["OK – Material Complementario", 0]
+        ajustes += len(cubiertos)
+    return df, ajustes
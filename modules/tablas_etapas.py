@@ -0,0 +1,285 @@
+# ------------------------------------------------------------
+# 🗃️ TABLAS DE ETAPA EN FORMATO COLUMNAR – Control ANS
+# ------------------------------------------------------------
+# Héctor + IA (2025)
+# ------------------------------------------------------------
+# - Las etapas que escriben FENIX_CLEAN, FENIX_ANS o
+#   CONTROL_ALMACEN guardan además la hoja principal en
+#   data_clean/tablas/<NOMBRE>.parquet con tipos (fechas como
+#   datetime64, enteros Int64, decimales float64, el resto
+#   texto). Las demás etapas leen de ahí; el .xlsx queda para
+#   las personas y Power BI.
+# - leer_tabla(ruta_excel): lo mismo que pd.read_excel(ruta,
+#   dtype=str) (texto=True) o la tabla tipada (texto=False),
+#   en milisegundos. tipos_excel(texto) da los tipos que
+#   infiere pd.read_excel sin dtype. Si no hay tabla o el Excel cambió después
+#   de guardarla (editado a mano, o lo escribió otra versión
+#   del script) se lee el Excel como siempre.
+# - Una columna del esquema solo se guarda tipada si vuelve
+#   exactamente al mismo texto (mismo formato de fecha, mismo
+#   relleno tipo "SIN DATOS"); si no, se guarda como texto.
+# - Sin pyarrow se guarda como pickle de pandas (mismos tipos).
+# ------------------------------------------------------------
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from modules.etapas_memoria import como_texto
+
+try:
+    import pyarrow  # noqa: F401
+    FORMATO = "parquet"
+except ImportError:  # sin pyarrow: pickle de pandas
+    FORMATO = "pickle"
+
+CARPETA = "tablas"
+VERSION = 1
+
+# Formatos en que las etapas escriben fechas como texto (el primero que vuelva igual)
+FORMATOS_FECHA = ["%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y"]
+
+# Columnas tipadas por tabla (nombre del .xlsx sin extensión); el resto es texto
+ESQUEMAS = {
+    "FENIX_CLEAN": {
+        "FECHA_RECIBO": "fecha",
+        "FECHA_INICIO_ANS": "fecha",
+        "DIAS_PACTADOS": "entero",
+    },
+    "FENIX_ANS": {
+        "FECHA_RECIBO": "fecha",
+        "FECHA_INICIO_ANS": "fecha",
+        "FECHA_LIMITE_ANS": "fecha",
+        "DIAS_PACTADOS": "entero",
+        "COORDENADAX": "decimal",
+        "COORDENADAY": "decimal",
+    },
+    "CONTROL_ALMACEN": {
+        "cantidad_fenix": "decimal",
+        "cantidad_elite": "decimal",
+        "diferencia": "decimal",
+    },
+}
+
+
+def _firma(ruta):
+    try:
+        st = Path(ruta).stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _ruta_meta(ruta_excel):
+    ruta_excel = Path(ruta_excel)
+    return ruta_excel.parent / CARPETA / f"{ruta_excel.stem}.json"
+
+
+def _escribir_atomico(ruta, escribir):
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    escribir(temporal)
+    os.replace(temporal, ruta)
+
+
+# ============================================================
+# TEXTO ↔ TIPOS
+# ============================================================
+def texto_excel(df):
+    """Como etapas_memoria.como_texto, sin recorrer celda a celda las columnas de texto."""
+    columnas = {}
+    for i, col in enumerate(df.columns):
+        serie = df.iloc[:, i]
+        if pd.api.types.infer_dtype(serie, skipna=True) in ("string", "empty"):
+            serie = serie.astype(object)
+            columnas[i] = serie.where(serie.notna() & (serie != ""), np.nan)
+        elif pd.api.types.is_integer_dtype(serie.dtype) and not serie.hasnans:
+            columnas[i] = serie.astype(str).astype(object)
+        else:
+            columnas[i] = como_texto(serie.to_frame())[col]
+    texto = pd.DataFrame(columnas, index=df.index)
+    texto.columns = [str(c) for c in df.columns]
+    return texto.reset_index(drop=True)
+
+
+def tipos_excel(texto):
+    """
+    Texto de la hoja → los tipos que da pd.read_excel sin dtype: el mismo
+    TextParser que usa pandas sobre las celdas (lo numérico como número).
+    """
+    if texto.empty:
+        return texto.copy()
+    filas = [list(texto.columns)] + texto.astype(object).where(texto.notna(), None).values.tolist()
+    return TextParser(filas, header=0).read()
+
+
+def a_fecha(serie):
+    """Fechas como las dejan las etapas (datetime o texto en FORMATOS_FECHA) → datetime64; lo demás NaT."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype(object).where(serie.notna(), None)
+    fechas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_FECHA:
+        faltan = fechas.isna() & texto.notna()
+        if not faltan.any():
+            break
+        fechas[faltan] = pd.to_datetime(texto[faltan], format=formato, errors="coerce")
+    return fechas
+
+
+def _a_texto(tipada, info):
+    """Columna tipada → el texto que tenía en el Excel."""
+    tipo = info["tipo"]
+    if tipo == "fecha":
+        texto = tipada.dt.strftime(info["formato"])
+    elif tipo == "entero":
+        texto = tipada.astype("Int64").astype(str)
+    elif tipo == "decimal":
+        entero = tipada.notna() & (tipada == np.floor(tipada))
+        texto = tipada.map(str).where(~entero, tipada.fillna(0).astype("int64").astype(str))
+    else:
+        texto = tipada
+    relleno = info.get("relleno")
+    return texto.astype(object).where(tipada.notna(), np.nan if relleno is None else relleno)
+
+
+def _tipar(texto, tipo):
+    """(columna tipada, info) si la ida y vuelta al texto es exacta; None si no."""
+    valores = texto.dropna()
+    if tipo == "fecha":
+        intentos = [(f, pd.to_datetime(valores, format=f, errors="coerce")) for f in FORMATOS_FECHA]
+    elif tipo == "entero":
+        intentos = [(None, pd.to_numeric(valores, errors="coerce").astype("Float64"))]
+    else:
+        intentos = [(None, pd.to_numeric(valores, errors="coerce"))]
+
+    for formato, convertidos in intentos:
+        fallidos = valores[convertidos.isna()].unique()
+        # Un único relleno ("SIN DATOS", "") y sin vacíos reales: se recupera al leer
+        if len(fallidos) > 1 or (len(fallidos) == 1 and texto.isna().any()):
+            continue
+        if tipo == "entero":
+            if not (convertidos.dropna() % 1 == 0).all():
+                continue
+            convertidos = convertidos.astype("Int64")
+        info = {"tipo": tipo}
+        if formato:
+            info["formato"] = formato
+        if len(fallidos):
+            info["relleno"] = str(fallidos[0])
+        tipada = convertidos.where(convertidos.notna()).reindex(texto.index)
+        if tipo == "decimal":
+            tipada = tipada.astype("float64")
+        if _a_texto(tipada, info).equals(texto):
+            return tipada, info
+    return None
+
+
+# ============================================================
+# GUARDAR / LEER
+# ============================================================
+def guardar_tabla(df, ruta_excel):
+    """Guarda 'df' (la hoja principal recién escrita en 'ruta_excel') como tabla tipada."""
+    ruta_excel = Path(ruta_excel)
+    texto = texto_excel(df)
+    if texto.columns.duplicated().any():
+        print(f"⚠️ {ruta_excel.name}: columnas repetidas, no se guarda la tabla columnar.")
+        return None
+
+    esquema = ESQUEMAS.get(ruta_excel.stem, {})
+    columnas, tipos = {}, {}
+    for col in texto.columns:
+        resultado = _tipar(texto[col], esquema[col]) if col in esquema else None
+        if resultado is None:
+            columnas[col], tipos[col] = texto[col], {"tipo": "texto"}
+        else:
+            columnas[col], tipos[col] = resultado
+    tabla = pd.DataFrame(columnas)
+
+    ruta_meta = _ruta_meta(ruta_excel)
+    ruta_meta.parent.mkdir(parents=True, exist_ok=True)
+    ruta_datos = ruta_meta.with_suffix(f".{FORMATO}")
+    if FORMATO == "parquet":
+        _escribir_atomico(ruta_datos, lambda r: tabla.to_parquet(r, index=False))
+    else:
+        _escribir_atomico(ruta_datos, tabla.to_pickle)
+
+    meta = {
+        "version": VERSION,
+        "archivo": ruta_datos.name,
+        "excel": _firma(ruta_excel),
+        "filas": len(tabla),
+        "columnas": tipos,
+    }
+    _escribir_atomico(ruta_meta, lambda r: r.write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8"))
+    return ruta_datos
+
+
+def _leer_guardada(ruta_excel):
+    """(tabla tipada, meta) si está al día con el Excel; (None, None) si no."""
+    ruta_meta = _ruta_meta(ruta_excel)
+    try:
+        meta = json.loads(ruta_meta.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None, None
+    firma = _firma(ruta_excel)
+    if meta.get("version") != VERSION or (firma is not None and firma != meta.get("excel")):
+        return None, None
+
+    ruta_datos = ruta_meta.parent / meta["archivo"]
+    try:
+        if ruta_datos.suffix == ".parquet":
+            tabla = pd.read_parquet(ruta_datos)
+        else:
+            tabla = pd.read_pickle(ruta_datos)
+    except Exception as e:  # pyarrow ausente, archivo a medio copiar...
+        print(f"⚠️ No se pudo leer {ruta_datos.name} ({e}); se usa el Excel.")
+        return None, None
+    for col, info in meta["columnas"].items():
+        if info["tipo"] == "texto":
+            tabla[col] = tabla[col].astype(object).where(tabla[col].notna(), np.nan)
+    return tabla, meta
+
+
+def tabla_vigente(ruta_excel):
+    """True si hay tabla columnar al día con 'ruta_excel'."""
+    return _leer_guardada(ruta_excel)[0] is not None
+
+
+def leer_tabla(ruta_excel, texto=True, hoja=None):
+    """
+    Hoja principal de 'ruta_excel' desde la tabla columnar.
+    texto=True: igual a pd.read_excel(ruta_excel, sheet_name=hoja, dtype=str).
+    texto=False: con los tipos del esquema (sin tabla: pd.read_excel sin dtype).
+    """
+    tabla, meta = _leer_guardada(ruta_excel)
+    if tabla is None:
+        return pd.read_excel(ruta_excel, sheet_name=hoja or 0, dtype=str if texto else None)
+    if not texto:
+        return tabla
+    return pd.DataFrame(
+        {col: _a_texto(tabla[col], info) for col, info in meta["columnas"].items()},
+        index=tabla.index,
+    )
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    sys.stdout.reconfigure(encoding="utf-8")
+    # python -m modules.tablas_etapas data_clean/FENIX_ANS.xlsx → tiempos y esquema
+    for ruta in sys.argv[1:] or ["data_clean/FENIX_ANS.xlsx"]:
+        inicio = time.perf_counter()
+        tabla, meta = _leer_guardada(ruta)
+        if tabla is None:
+            print(f"{ruta}: sin tabla columnar vigente")
+            continue
+        segundos = time.perf_counter() - inicio
+        print(f"{ruta}: {meta['filas']:,} filas en {segundos * 1000:.0f} ms ({meta['archivo']})")
+        for col, info in meta["columnas"].items():
+            if info["tipo"] != "texto":
+                print(f"   {col:<22}{info['tipo']:<9}{info.get('formato', ''):<20}{info.get('relleno', '')}")
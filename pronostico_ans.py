@@ -0,0 +1,230 @@
+"""
+------------------------------------------------------------
+PRONÓSTICO DE VENCIMIENTOS ANS – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Etapa del informe (después de merge actas): cuántos pedidos
+  abiertos, aún sin ejecutar en campo, se vencen cada uno de
+  los próximos 15 días hábiles si nadie los ejecuta. Sale de
+  FECHA_LIMITE_ANS con el mismo calendario de calculos_ans
+  (WEEKMASK y FESTIVOS).
+- Un límite en fin de semana o festivo cuenta en el hábil
+  anterior: es el último día para ejecutarlo.
+- Desglose por ACTIVIDAD, TIPO_DIRECCION, SUBZONA y técnico:
+  VENCIDOS (ya vencidos), un día hábil por columna, POSTERIOR
+  (después del horizonte) y SIN_FECHA. Todo con numpy, sin apply.
+- Salidas:
+    data_clean/PRONOSTICO_ANS.xlsx   hojas PRONOSTICO y DETALLE
+    data_output/pronostico_ans.json  compacto; el panel lo muestra
+                                     después del informe
+- Uso manual: python pronostico_ans.py [--dias 15]
+------------------------------------------------------------
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+from calculos_ans import FESTIVOS, WEEKMASK
+from modules.instrumentacion import medido, medir
+from modules.reglas_vectorizadas import ejecutado_en_campo
+from modules.tablas_etapas import a_fecha, leer_tabla
+
+base_path = Path(__file__).resolve().parent
+ruta_fenix_ans = base_path / "data_clean" / "FENIX_ANS.xlsx"
+ruta_salida = base_path / "data_clean" / "PRONOSTICO_ANS.xlsx"
+ruta_json = base_path / "data_output" / "pronostico_ans.json"
+
+HORIZONTE = 15  # días hábiles
+
+# Columna de FENIX_ANS → clave en el JSON
+DIMENSIONES = {
+    "ACTIVIDAD": "actividad",
+    "TIPO_DIRECCION": "tipo_direccion",
+    "SUBZONA": "subzona",
+    "TECNICO_EJECUTA": "tecnico",
+}
+SIN_VALOR = "(vacío)"
+DIAS_SEMANA = ["lun", "mar", "mié", "jue", "vie", "sáb", "dom"]
+COLUMNAS_DETALLE = ["PEDIDO", *DIMENSIONES, "FECHA_LIMITE_ANS", "ESTADO", "ESTADO_FENIX"]
+
+
+# ============================================================
+# CÁLCULO
+# ============================================================
+def dias_habiles(ahora, dias=HORIZONTE):
+    """Los próximos 'dias' hábiles desde hoy (hoy incluido si es hábil)."""
+    hoy = np.datetime64(pd.Timestamp(ahora).date(), "D")
+    return np.busday_offset(hoy, np.arange(dias), roll="forward", weekmask=WEEKMASK, holidays=FESTIVOS)
+
+
+def columna_vencimiento(limite, ahora, habiles):
+    """
+    Por pedido, la columna del pronóstico: 0 = ya vencido, 1..N = día
+    hábil en que se vence, N+1 = después del horizonte, N+2 = sin fecha.
+    """
+    dias = len(habiles)
+    sin_fecha = limite.isna().to_numpy()
+    dia_limite = limite.to_numpy().astype("datetime64[D]")
+    dia_limite = np.where(sin_fecha, habiles[0], dia_limite)
+    # Fin de semana / festivo → último hábil antes del límite
+    ultimo_habil = np.busday_offset(dia_limite, 0, roll="backward", weekmask=WEEKMASK, holidays=FESTIVOS)
+    # habiles son consecutivos: cada ultimo_habil cae en uno, antes (→ hoy) o después (→ POSTERIOR)
+    columna = np.searchsorted(habiles, ultimo_habil) + 1
+    vencido = (limite <= pd.Timestamp(ahora)).to_numpy()
+    return np.select([sin_fecha, vencido], [dias + 2, 0], default=columna)
+
+
+def _conteos(valores, columna, etiquetas):
+    """Pedidos por valor y columna (bincount sobre valor × columna)."""
+    valores = valores.astype(object).where(valores.notna() & (valores.astype(str).str.strip() != ""), SIN_VALOR)
+    codigos, unicos = pd.factorize(valores.astype(str).str.strip())
+    n = len(etiquetas)
+    conteo = np.bincount(codigos * n + columna, minlength=len(unicos) * n).reshape(len(unicos), n)
+    tabla = pd.DataFrame(conteo, index=pd.Index(unicos, name="VALOR"), columns=etiquetas)
+    en_riesgo = tabla.iloc[:, : n - 2].sum(axis=1)  # vencidos + horizonte
+    return tabla.loc[en_riesgo.sort_values(ascending=False, kind="stable").index]
+
+
+def pronosticar(df, ahora=None, dias=HORIZONTE):
+    """
+    Devuelve (tabla, detalle, habiles).
+    tabla: una fila por DIMENSION y VALOR (primero TOTAL y ACUMULADO)
+    con los pedidos sin ejecutar que se vencen en cada columna.
+    detalle: los pedidos vencidos o que se vencen en el horizonte.
+    """
+    ahora = pd.Timestamp(ahora or datetime.now())
+    habiles = dias_habiles(ahora, dias)
+    if "PEDIDO" in df.columns:  # un pedido se vence una vez (primera fila, como el histórico)
+        df = df.drop_duplicates(subset="PEDIDO", keep="first")
+    if "REPORTE_TECNICO" in df.columns:
+        df = df[~ejecutado_en_campo(df["REPORTE_TECNICO"]).to_numpy()]
+    df = df.reset_index(drop=True)
+
+    limite = a_fecha(df["FECHA_LIMITE_ANS"])
+    columna = columna_vencimiento(limite, ahora, habiles)
+    etiquetas = ["VENCIDOS", *[f"{DIAS_SEMANA[d.weekday()]} {d:%d/%m}" for d in pd.to_datetime(habiles)],
+                 "POSTERIOR", "SIN_FECHA"]
+
+    total = np.bincount(columna, minlength=len(etiquetas))
+    acumulado = np.cumsum(total[: dias + 1]).astype(float)
+    bloques = {("TOTAL", "TOTAL"): total, ("TOTAL", "ACUMULADO"): [*acumulado, np.nan, np.nan]}
+    tabla = pd.DataFrame.from_dict(bloques, orient="index", columns=etiquetas)
+    tabla.index = pd.MultiIndex.from_tuples(tabla.index, names=["DIMENSION", "VALOR"])
+    partes = [tabla]
+    for col, nombre in DIMENSIONES.items():
+        valores = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        partes.append(pd.concat({nombre: _conteos(valores, columna, etiquetas)}, names=["DIMENSION"]))
+    tabla = pd.concat(partes)
+    tabla.insert(dias + 1, "TOTAL_HORIZONTE", tabla.iloc[:, 1: dias + 1].sum(axis=1))
+    tabla.loc[("TOTAL", "ACUMULADO"), "TOTAL_HORIZONTE"] = np.nan
+    tabla = tabla.astype("Int64")
+
+    en_riesgo = columna <= dias
+    detalle = df.loc[en_riesgo, [c for c in COLUMNAS_DETALLE if c in df.columns]].copy()
+    detalle["FECHA_LIMITE_ANS"] = limite[en_riesgo]
+    detalle.insert(1, "VENCE", np.array(etiquetas, dtype=object)[columna[en_riesgo]])
+    detalle = detalle.sort_values("FECHA_LIMITE_ANS", kind="stable")
+    return tabla, detalle, habiles
+
+
+# ============================================================
+# SALIDAS
+# ============================================================
+def _json(tabla, habiles, ahora, pedidos):
+    """Compacto: por valor la lista [vencidos, día 1..N, posterior, sin_fecha]."""
+    columnas = [c for c in tabla.columns if c != "TOTAL_HORIZONTE"]
+    datos = tabla[columnas]
+    dias = len(habiles)
+    por = {}
+    for nombre in DIMENSIONES.values():
+        if nombre in datos.index.get_level_values(0):
+            bloque = datos.loc[nombre].astype(int)
+            por[nombre] = {valor: fila for valor, fila in zip(bloque.index, bloque.values.tolist())}
+    return {
+        "generado": f"{pd.Timestamp(ahora):%Y-%m-%d %H:%M:%S}",
+        "pedidos_sin_ejecutar": pedidos,
+        "dias": [str(d) for d in habiles],
+        "columnas": ["vencidos", *[str(d) for d in habiles], "posterior", "sin_fecha"],
+        "total": datos.loc[("TOTAL", "TOTAL")].astype(int).tolist(),
+        "acumulado": datos.loc[("TOTAL", "ACUMULADO")].iloc[: dias + 1].astype(int).tolist(),
+        "por": por,
+    }
+
+
+def exportar(tabla, detalle, habiles, ahora):
+    ruta_salida.parent.mkdir(parents=True, exist_ok=True)
+    ruta_json.parent.mkdir(parents=True, exist_ok=True)
+    # Primero el JSON (lo lee el panel al terminar el informe)
+    pedidos = int(tabla.loc[("TOTAL", "TOTAL")].drop("TOTAL_HORIZONTE").sum())
+    datos = _json(tabla, habiles, ahora, pedidos)
+    ruta_json.write_text(json.dumps(datos, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    with pd.ExcelWriter(ruta_salida, engine="openpyxl") as writer:
+        tabla.reset_index().to_excel(writer, index=False, sheet_name="PRONOSTICO")
+        detalle.to_excel(writer, index=False, sheet_name="DETALLE")
+        for hoja, ancho_primeras in (("PRONOSTICO", 28), ("DETALLE", 18)):
+            ws = writer.sheets[hoja]
+            ws.freeze_panes = "C2"
+            for i in range(1, ws.max_column + 1):
+                ws.column_dimensions[get_column_letter(i)].width = ancho_primeras if i <= 2 else 11
+        writer.sheets["DETALLE"].column_dimensions["G"].width = 20
+
+    print(f"💾 Pronóstico guardado en: {ruta_salida}")
+    print(f"💾 JSON para el panel: {ruta_json}")
+
+
+# ------------------------------------------------------------
+# ETAPA COMPLETA (importable desde el worker del panel)
+# ------------------------------------------------------------
+@medido("pronostico", "total")
+def ejecutar(df=None, dias=HORIZONTE):
+    """
+    Pronóstico de vencimientos de la hoja FENIX_ANS que dejó merge
+    actas ('df'); sin él se lee FENIX_ANS. Devuelve la tabla.
+    """
+    with medir("pronostico", "leer") as paso:
+        if df is None:
+            df = leer_tabla(ruta_fenix_ans, texto=False, hoja="FENIX_ANS")
+        paso.filas(salida=len(df))
+
+    ahora = datetime.now()
+    with medir("pronostico", "calcular") as paso:
+        tabla, detalle, habiles = pronosticar(df, ahora, dias)
+        paso.filas(entrada=len(df), salida=len(tabla))
+    if pd.Timestamp(habiles[-1]).year > pd.Timestamp(FESTIVOS.max()).year:
+        print(f"⚠️ Los festivos de calculos_ans no llegan a {pd.Timestamp(habiles[-1]).year}: "
+              "el pronóstico los toma como hábiles.")
+
+    with medir("pronostico", "escribir") as paso:
+        exportar(tabla, detalle, habiles, ahora)
+        paso.filas(salida=len(detalle))
+
+    total = tabla.loc[("TOTAL", "TOTAL")]
+    print(f"📈 Pronóstico: {int(total['VENCIDOS'])} ya vencidos, "
+          f"{int(total['TOTAL_HORIZONTE'])} se vencen en los próximos {dias} días hábiles "
+          f"({int(total.iloc[1])} hoy) si no se ejecutan")
+    return tabla
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Pronóstico de vencimientos ANS por día hábil")
+    parser.add_argument("--dias", type=int, default=HORIZONTE, help="Días hábiles del horizonte")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabla = ejecutar(dias=args.dias)
+    with pd.option_context("display.max_rows", 40, "display.max_columns", None, "display.width", 250):
+        print(tabla.loc["TOTAL"])
+    print(f"⏱️ {time.perf_counter() - inicio:.2f} s")
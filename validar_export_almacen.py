@@ -10,6 +10,9 @@ from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.table import Table, TableStyleInfo
 
 import warnings
+
+from modules.instrumentacion import iniciar_paso
+from modules.tablas_etapas import guardar_tabla
 warnings.filterwarnings("ignore", category=FutureWarning)
 
 # ============================================================
@@ -36,11 +39,13 @@ ruta_salida = base / "data_clean" / "CONTROL_ALMACEN.xlsx"
 print("------------------------------------------------------------")
 print("🚀 INICIANDO CRUCE FÉNIX vs ELITE (v3.2)...")
 inicio = time.time()  
+paso_total = iniciar_paso("control_almacen", "total")
 print("------------------------------------------------------------")
 
 # ============================================================
 # 3. CARGA DE DATOS
 # ============================================================
+paso = iniciar_paso("control_almacen", "leer")
 
 columnas_fenix = [
     "pedido", "subz", "municipio", "contrato", "acta", "actividad",
@@ -149,12 +154,15 @@ except Exception as e:
     raise SystemExit(f"❌ Error al leer Planilla Consumos: {e}")
 
 print("✅ Archivos cargados correctamente.")
+paso.cerrar(entrada=len(df_fenix), salida=len(df_elite))
 time.sleep(0.5)
 
 # ============================================================
 # 4. CRUCE PRINCIPAL (FÉNIX vs ELITE)
 # ============================================================
 print("⚙️ Ejecutando cruce principal FÉNIX vs ELITE...")
+paso = iniciar_paso("control_almacen", "transformar")
+paso.filas(entrada=len(df_fenix) + len(df_elite))
 
 df_fenix.rename(columns={"item_res": "codigo"}, inplace=True)
 
@@ -582,6 +590,8 @@ except Exception as e:
 # ============================================================
 # 10. EXPORTAR A EXCEL (manejo de archivo abierto)
 # ============================================================
+paso.cerrar(salida=len(df_merge))
+paso = iniciar_paso("control_almacen", "escribir")
 
 
 try:
@@ -590,6 +600,7 @@ try:
         df_merge.to_excel(writer, index=False, sheet_name="CONTROL_ALMACEN")
         resumen.to_excel(writer, index=False, sheet_name="RESUMEN")
         df_nocruce.to_excel(writer, index=False, sheet_name="NO_COINCIDEN")
+    hoja_control = df_merge.copy()  # la tabla columnar se guarda tal cual quedó en la hoja
 
     print("💾 Exportando archivo con hoja de control de pendientes...")
 
@@ -605,6 +616,8 @@ except Exception as e:
     sys.exit(1)
 
 
+paso.cerrar(entrada=len(df_merge), salida=len(df_merge) + len(df_nocruce))
+
 # ============================================================
 # 🔹 NORMALIZAR TIPOS DE DATOS (evita "Recuento" en Excel)
 # ============================================================
@@ -638,6 +651,7 @@ for col in ["cantidad", "cantidad_elite", "vlr_cliente", "valor_costo", "diferen
 # ============================================================
 # 11. FORMATO VISUAL LIMPIO
 # ============================================================
+paso = iniciar_paso("control_almacen", "formato")
 wb = load_workbook(ruta_salida)
 
 def formato_hoja(ws):
@@ -727,8 +741,12 @@ for i in range(2, ws_nc.max_row + 1):
 
 wb.save(ruta_salida)
 wb.close()
+# Después del último save: la firma de la tabla es la del Excel final
+guardar_tabla(hoja_control, ruta_salida)
+paso.cerrar(salida=len(df_merge))
 
 print("✅ CRUCE FINALIZADO CON ÉXITO (v3.7 con colores de encabezado).")
 print(f"📁 Archivo generado: {ruta_salida}")
 print("------------------------------------------------------------")
 print(f"⏱️ Tiempo total de ejecución: {round(time.time() - inicio, 2)} segundos.")
+paso_total.cerrar(salida=len(df_merge))
@@ -0,0 +1,353 @@
+"""
+------------------------------------------------------------
+WORKER DEL INFORME ANS – Proyecto Control_ANS_FENIX
+------------------------------------------------------------
+Autor: Héctor + IA (2025)
+------------------------------------------------------------
+Descripción:
+- Proceso persistente que lanza el panel (menu_control_ans.py).
+- Importa UNA sola vez pandas, numpy, openpyxl, folium y los
+  scripts de cada etapa; los clics siguientes no pagan ese costo.
+- Las etapas se pasan los DataFrames en memoria:
+    limpieza → cálculos → cruce digitación → merge actas → mapa / histórico / pronóstico
+  y cada una sigue escribiendo su Excel / HTML para los usuarios.
+- Planificador (modules/planificador_etapas.py): cada etapa declara
+  entradas, salidas y dependencias; si el contenido de sus entradas
+  no cambió desde la última corrida exitosa se omite. Una etapa que
+  falla se repite en la siguiente corrida y lo que depende de ella
+  no se corre en esta; las omitidas leen del disco lo que dejó la
+  corrida anterior.
+- Además del informe: CONTROL FENIX vs ALMACÉN y mano de obra vs
+  materiales (scripts planos, se corren con runpy).
+- Ramas en paralelo: control almacén, mapa y mano de obra no dependen
+  entre sí; corren en un pool de procesos ya cargado mientras sigue la
+  cadena principal. Su salida llega al panel con el prefijo [rama] y
+  queda también en logs/rama_<rama>.log.
+- Al empezar el informe se leen en hilos los archivos crudos de las
+  etapas que sí van a correr (pendientes, digitación, actas).
+- Cada comando es una corrida de modules/instrumentacion.py: las
+  etapas (también las ramas) anotan sus pasos con el mismo id en
+  logs/metricas_etapas.jsonl.
+- Protocolo: un JSON por línea en stdin
+    {"comando": "informe", "forzar": false, "reanudar": false}
+    {"comando": "etapa", "etapa": "mapa", "solo": true}
+    {"comando": "salir"}
+  y al terminar cada comando una línea
+    @@FIN@@ {"ok": true, "etapas": {...}}
+  (también una al arrancar, cuando ya está listo).
+- Uso manual: python worker_pipeline.py --informe [--forzar | --reanudar]
+              python worker_pipeline.py --etapa mapa [--solo]
+------------------------------------------------------------
+"""
+
+import argparse
+import importlib
+import io
+import json
+import multiprocessing
+import os
+import runpy
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+from modules.etapas_memoria import descartar_precargas, precargar
+from modules.instrumentacion import fijar_corrida, nueva_corrida
+from modules.planificador_etapas import PlanificadorEtapas
+
+MARCA_FIN = "@@FIN@@"
+BASE_DIR = Path(__file__).resolve().parent
+RUTA_ESTADO = BASE_DIR / "data_clean" / "estado_pipeline.json"
+RUTA_LOGS = BASE_DIR / "logs"
+FENIX_ANS = "data_clean/FENIX_ANS.xlsx"
+
+# En orden topológico. 'modulo' expone ejecutar(df=None);
+# 'script' es un script plano que se corre completo;
+# 'paralela' corre en el pool de procesos.
+ETAPAS = [
+    {"nombre": "limpieza", "modulo": "limpieza_fenix", "depende": [],
+     "entradas": ["data_raw/pendientes_*.csv"],
+     "salidas": ["data_clean/FENIX_CLEAN.xlsx"]},
+    # Días restantes dependen de la hora y el formulario de Google cambia solo
+    {"nombre": "calculos", "modulo": "calculos_ans", "depende": ["limpieza"],
+     "entradas": ["data_raw/pendientes_*.csv"],
+     "salidas": [FENIX_ANS], "vigencia_min": 15},
+    {"nombre": "cruce_digitacion", "modulo": "cruce_digitacion_fenix", "depende": ["calculos"],
+     "entradas": ["data_raw/Digitacion Fenix.txt"],
+     "salidas": [FENIX_ANS]},
+    {"nombre": "merge_actas", "modulo": "merge_fenix_actas", "depende": ["cruce_digitacion"],
+     "entradas": ["data_raw/*pendientes*.*", "data_raw/*Acta_Clientes*.*"],
+     "salidas": [FENIX_ANS]},
+    {"nombre": "mapa", "modulo": "mapa_ans", "depende": ["merge_actas"], "paralela": True,
+     "entradas": [],
+     "salidas": ["data_output/mapa_ans.html"]},
+    {"nombre": "control_almacen", "script": "validar_export_almacen.py", "depende": [], "paralela": True,
+     "entradas": ["data_raw/Digitacion Fenix.txt", "data_raw/Digitacion Fenix.xlsx", "data_raw/Planilla Consumos.xlsx"],
+     "salidas": ["data_clean/CONTROL_ALMACEN.xlsx"]},
+    {"nombre": "mano_obra", "script": "mano_obra_vs_materiales.py", "depende": ["merge_actas"], "paralela": True,
+     "entradas": ["data_raw/ALMACEN_EXPORT.xlsx", "data_raw/RELACION_MO_MAT.xlsx"],
+     "salidas": ["data_clean/VALIDACION_EXPORT.xlsx"]},
+    # Foto diaria en data_clean/historico_ans.db (crece cada día: no se declara como salida)
+    {"nombre": "historico", "modulo": "historico_ans", "depende": ["merge_actas"],
+     "entradas": [],
+     "salidas": []},
+    # Qué ya venció depende de la hora, como en calculos
+    {"nombre": "pronostico", "modulo": "pronostico_ans", "depende": ["merge_actas"],
+     "entradas": [],
+     "salidas": ["data_clean/PRONOSTICO_ANS.xlsx", "data_output/pronostico_ans.json"], "vigencia_min": 15},
+]
+for _etapa in ETAPAS:
+    _etapa.setdefault("script", f"{_etapa.get('modulo')}.py")
+
+NOMBRES_ETAPAS = [e["nombre"] for e in ETAPAS]
+DATOS_ETAPA = {e["nombre"]: e for e in ETAPAS}
+PROCESOS_RAMAS = min(3, os.cpu_count() or 1)
+
+_modulos = {}
+_planificador = None
+_pool = None
+_corrida = None
+
+
+def _modulo(nombre):
+    if nombre not in _modulos:
+        _modulos[nombre] = importlib.import_module(DATOS_ETAPA[nombre]["modulo"])
+    return _modulos[nombre]
+
+
+def cargar_etapas():
+    """Importa las etapas de la cadena principal y arranca el pool de las ramas."""
+    global _planificador
+    inicio = time.perf_counter()
+    for etapa in ETAPAS:
+        if "modulo" in etapa and not etapa.get("paralela"):
+            _modulo(etapa["nombre"])
+    _planificador = PlanificadorEtapas(BASE_DIR, ETAPAS, RUTA_ESTADO)
+    _obtener_pool()
+    return time.perf_counter() - inicio
+
+
+# ============================================================
+# POOL DE PROCESOS PARA LAS RAMAS
+# ============================================================
+class SalidaRama(io.TextIOBase):
+    """stdout de una rama: cada línea al panel con '[rama] ' y a logs/rama_<rama>.log."""
+
+    def __init__(self, rama):
+        self.prefijo = f"[{rama}] "
+        self._pendiente = ""
+        RUTA_LOGS.mkdir(exist_ok=True)
+        self._archivo = open(RUTA_LOGS / f"rama_{rama}.log", "w", encoding="utf-8")
+
+    def writable(self):
+        return True
+
+    def write(self, texto):
+        self._pendiente += texto
+        *lineas, self._pendiente = self._pendiente.split("\n")
+        for linea in lineas:
+            self._emitir(linea)
+        return len(texto)
+
+    def _emitir(self, linea):
+        self._archivo.write(linea + "\n")
+        # Una sola escritura por línea: no se mezcla con las otras ramas
+        sys.__stdout__.buffer.write(f"{self.prefijo}{linea}\n".encode("utf-8"))
+        sys.__stdout__.buffer.flush()
+
+    def flush(self):
+        self._archivo.flush()
+
+    def close(self):
+        if not self.closed:
+            if self._pendiente:
+                self._emitir(self._pendiente)
+                self._pendiente = ""
+            super().close()
+            self._archivo.close()
+
+
+def _iniciar_rama():
+    """Inicializador de cada proceso del pool: deja cargadas las etapas paralelas."""
+    for etapa in ETAPAS:
+        if "modulo" in etapa and etapa.get("paralela"):
+            _modulo(etapa["nombre"])
+
+
+def _calentar():
+    return os.getpid()
+
+
+def _obtener_pool():
+    """Pool de las ramas; None si no se puede crear (se corre todo en este proceso)."""
+    global _pool
+    if _pool is None:
+        try:
+            # 'spawn' como en Windows: procesos limpios, sin heredar hilos ni buffers
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESOS_RAMAS, initializer=_iniciar_rama,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            # Los procesos arrancan (e importan pandas) mientras el usuario llega al botón
+            for _ in range(PROCESOS_RAMAS):
+                _pool.submit(_calentar)
+        except (OSError, NotImplementedError, BrokenProcessPool) as e:
+            print(f"⚠️ Sin pool de procesos ({e}); las ramas corren en serie.")
+            _pool = None
+    return _pool
+
+
+def cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def correr_en_rama(nombre, df=None, corrida=None):
+    """Corre una etapa dentro de un proceso del pool, con su salida etiquetada."""
+    if corrida:
+        fijar_corrida(corrida)
+    with SalidaRama(nombre) as salida, redirect_stdout(salida), redirect_stderr(salida):
+        _, datos = correr_etapa(nombre, df)
+    return None, datos  # el DataFrame no vuelve: ninguna etapa depende de una rama
+
+
+# ============================================================
+# EJECUCIÓN DE ETAPAS
+# ============================================================
+def correr_etapa(nombre, df=None):
+    """Ejecuta una etapa. Devuelve (DataFrame de salida o None, resumen)."""
+    inicio = time.perf_counter()
+    salida, ok = None, False
+    try:
+        if "modulo" in DATOS_ETAPA[nombre]:
+            etapa = _modulo(nombre)
+            salida = etapa.ejecutar() if df is None else etapa.ejecutar(df)
+        else:
+            runpy.run_path(str(BASE_DIR / DATOS_ETAPA[nombre]["script"]), run_name="__main__")
+        ok = True
+    except SystemExit as e:
+        # Los scripts abortan con sys.exit(); aquí no debe cerrar el worker
+        ok = e.code in (0, None)
+        if not ok:
+            print(f"⛔ Etapa {nombre} detenida ({e.code}).")
+    except Exception:
+        traceback.print_exc(file=sys.stdout)
+
+    segundos = time.perf_counter() - inicio
+    print(f"⏱️ Etapa {nombre}: {segundos:.1f} s")
+    return salida, {
+        "ok": ok,
+        "segundos": round(segundos, 2),
+        "filas": None if salida is None else len(salida),
+    }
+
+
+def lanzar_etapa(nombre, df=None):
+    """Las etapas paralelas van al pool (devuelve un Future); el resto corre aquí."""
+    global _pool
+    if DATOS_ETAPA[nombre].get("paralela") and _obtener_pool() is not None:
+        if "modulo" not in DATOS_ETAPA[nombre]:
+            df = None  # los scripts planos no reciben DataFrame: no vale la pena enviarlo
+        try:
+            return _pool.submit(correr_en_rama, nombre, df, _corrida)
+        except BrokenProcessPool:
+            _pool = None
+            if _obtener_pool() is not None:
+                return _pool.submit(correr_en_rama, nombre, df, _corrida)
+    return correr_etapa(nombre, df)
+
+
+def precargar_entradas(etapas):
+    """Empieza en hilos la lectura de los archivos crudos de las etapas de este proceso."""
+    for nombre in etapas:
+        if DATOS_ETAPA[nombre].get("paralela") or "modulo" not in DATOS_ETAPA[nombre]:
+            continue
+        try:
+            for ruta, lector in getattr(_modulo(nombre), "entradas_crudas", list)():
+                precargar(ruta, lector)
+        except Exception:
+            pass  # la etapa lo leerá (y reportará el error) ella misma
+
+
+def correr(objetivos=None, **opciones):
+    global _corrida
+    _corrida = nueva_corrida()
+    try:
+        return _planificador.ejecutar(lanzar_etapa, objetivos, antes=precargar_entradas, **opciones)
+    finally:
+        descartar_precargas()
+
+
+def informe(forzar=False, reanudar=False):
+    """Corre las etapas que cambiaron; las ramas independientes en paralelo."""
+    return correr(forzar=forzar, reanudar=reanudar)
+
+
+def atender_comando(pedido):
+    comando = pedido.get("comando")
+    if comando == "informe":
+        etapas = informe(pedido.get("forzar", False), pedido.get("reanudar", False))
+    elif comando == "etapa" and pedido.get("etapa") in NOMBRES_ETAPAS:
+        etapas = correr([pedido["etapa"]], forzar=pedido.get("forzar", False), solo=pedido.get("solo", False))
+    else:
+        return {"ok": False, "error": f"comando no reconocido: {pedido}"}
+    return {"ok": all(e["ok"] for e in etapas.values()), "etapas": etapas}
+
+
+def responder(respuesta):
+    print(f"{MARCA_FIN} {json.dumps(respuesta, ensure_ascii=False)}", flush=True)
+
+
+# ============================================================
+# BUCLE PRINCIPAL
+# ============================================================
+def atender():
+    """Lee comandos de stdin hasta 'salir' o fin de la entrada."""
+    segundos = cargar_etapas()
+    responder({"ok": True, "listo": True, "segundos_carga": round(segundos, 2)})
+
+    for linea in sys.stdin:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            pedido = json.loads(linea)
+        except ValueError:
+            responder({"ok": False, "error": f"JSON inválido: {linea[:80]}"})
+            continue
+        if pedido.get("comando") == "salir":
+            break
+        responder(atender_comando(pedido))
+    cerrar_pool()
+
+
+if __name__ == "__main__":
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+    parser = argparse.ArgumentParser(description="Worker persistente del informe ANS")
+    parser.add_argument("--informe", action="store_true", help="Corre el informe completo una vez y termina")
+    parser.add_argument("--etapa", choices=NOMBRES_ETAPAS, help="Corre una etapa (y sus dependencias con cambios) y termina")
+    parser.add_argument("--forzar", action="store_true", help="Ignora el caché y corre todas las etapas")
+    parser.add_argument("--reanudar", action="store_true", help="Retoma desde la etapa que falló sin repetir las que vencieron por tiempo")
+    parser.add_argument("--solo", action="store_true", help="Con --etapa: no revisa sus dependencias")
+    args = parser.parse_args()
+
+    if args.informe or args.etapa:
+        print(f"📦 Etapas cargadas en {cargar_etapas():.1f} s")
+        if args.informe:
+            pedido = {"comando": "informe", "forzar": args.forzar, "reanudar": args.reanudar}
+        else:
+            pedido = {"comando": "etapa", "etapa": args.etapa, "forzar": args.forzar, "solo": args.solo}
+        respuesta = atender_comando(pedido)
+        cerrar_pool()
+        print(json.dumps(respuesta, ensure_ascii=False, indent=2))
+        sys.exit(0 if respuesta["ok"] else 1)
+
+    atender()